@@ -4,20 +4,18 @@ import pandas as pd
 import random
 from datetime import datetime, timedelta
 
-random.seed(42)
+from db import connect_writer
+from data_version import bump_data_version
+from snapshot import export_snapshot
+from star_schema import refresh_star_schema, vacuum_analyze
 
-DB_CONFIG = dict(
-    dbname="superstore",
-    user="postgres",
-    password="2436",
-    host="localhost",
-    port="5432"
-)
+random.seed(42)
 
 REGIONS = ['East', 'West', 'Central', 'South']
 
 def connect():
-    return psycopg2.connect(**DB_CONFIG)
+    """Koneksi ke writer (lihat db.py)"""
+    return connect_writer()
 
 def generate_sellers():
     seller_names = [
@@ -95,22 +93,24 @@ def assign_sellers_to_orders(conn):
 
     # select order_details and customer region
     cur.execute("""
-        SELECT od.id, c.region
+        SELECT od.id, od.order_date, c.region
         FROM order_details od
-        JOIN orders o ON od.order_id = o.order_id
-        JOIN customers c ON o.customer_id = c.customer_id;
+        JOIN orders o ON od.order_id = o.order_id AND od.order_date = o.order_date
+        JOIN customers c ON o.customer_id = c.customer_id
+        ORDER BY od.id;
     """)
     rows = cur.fetchall()
     updates = []
-    for od_id, cust_region in rows:
+    for od_id, od_date, cust_region in rows:
         available = sellers_by_region.get(cust_region) or [s for sl in sellers_by_region.values() for s in sl]
         if not available:
             continue
         seller_id = random.choice(available)
-        updates.append((seller_id, od_id))
+        updates.append((seller_id, od_id, od_date))
 
-    for seller_id, od_id in updates:
-        cur.execute("UPDATE order_details SET seller_id = %s WHERE id = %s;", (seller_id, od_id))
+    # order_date ikut di WHERE supaya UPDATE hanya menyentuh satu partisi
+    for seller_id, od_id, od_date in updates:
+        cur.execute("UPDATE order_details SET seller_id = %s WHERE id = %s AND order_date = %s;", (seller_id, od_id, od_date))
 
     conn.commit()
     cur.close()
@@ -144,6 +144,13 @@ if __name__ == "__main__":
     assign_sellers_to_orders(conn)
     add_foreign_key(conn)
     create_indexes(conn)
+    bump_data_version(conn, ['sellers', 'order_details'])
+    conn.commit()
+    # UPDATE seller_id mengosongkan visibility map order_details (index-only scan)
+    vacuum_analyze(conn, "order_details")
+    # seller_id di order_details berubah, rebuild fact supaya seller_key ikut terisi
+    refresh_star_schema(conn, full=True)
+    export_snapshot(conn)
     print("Selesai. Total sellers:", len(sellers_df))
     print(sellers_df.head(10).to_string(index=False))
     conn.close()
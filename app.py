@@ -1,10 +1,15 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from config import (
-    load_data as config_load_data,
-    get_top_sellers,
     get_seller_performance,
     get_sales_by_category,
     get_profit_by_category,
@@ -18,8 +23,15 @@ from config import (
     get_order_invoice,  
     search_orders,
     get_rfm_analysis,
-    get_rfm_segment_summary  
+    get_rfm_segment_summary
 )
+from datasource import make_source, PostgresSource
+from charts import bin_points, fit_figure, limit_bars, render_mode
+from dashboard_snapshot import DashboardSnapshot, RefreshScheduler, source_loaders
+from data_version import DataVersionListener
+from filter_store import FILTER_COLUMNS, active_filters, filters_key
+from profiling import SamplingProfiler, get_trace, set_trace, span, start_trace, traced
+from query_metrics import set_page
 
 # ==============================
 # CONFIGURATION
@@ -36,43 +48,78 @@ COLORS = {
 
 CATEGORIES = ['Furniture', 'Office Supplies', 'Technology']
 
+# Dataset yang berubah saat ETL mengirim NOTIFY (lihat data_version.py)
+# di-refresh di background oleh RefreshScheduler
+CACHE_LISTEN = os.environ.get("SUPERSTORE_CACHE_LISTEN", "1") == "1"
+# Refresh semua dataset snapshot tiap N detik (0 = hanya saat data berubah)
+SNAPSHOT_REFRESH_SECONDS = float(os.environ.get("SUPERSTORE_SNAPSHOT_REFRESH_SECONDS", "0"))
+
+# Jumlah thread untuk memuat dataset halaman yang belum ada di cache (1 = serial)
+PAGE_LOAD_WORKERS = int(os.environ.get("SUPERSTORE_PAGE_LOAD_WORKERS", "4"))
+
+# Warm-up semua dataset snapshot di background saat proses pertama kali jalan
+SNAPSHOT_WARMUP = os.environ.get("SUPERSTORE_SNAPSHOT_WARMUP", "1") == "1"
+
+# Mode debug: panel timing per rerun di sidebar (juga lewat URL ?debug=1)
+DEBUG = os.environ.get("SUPERSTORE_DEBUG", "0") == "1"
+
+# Jumlah hasil dataset ber-filter (per kombinasi filter) yang disimpan di cache
+FILTER_CACHE_ENTRIES = 256
+
+# Label widget filter global di sidebar (key sama dengan filter_store.FILTER_COLUMNS)
+FILTER_LABELS = {
+    'regions': "Region",
+    'segments': "Segment",
+    'categories': "Kategori",
+    'sellers': "Seller",
+}
+
+logger = logging.getLogger("superstore.app")
+
 # ==============================
 # DATA LOADING FUNCTIONS
 # ==============================
-@st.cache_data
-def load_data():
-    """Load all data from database menggunakan config.py"""
-    data = config_load_data()
-    data['order_date'] = pd.to_datetime(data['order_date'])
-    data['year'] = data['order_date'].dt.year
-    data['month'] = data['order_date'].dt.month
-    return data
+@st.cache_resource
+def get_source():
+    """Sumber data dashboard: Postgres lewat config.py (ganti dengan SUPERSTORE_SOURCE)"""
+    return make_source()
 
-@st.cache_data
-def get_high_qty_loss_products(top_n=15):
-    """Get products dengan high quantity tapi negative profit"""
-    df = load_data()
-    
-    # Filter: Produk dengan profit negatif
-    loss_products = df[df['profit'] < 0].copy()
-    
-    # Agregasi per product dan category
-    product_summary = loss_products.groupby(
-        ['product_name', 'category'], 
-        as_index=False
-    ).agg({
-        'quantity': 'sum',
-        'profit': 'sum'
-    })
-    
-    # Sort dan ambil top N
-    return product_summary.nlargest(top_n, 'quantity')
+def get_filter_store():
+    """Store kolumnar semua order line untuk filter global (dataset snapshot 'filter_store')"""
+    return get_snapshot().get('filter_store')
 
-@st.cache_data
-def get_seller_stats(top_n=10):
-    """Get seller statistics dari database (optimized query)"""
-    seller_data = get_top_sellers(limit=top_n)
-    
+def get_filter_options():
+    """Pilihan filter sidebar: dict region/segment/category/seller -> list nilai"""
+    options = get_snapshot().get('filter_options')
+    return {name: group['value'].tolist() for name, group in options.groupby('filter')}
+
+def snapshot_loaders():
+    """Loader dataset halaman tanpa filter untuk DashboardSnapshot"""
+    loaders = source_loaders(get_source())
+    load_sellers = loaders['seller_stats']
+    loaders['seller_stats'] = lambda: format_seller_stats(load_sellers())
+    loaders['filter_store'] = get_source().load_filter_store
+    return loaders
+
+@st.cache_resource
+def get_snapshot():
+    """Snapshot dataset dashboard, satu per proses dan dibagi semua session.
+
+    Dibuat oleh session pertama setelah start; semua dataset langsung
+    di-warm-up di background (SUPERSTORE_SNAPSHOT_WARMUP=0 untuk mematikan).
+    """
+    snapshot = DashboardSnapshot(snapshot_loaders(), workers=PAGE_LOAD_WORKERS)
+    if SNAPSHOT_WARMUP:
+        snapshot.warm_up()
+    return snapshot
+
+@st.cache_resource
+def get_refresh_scheduler():
+    """Satu scheduler refresh snapshot per proses (interval SUPERSTORE_SNAPSHOT_REFRESH_SECONDS)"""
+    return RefreshScheduler(get_snapshot(), SNAPSHOT_REFRESH_SECONDS).start()
+
+def format_seller_stats(seller_data):
+    """Rename & urutkan kolom hasil get_top_sellers untuk UI"""
     # Rename columns untuk konsistensi dengan UI
     seller_data.columns = [
         'Seller', 'Region', 'Rating', 
@@ -82,9 +129,43 @@ def get_seller_stats(top_n=10):
     # Reorder columns
     return seller_data[['Seller', 'Region', 'Rating', 'Total Sales', 'Total Profit', 'Total Orders', 'Total Quantity']]
 
-@st.cache_data
-def get_yearly_comparison(df):
-    """Calculate YTD metrics vs last year"""
+# Dataset halaman -> (method FilterStore, kwargs), dipakai saat filter global aktif.
+# monthly_sales (halaman Yearly & YTD) selalu dari FilterStore.
+FILTERED_DATASETS = {
+    'loss_products': ('get_loss_products', {'top_n': 15}),
+    'seller_stats': ('get_top_sellers', {'limit': 10}),
+    'seller_performance': ('get_seller_performance', {}),
+    'kpi_summary': ('get_kpi_summary', {}),
+    'data_summary': ('get_data_summary', {}),
+    'customer_spending': ('get_customer_spending', {'limit': 20}),
+    'product_sales': ('get_product_sales', {'limit': 20}),
+    'recent_orders': ('get_recent_orders', {'limit': 20}),
+    'category_sales': ('get_sales_by_category', {}),
+    'monthly_sales': ('get_monthly_sales', {}),
+}
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def get_filtered_dataset(name, key, version):
+    """Dataset name untuk kombinasi filter key (filter_store.filters_key), dari FilterStore.
+
+    version = versi snapshot 'filter_store': hasil untuk store lama tidak
+    dipakai lagi setelah store baru ditukar masuk.
+    """
+    method, kwargs = FILTERED_DATASETS[name]
+    result = getattr(get_filter_store(), method)(dict(key), **kwargs)
+    if name == 'seller_stats':
+        result = format_seller_stats(result)
+    return result
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def get_yearly_comparison(version, _df):
+    """Calculate YTD metrics vs last year.
+
+    Cache dikunci version (dataset_version), bukan isi _df: parameter
+    berawalan _ tidak di-hash Streamlit, jadi cache hit tidak bergantung
+    ukuran data.
+    """
+    df = _df
     current_year = df['year'].max()
     last_year = current_year - 1
     current_month = df[df['year'] == current_year]['month'].max()
@@ -131,11 +212,64 @@ def get_yearly_comparison(df):
     
     return metrics
 
+# ==============================
+# CACHE INVALIDATION
+# ==============================
+STAR_TABLES = {'fact_order_line', 'dim_customer', 'dim_product', 'dim_seller', 'dim_order'}
+
+# Fungsi cache -> tabel yang dibacanya. 'snapshot' untuk backend duckdb.
+CACHE_DEPENDENCIES = {
+    get_yearly_comparison: STAR_TABLES | {'snapshot'},
+}
+
+# Dataset DashboardSnapshot -> tabel yang dibacanya
+SNAPSHOT_DEPENDENCIES = {
+    'filter_options': {'dim_customer', 'dim_product', 'dim_seller', 'snapshot'},
+    'loss_products': {'fact_order_line', 'dim_product', 'snapshot'},
+    'kpi_summary': {'fact_order_line', 'dim_customer', 'kpi_sketches', 'snapshot'},
+    'seller_stats': {'fact_order_line', 'dim_seller', 'leaderboards', 'snapshot'},
+    'seller_performance': {'fact_order_line', 'dim_seller', 'snapshot'},
+    'data_summary': {'kpi_sketches', 'snapshot'},
+    'customer_spending': {'leaderboard_totals', 'dim_customer', 'snapshot'},
+    'product_sales': {'leaderboard_totals', 'dim_product', 'snapshot'},
+    'recent_orders': {'fact_order_line', 'dim_order', 'dim_customer', 'snapshot'},
+    'category_sales': {'fact_order_line', 'dim_product', 'snapshot'},
+    'filter_store': STAR_TABLES | {'snapshot'},
+}
+
+def invalidate_caches(tables):
+    """Evict cache & jadwalkan refresh dataset snapshot yang bergantung pada tabel yang berubah.
+
+    Dataset snapshot tidak dibuang: session tetap membaca versi lama sampai
+    RefreshScheduler selesai memuat versi baru.
+    """
+    tables = set(tables)
+    evicted = [func for func, deps in CACHE_DEPENDENCIES.items() if deps & tables]
+    for func in evicted:
+        func.clear()
+    stale = [name for name, deps in SNAPSHOT_DEPENDENCIES.items() if deps & tables]
+    if stale:
+        get_refresh_scheduler().request(stale)
+    logger.info(
+        "cache di-evict: %s; refresh: %s",
+        ", ".join(func.__name__ for func in evicted) or "-", ", ".join(stale) or "-",
+    )
+    return [func.__name__ for func in evicted] + stale
+
+@st.cache_resource
+def start_cache_listener():
+    """Satu listener NOTIFY per proses Streamlit (None kalau sumber data bukan Postgres)"""
+    if not CACHE_LISTEN or not isinstance(get_source(), PostgresSource):
+        return None
+    return DataVersionListener(invalidate_caches).start()
+
 # ==============================
 # CHART CREATION FUNCTIONS
 # ==============================
+@traced('figure')
 def create_loss_products_chart(product_loss):
     """Create stacked bar chart untuk loss products"""
+    product_loss = limit_bars(product_loss, 'quantity')
     fig = go.Figure()
     
     for cat in CATEGORIES:
@@ -207,10 +341,11 @@ def create_loss_products_chart(product_loss):
     
     return fig
 
+@traced('figure')
 def create_seller_sales_chart(seller_stats):
     """Create bar chart untuk top sellers"""
     fig = px.bar(
-        seller_stats,
+        limit_bars(seller_stats, 'Total Sales'),
         x='Seller',
         y='Total Sales',
         color='Region',
@@ -236,27 +371,40 @@ def create_seller_sales_chart(seller_stats):
     
     return fig
 
-def create_seller_rating_chart(seller_stats):
-    """Create scatter plot untuk seller rating vs profit"""
-    fig = px.scatter(
-        seller_stats,
-        x='Rating',
-        y='Total Profit',
-        size='Total Orders',
-        color='Region',
-        hover_data=['Seller', 'Total Sales'],
-        title='Correlation: Seller Rating vs Profit',
-        labels={'Rating': 'Seller Rating', 'Total Profit': 'Total Profit ($)'},
-        color_discrete_map=COLORS
-    )
-    
-    fig.update_layout(
-        height=500,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-    return fig
+@traced('figure')
+def create_seller_rating_chart(seller_performance):
+    """Create scatter plot untuk seller rating vs profit per region (di-bin per region kalau seller-nya banyak)"""
+    def build(budget):
+        points = bin_points(
+            seller_performance, 'seller_rating', 'total_profit', budget,
+            by='seller_region', sums=['total_sales', 'total_orders'],
+        )
+        fig = px.scatter(
+            points,
+            x='seller_rating',
+            y='total_profit',
+            size='total_orders',
+            color='seller_region',
+            hover_name='seller_name' if 'seller_name' in points else None,
+            hover_data=['total_sales', 'points'],
+            title='Correlation: Seller Rating vs Profit',
+            labels={
+                'seller_rating': 'Seller Rating', 'total_profit': 'Total Profit ($)', 'seller_region': 'Region',
+                'total_orders': 'Total Orders', 'total_sales': 'Total Sales ($)', 'points': 'Jumlah Seller',
+            },
+            render_mode=render_mode(len(points)),
+            color_discrete_map=COLORS,
+        )
+        fig.update_layout(
+            height=500,
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)'
+        )
+        return fig
 
+    return fit_figure(build)
+
+@traced('figure')
 def create_yearly_sales_chart(df):
     """Create bar chart untuk yearly sales"""
     yearly_sales = df.groupby('year')['sales'].sum().reset_index()
@@ -271,7 +419,6 @@ def create_yearly_sales_chart(df):
     )
     
     fig.update_traces(
-        texttemplate='$%{text:,.0f}', 
         texttemplate='$%{text:.2s}', 
         textposition='outside'
     )
@@ -287,6 +434,7 @@ def create_yearly_sales_chart(df):
     
     return fig
 
+@traced('figure')
 def create_ytd_comparison_chart(metrics):
     """Create comparison chart YTD vs Last Year"""
     current_yr = metrics['current_year']
@@ -369,7 +517,7 @@ def display_loss_products_section(product_loss):
                 delta_color="inverse"
             )
 
-def display_seller_analytics_section(seller_stats):
+def display_seller_analytics_section(seller_stats, seller_performance):
     """Display section untuk seller analytics"""
     st.markdown("---")
     st.subheader("🏪 Top 10 Sellers by Sales")
@@ -381,99 +529,83 @@ def display_seller_analytics_section(seller_stats):
     # Performance table
     st.dataframe(seller_stats, use_container_width=True, hide_index=True)
 
-def display_overview_section(df):
-    """Display section untuk data overview"""
+    # Rating vs profit semua seller
+    st.markdown("---")
+    st.subheader(f"⭐ Rating vs Profit ({len(seller_performance):,} seller)")
+    st.plotly_chart(create_seller_rating_chart(seller_performance), use_container_width=True)
+
+def format_currency(df, columns):
+    """Format kolom uang jadi string $ (panggil setelah head/limit, hanya baris yang tampil)"""
+    df = df.copy()
+    for col in columns:
+        df[col] = df[col].map(lambda x: f"${float(x):,.2f}")
+    return df
+
+def display_overview_section(data):
+    """Display section untuk data overview (semua tabel sudah diagregasi di sumber data)"""
     st.title("📊 Dashboard Superstore | Data Lokal Postgres")
+    kpi = data['kpi_summary'].iloc[0]
     
     # Metrics summary
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total Records", f"{len(df):,}")
+        st.metric("Total Records", f"{int(data['data_summary']['total_records'].iloc[0]):,}")
     with col2:
-        total_sales = df['sales'].sum()
-        st.metric("Total Sales", f"${total_sales:,.2f}")
+        st.metric("Total Sales", f"${float(kpi['total_sales']):,.2f}")
     with col3:
-        total_profit = df['profit'].sum()
-        st.metric("Total Profit", f"${total_profit:,.2f}")
+        st.metric("Total Profit", f"${float(kpi['total_profit']):,.2f}")
     with col4:
-        unique_customers = df['customer_name'].nunique()
-        st.metric("Total Customers", f"{unique_customers:,}")
+        st.metric("Total Customers", f"{int(kpi['total_customers']):,}")
     
     st.markdown("---")
     
     # Tabel 1: Total Belanjaan per Customer
     with st.expander("👥 Total Belanjaan per Customer", expanded=False):
-        customer_spending = df.groupby('customer_name').agg({
-            'order_id': 'count',
-            'sales': 'sum',
-            'profit': 'sum'
-        }).reset_index()
+        customer_spending = data['customer_spending']
+        st.caption(f"Top {len(customer_spending)} dari {int(customer_spending['total_rows'].max() or 0):,} customer")
+        customer_spending = customer_spending[['customer_name', 'total_orders', 'total_sales', 'total_profit']]
         customer_spending.columns = ['Customer Name', 'Total Orders', 'Total Sales', 'Total Profit']
-        customer_spending = customer_spending.sort_values('Total Sales', ascending=False)
-        customer_spending['Total Sales'] = customer_spending['Total Sales'].apply(lambda x: f"${x:,.2f}")
-        customer_spending['Total Profit'] = customer_spending['Total Profit'].apply(lambda x: f"${x:,.2f}")
-        
         st.dataframe(
-            customer_spending.head(20),
+            format_currency(customer_spending, ['Total Sales', 'Total Profit']),
             use_container_width=True,
             hide_index=True
         )
     
     # Tabel 2: Produk yang Terjual
     with st.expander("📦 Produk yang Terjual", expanded=False):
-        product_sales = df.groupby(['product_name', 'category']).agg({
-            'quantity': 'sum',
-            'sales': 'sum',
-            'profit': 'sum'
-        }).reset_index()
+        product_sales = data['product_sales']
+        st.caption(f"Top {len(product_sales)} dari {int(product_sales['total_rows'].max() or 0):,} produk")
+        product_sales = product_sales[['product_name', 'category', 'total_quantity', 'total_sales', 'total_profit']]
         product_sales.columns = ['Product Name', 'Category', 'Total Quantity Sold', 'Total Sales', 'Total Profit']
-        product_sales = product_sales.sort_values('Total Quantity Sold', ascending=False)
-        product_sales['Total Sales'] = product_sales['Total Sales'].apply(lambda x: f"${x:,.2f}")
-        product_sales['Total Profit'] = product_sales['Total Profit'].apply(lambda x: f"${x:,.2f}")
-        
         st.dataframe(
-            product_sales.head(20),
+            format_currency(product_sales, ['Total Sales', 'Total Profit']),
             use_container_width=True,
             hide_index=True
         )
     
     # Tabel 3: Order Summary
     with st.expander("📋 Order Summary", expanded=False):
-        order_summary = df.groupby('order_id').agg({
-            'customer_name': 'first',
-            'order_date': 'first',
-            'sales': 'sum',
-            'profit': 'sum',
-            'product_name': 'count'
-        }).reset_index()
+        order_summary = data['recent_orders']
+        st.caption(f"{len(order_summary)} order terbaru dari {int(order_summary['total_rows'].max() or 0):,} order")
+        order_summary = order_summary[['order_id', 'customer_name', 'order_date', 'total_sales', 'total_profit', 'items_count']]
         order_summary.columns = ['Order ID', 'Customer', 'Order Date', 'Total Sales', 'Total Profit', 'Items Count']
-        order_summary = order_summary.sort_values('Order Date', ascending=False)
+        order_summary = format_currency(order_summary, ['Total Sales', 'Total Profit'])
         order_summary['Order Date'] = pd.to_datetime(order_summary['Order Date']).dt.strftime('%Y-%m-%d')
-        order_summary['Total Sales'] = order_summary['Total Sales'].apply(lambda x: f"${x:,.2f}")
-        order_summary['Total Profit'] = order_summary['Total Profit'].apply(lambda x: f"${x:,.2f}")
-        
         st.dataframe(
-            order_summary.head(20),
+            order_summary,
             use_container_width=True,
             hide_index=True
         )
     
     # Tabel 4: Sales per Category
     with st.expander("📊 Sales per Category", expanded=False):
-        category_sales = df.groupby('category').agg({
-            'sales': 'sum',
-            'profit': 'sum',
-            'quantity': 'sum',
-            'order_id': 'count'
-        }).reset_index()
+        category_sales = data['category_sales'][['category', 'total_sales', 'total_profit', 'total_quantity', 'total_orders']]
         category_sales.columns = ['Category', 'Total Sales', 'Total Profit', 'Total Quantity', 'Total Orders']
-        category_sales = category_sales.sort_values('Total Sales', ascending=False)
-        category_sales['Profit Margin %'] = (category_sales['Total Profit'] / category_sales['Total Sales'] * 100).round(2)
-        category_sales['Total Sales'] = category_sales['Total Sales'].apply(lambda x: f"${x:,.2f}")
-        category_sales['Total Profit'] = category_sales['Total Profit'].apply(lambda x: f"${x:,.2f}")
-        
+        category_sales['Profit Margin %'] = (
+            category_sales['Total Profit'].astype(float) / category_sales['Total Sales'].astype(float) * 100
+        ).round(2)
         st.dataframe(
-            category_sales,
+            format_currency(category_sales, ['Total Sales', 'Total Profit']),
             use_container_width=True,
             hide_index=True
         )
@@ -484,9 +616,10 @@ def display_yearly_sales_section(df):
     fig = create_yearly_sales_chart(df)
     st.plotly_chart(fig, use_container_width=True)
 
-def display_ytd_comparison_section(df):
-    """Display section untuk YTD comparison"""
-    metrics = get_yearly_comparison(df)
+def display_ytd_comparison_section(df, version):
+    """Display section untuk YTD comparison (version = token dataset df, lihat dataset_version)"""
+    with span('transform', 'get_yearly_comparison'):
+        metrics = get_yearly_comparison(version, df)
     
     # Title dengan informasi tahun yang jelas
     current_yr = metrics['current_year']
@@ -534,9 +667,146 @@ def display_ytd_comparison_section(df):
     fig = create_ytd_comparison_chart(metrics)
     st.plotly_chart(fig, width='stretch')
 
+# ==============================
+# PAGE REGISTRY
+# ==============================
+# Setiap halaman mendeklarasikan dataset yang dibutuhkan; hanya itu yang dimuat
+PAGES = {
+    "overview": {
+        'label': "🏠 Overview",
+        'needs': [
+            'kpi_summary', 'data_summary', 'customer_spending',
+            'product_sales', 'recent_orders', 'category_sales',
+        ],
+        'render': display_overview_section,
+    },
+    "loss_products": {
+        'label': "📉 Loss Products Analysis",
+        'needs': ['loss_products'],
+        'render': lambda data: display_loss_products_section(data['loss_products']),
+    },
+    "seller_analytics": {
+        'label': "🏪 Seller Analytics",
+        'needs': ['seller_stats', 'seller_performance'],
+        'render': lambda data: display_seller_analytics_section(data['seller_stats'], data['seller_performance']),
+    },
+    "yearly_sales": {
+        'label': "📅 Yearly Sales",
+        'needs': ['monthly_sales'],
+        'render': lambda data: display_yearly_sales_section(data['monthly_sales']),
+    },
+    "ytd_comparison": {
+        'label': "📈 YTD Comparison",
+        'needs': ['monthly_sales'],
+        'render': lambda data: display_ytd_comparison_section(data['monthly_sales'], data['versions']['monthly_sales']),
+    },
+}
+
+def load_dataset(name, filters=None):
+    """Satu dataset halaman: tanpa filter dari snapshot bersama, dengan filter dari FilterStore"""
+    with span('transform', name):
+        snapshot = get_snapshot()
+        if name in snapshot.loaders and not active_filters(filters):
+            return snapshot.get(name)
+        get_filter_store()
+        return get_filtered_dataset(name, filters_key(filters), snapshot.version('filter_store'))
+
+def dataset_version(name, filters=None):
+    """Token murah versi dataset name untuk filters, kunci cache helper yang menerima DataFrame.
+
+    Berubah setiap kali dataset (atau FilterStore untuk dataset ber-filter)
+    dimuat ulang, jadi isi DataFrame tidak perlu di-hash.
+    """
+    snapshot = get_snapshot()
+    if name in snapshot.loaders and not active_filters(filters):
+        return (name, (), snapshot.version(name))
+    return (name, filters_key(filters), snapshot.version('filter_store'))
+
+def load_page_data(names, page, filters=None):
+    """Muat dataset halaman; yang belum ada di cache dimuat paralel (PAGE_LOAD_WORKERS).
+
+    data['versions'] = dataset_version tiap dataset, diambil sebelum dimuat
+    supaya versi tidak pernah lebih baru dari datanya.
+    """
+    versions = {name: dataset_version(name, filters) for name in names}
+    data = _load_datasets(names, page, filters)
+    data['versions'] = versions
+    return data
+
+def _load_datasets(names, page, filters):
+    if len(names) <= 1 or PAGE_LOAD_WORKERS <= 1:
+        return {name: load_dataset(name, filters) for name in names}
+    ctx = get_script_run_ctx()
+    trace = get_trace()
+
+    def load(name):
+        # thread worker ikut context session, halaman & trace debug (per thread)
+        add_script_run_ctx(threading.current_thread(), ctx)
+        set_page(page)
+        set_trace(trace)
+        try:
+            return load_dataset(name, filters)
+        finally:
+            set_trace(None)
+
+    with ThreadPoolExecutor(max_workers=min(PAGE_LOAD_WORKERS, len(names))) as pool:
+        return dict(zip(names, pool.map(load, names)))
+
+def sidebar_filters(summary):
+    """Widget filter global di sidebar; return dict filter (kosong = semua data)"""
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🔎 Filter")
+    first = summary['first_month'].date()
+    last = (summary['last_month'] + pd.offsets.MonthEnd(0)).date()
+    filters = {}
+    dates = st.sidebar.date_input("Rentang Tanggal", value=(first, last), min_value=first, max_value=last)
+    # saat user baru memilih tanggal awal, date_input mengembalikan satu tanggal
+    if isinstance(dates, (tuple, list)) and len(dates) == 2:
+        if dates[0] != first:
+            filters['start_date'] = dates[0]
+        if dates[1] != last:
+            filters['end_date'] = dates[1]
+    options = get_filter_options()
+    for name, label in FILTER_LABELS.items():
+        filters[name] = st.sidebar.multiselect(label, options.get(FILTER_COLUMNS[name], []))
+    return filters
+
+def describe_filters(filters):
+    """Ringkasan filter aktif satu baris, mis. "2016-01-01 s/d 2016-12-31 | Region: West" """
+    parts = []
+    if filters.get('start_date') or filters.get('end_date'):
+        parts.append(f"{filters.get('start_date') or '...'} s/d {filters.get('end_date') or '...'}")
+    for name, label in FILTER_LABELS.items():
+        if filters.get(name):
+            parts.append(f"{label}: {', '.join(filters[name])}")
+    return " | ".join(parts)
+
 # ==============================
 # MAIN APPLICATION
 # ==============================
+def debug_enabled():
+    """Mode debug: env SUPERSTORE_DEBUG=1 atau URL ?debug=1"""
+    return DEBUG or st.query_params.get("debug") == "1"
+
+def display_perf_panel(trace):
+    """Panel debug di sidebar: timing span rerun ini & profile sampling rerun berikutnya"""
+    with st.sidebar.expander("⏱️ Performance (rerun ini)", expanded=True):
+        st.caption(f"Total {trace.elapsed_ms():,.0f} ms; transform/render sudah termasuk query & figure di dalamnya")
+        st.dataframe(trace.totals(), use_container_width=True, hide_index=True)
+        st.dataframe(trace.frame(), use_container_width=True, hide_index=True)
+        if st.button("🔥 Profile rerun berikutnya"):
+            st.session_state['profile_next_run'] = True
+            st.rerun()
+        profile = st.session_state.get('profile')
+        if profile is not None:
+            st.download_button(
+                "⬇️ Download flamegraph (.folded)",
+                profile['folded'],
+                file_name=profile['file_name'],
+                mime="text/plain",
+            )
+            st.caption(f"{profile['samples']:,} sample ({profile['page']}); buka di speedscope.app atau flamegraph.pl")
+
 def main():
     """Main application entry point"""
     
@@ -547,19 +817,36 @@ def main():
         layout="wide",
         initial_sidebar_state="expanded"
     )
-    
+
+    trace = start_trace() if debug_enabled() else None
+    profiler = None
+    if trace is not None and st.session_state.pop('profile_next_run', False):
+        profiler = SamplingProfiler(trace.threads).start()
+    try:
+        with span('run', 'script'):
+            page = render_dashboard()
+    finally:
+        set_trace(None)
+        if profiler is not None:
+            profiler.stop()
+    if profiler is not None:
+        st.session_state['profile'] = {
+            'folded': profiler.folded(),
+            'samples': profiler.samples,
+            'page': page,
+            'file_name': f"profile_{page}_{time.strftime('%Y%m%d_%H%M%S')}.folded",
+        }
+    if trace is not None:
+        display_perf_panel(trace)
+
+def render_dashboard():
+    """Sidebar + halaman yang dipilih; return key halaman"""
     # Sidebar navigation
     st.sidebar.title("📊 Dashboard Navigation")
     st.sidebar.markdown("---")
     
     # Menu options
-    menu_options = {
-        "🏠 Overview": "overview",
-        "📉 Loss Products Analysis": "loss_products",
-        "🏪 Seller Analytics": "seller_analytics",
-        "📅 Yearly Sales": "yearly_sales",
-        "📈 YTD Comparison": "ytd_comparison"
-    }
+    menu_options = {page['label']: key for key, page in PAGES.items()}
     
     # Create radio buttons for menu selection
     selected_menu = st.sidebar.radio(
@@ -570,6 +857,7 @@ def main():
     
     # Get the selected page
     selected_page = menu_options[selected_menu]
+    set_page(selected_page)
     
     # Sidebar info
     st.sidebar.markdown("---")
@@ -577,35 +865,28 @@ def main():
         "📌 **Tip:** Pilih menu di atas untuk navigasi antar halaman analisis."
     )
     
-    # Load data
-    df = load_data()
-    product_loss = get_high_qty_loss_products()
-    seller_stats = get_seller_stats()
-    
-    # Display data info in sidebar
+    start_cache_listener()
+    get_refresh_scheduler()
+
+    # Display data info in sidebar (ringkasan murah, bukan order line)
+    summary = load_dataset('data_summary').iloc[0]
     st.sidebar.markdown("---")
-    st.sidebar.metric("Total Records", f"{len(df):,}")
-    st.sidebar.metric("Date Range", f"{df['year'].min()} - {df['year'].max()}")
-    
-    # Display selected section
-    if selected_page == "overview":
-        display_overview_section(df)
-    elif selected_page == "loss_products":
-        display_loss_products_section(product_loss)
-    elif selected_page == "seller_analytics":
-        display_seller_analytics_section(seller_stats)
-    elif selected_page == "yearly_sales":
-        display_yearly_sales_section(df)
-    elif selected_page == "ytd_comparison":
-        display_ytd_comparison_section(df)
-    elif selected_page == "profitability":
-        display_profitability_analysis_section(df)
-    elif selected_page == "all_tables":
-        display_all_tables_section()
-    elif selected_page == "invoice":
-        display_invoice_section()
-    elif selected_page == "rfm":
-        display_rfm_analysis_section()
+    st.sidebar.metric("Total Records", f"{int(summary['total_records']):,}")
+    st.sidebar.metric("Date Range", f"{summary['first_month'].year} - {summary['last_month'].year}")
+    filters = sidebar_filters(summary)
+
+    if active_filters(filters):
+        st.info(f"🔎 **Filter aktif:** {describe_filters(filters)}")
+        if load_dataset('data_summary', filters)['total_records'].iloc[0] == 0:
+            st.warning("Tidak ada order line yang cocok dengan filter.")
+            return selected_page
+    
+    # Load hanya data halaman yang dipilih, lalu tampilkan
+    page = PAGES[selected_page]
+    data = load_page_data(page['needs'], selected_page, filters)
+    with span('render', selected_page):
+        page['render'](data)
+    return selected_page
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,13 @@
+import os
+import time
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+from datasource import make_source
+from frames import add_date_parts
+
 # ==============================
 # CONFIGURATION
 # ==============================
@@ -18,60 +23,55 @@ CATEGORIES = ['Furniture', 'Office Supplies', 'Technology']
 # ==============================
 # DATA LOADING FUNCTIONS
 # ==============================
-@st.cache_data
+@st.cache_resource
+def get_source():
+    """Sumber data dashboard: superstore_data.csv (ganti dengan SUPERSTORE_SOURCE)"""
+    return make_source(os.environ.get("SUPERSTORE_SOURCE", "csv:superstore_data.csv"))
+
+@st.cache_resource
+def load_snapshot():
+    """(versi, frame) semua data dari sumber data; dimuat sekali per proses, dibagi semua session"""
+    data = get_source().load_data()
+    return time.time_ns(), add_date_parts(data)
+
 def load_data():
-    """Load data from CSV file"""
-    data = pd.read_csv('superstore_data.csv')
-    data['order_date'] = pd.to_datetime(data['order_date'])
-    data['ship_date'] = pd.to_datetime(data['ship_date'])
-    data['year'] = data['order_date'].dt.year
-    data['month'] = data['order_date'].dt.month
-    return data
+    """Load all data dari sumber data (view copy-on-write: cache hit tanpa copy/pickle frame)"""
+    return load_snapshot()[1].copy(deep=False)
+
+def data_version():
+    """Token versi load_data(), kunci cache helper yang menerima DataFrame"""
+    return load_snapshot()[0]
 
 @st.cache_data
 def get_high_qty_loss_products(top_n=15):
     """Get products dengan high quantity tapi negative profit"""
-    df = load_data()
-    
-    # Filter: Produk dengan profit negatif
-    loss_products = df[df['profit'] < 0].copy()
-    
-    # Agregasi per product dan category
-    product_summary = loss_products.groupby(
-        ['product_name', 'category'], 
-        as_index=False
-    ).agg({
-        'quantity': 'sum',
-        'profit': 'sum'
-    })
-    
-    # Sort dan ambil top N
-    return product_summary.nlargest(top_n, 'quantity')
+    return get_source().get_loss_products(top_n=top_n)
+
+@st.cache_data
+def get_kpi_summary():
+    """KPI tile: distinct customer/order & quantile nilai order dari sumber data.
+
+    Sumber csv/parquet (default) selalu exact; sketch SUPERSTORE_APPROXIMATE=1
+    hanya berlaku untuk SUPERSTORE_SOURCE=postgres (lewat config.py).
+    """
+    return get_source().get_kpi_summary()
 
 @st.cache_data
 def get_seller_stats(top_n=10):
     """Get seller statistics dan sort by sales"""
-    df = load_data()
-    
-    seller_stats = df.groupby(
-        ['seller_name', 'seller_region', 'seller_rating']
-    ).agg({
-        'sales': 'sum',
-        'profit': 'sum',
-        'order_id': 'count',
-        'quantity': 'sum'
-    }).reset_index()
+    seller_data = get_source().get_top_sellers(limit=top_n)
     
-    seller_stats.columns = [
+    seller_data.columns = [
         'Seller', 'Region', 'Rating', 
-        'Total Sales', 'Total Profit', 'Total Orders', 'Total Quantity'
+        'Total Orders', 'Total Quantity', 'Total Sales', 'Total Profit', 'Avg Profit'
     ]
     
-    return seller_stats.nlargest(top_n, 'Total Sales')
+    return seller_data[['Seller', 'Region', 'Rating', 'Total Sales', 'Total Profit', 'Total Orders', 'Total Quantity']]
 
 @st.cache_data
-def get_yearly_comparison(df):
-    """Calculate YTD metrics vs last year"""
+def get_yearly_comparison(version, _df):
+    """Calculate YTD metrics vs last year (cache dikunci version, _df tidak di-hash)"""
+    df = _df
     current_year = df['year'].max()
     last_year = current_year - 1
     current_month = df[df['year'] == current_year]['month'].max()
@@ -369,14 +369,14 @@ def display_overview_section(df):
         total_profit = df['profit'].sum()
         st.metric("Total Profit", f"${total_profit:,.2f}")
     with col4:
-        unique_customers = df['customer_name'].nunique()
+        unique_customers = int(get_kpi_summary()['total_customers'].iloc[0])
         st.metric("Total Customers", f"{unique_customers:,}")
     
     st.markdown("---")
     
     # Tabel 1: Total Belanjaan per Customer
     with st.expander("👥 Total Belanjaan per Customer", expanded=False):
-        customer_spending = df.groupby('customer_name').agg({
+        customer_spending = df.groupby('customer_name', observed=True).agg({
             'order_id': 'count',
             'sales': 'sum',
             'profit': 'sum'
@@ -394,7 +394,7 @@ def display_overview_section(df):
     
     # Tabel 2: Produk yang Terjual
     with st.expander("📦 Produk yang Terjual", expanded=False):
-        product_sales = df.groupby(['product_name', 'category']).agg({
+        product_sales = df.groupby(['product_name', 'category'], observed=True).agg({
             'quantity': 'sum',
             'sales': 'sum',
             'profit': 'sum'
@@ -412,7 +412,7 @@ def display_overview_section(df):
     
     # Tabel 3: Order Summary
     with st.expander("📋 Order Summary", expanded=False):
-        order_summary = df.groupby('order_id').agg({
+        order_summary = df.groupby('order_id', observed=True).agg({
             'customer_name': 'first',
             'order_date': 'first',
             'sales': 'sum',
@@ -433,7 +433,7 @@ def display_overview_section(df):
     
     # Tabel 4: Sales per Category
     with st.expander("📊 Sales per Category", expanded=False):
-        category_sales = df.groupby('category').agg({
+        category_sales = df.groupby('category', observed=True).agg({
             'sales': 'sum',
             'profit': 'sum',
             'quantity': 'sum',
@@ -461,7 +461,7 @@ def display_ytd_comparison_section(df):
     """Display section untuk YTD comparison"""
     st.subheader("📈 Total Sales, Profit & Margin YTD vs Last Year")
     
-    metrics = get_yearly_comparison(df)
+    metrics = get_yearly_comparison(data_version(), df)
     
     # KPI Cards
     col1, col2, col3 = st.columns(3)
@@ -0,0 +1,398 @@
+# bench_queries.py
+# Query performance regression suite untuk semua fungsi query di config.py.
+#
+# Untuk setiap scale, script ini membuat database Postgres sekali pakai
+# (superstore_bench_s<scale>), mengisinya dengan data Superstore.xls yang
+# direplikasi <scale> kali, lalu mengukur distribusi latency tiap query dan
+# bentuk plan-nya (seq scan vs index scan, strategi join). Hasil dibandingkan
+# dengan baseline yang disimpan; exit code 1 kalau ada regresi.
+#
+#   python bench_queries.py --scales 1 5 20 --update-baseline   # simpan baseline
+#   python bench_queries.py --scales 1 5 20                      # cek regresi
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+
+from add_sellers import generate_sellers
+from db import ReaderPool
+from partitions import ensure_partitions
+from rfm import refresh_customer_rfm
+from star_schema import refresh_star_schema
+
+ADMIN_DSN = os.environ.get(
+    "SUPERSTORE_BENCH_ADMIN_DSN",
+    "dbname=postgres user=postgres password=2436 host=localhost port=5432"
+)
+EXCEL_FILE = "Superstore.xls"
+SCHEMA_FILE = "create_tables.sql"
+BASELINE_FILE = "bench_baseline.json"
+RESULTS_FILE = "bench_results.json"
+
+# Query yang dibenchmark: (nama case, nama fungsi config, args, kwargs)
+CASES = [
+    ("load_data", "load_data", (), {}),
+    ("load_data_last_quarter", "load_data", (), {"start_date": "2017-10-01", "end_date": "2017-12-31"}),
+    ("get_categories", "get_categories", (), {}),
+    ("get_subcategories", "get_subcategories", (), {}),
+    ("get_sellers", "get_sellers", (), {}),
+    ("get_customers", "get_customers", (), {}),
+    ("get_products", "get_products", (), {}),
+    ("get_orders", "get_orders", (), {}),
+    ("get_order_details", "get_order_details", (), {}),
+    ("get_sales_by_category", "get_sales_by_category", (), {}),
+    ("get_sales_by_segment", "get_sales_by_segment", (), {}),
+    ("get_top_products", "get_top_products", (), {}),
+    ("get_top_customers", "get_top_customers", (), {}),
+    ("get_top_products_2017", "get_top_products", (), {"start_date": "2017-01-01", "end_date": "2017-12-31"}),
+    ("get_top_products_adhoc", "get_top_products", (), {"start_date": "2017-01-15", "end_date": "2017-06-30"}),
+    ("get_sales_trend_monthly", "get_sales_trend_monthly", (), {}),
+    ("get_sales_trend_2017", "get_sales_trend_monthly", (), {"start_date": "2017-01-01", "end_date": "2017-12-31"}),
+    ("get_top_sellers", "get_top_sellers", (), {}),
+    ("get_seller_performance", "get_seller_performance", (), {}),
+    ("get_profit_by_category", "get_profit_by_category", (), {}),
+    ("get_loss_products", "get_loss_products", (), {}),
+    ("get_kpi_summary", "get_kpi_summary", (), {"approximate": False}),
+    ("get_kpi_summary_approx", "get_kpi_summary", (), {"approximate": True}),
+    ("get_sales_by_segment_approx", "get_sales_by_segment", (), {"approximate": True}),
+    ("get_order_invoice", "get_order_invoice", ("CA-2016-152156",), {}),
+    ("search_orders", "search_orders", ("Smith",), {}),
+    ("get_rfm_analysis", "get_rfm_analysis", (), {}),
+    ("get_rfm_segment_summary", "get_rfm_segment_summary", (), {}),
+]
+
+JOIN_NODES = {"Hash Join", "Merge Join", "Nested Loop"}
+
+# ==============================
+# SEED DATABASE
+# ==============================
+def bench_dsn(scale):
+    params = dict(p.split("=", 1) for p in ADMIN_DSN.split())
+    params["dbname"] = f"superstore_bench_s{scale}"
+    return " ".join(f"{k}={v}" for k, v in params.items())
+
+def recreate_database(scale):
+    admin = psycopg2.connect(ADMIN_DSN)
+    admin.autocommit = True
+    cur = admin.cursor()
+    name = f"superstore_bench_s{scale}"
+    cur.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(name)))
+    cur.execute(sql.SQL("CREATE DATABASE {} ENCODING 'UTF8' TEMPLATE template0").format(sql.Identifier(name)))
+    cur.close()
+    admin.close()
+
+def drop_database(scale):
+    admin = psycopg2.connect(ADMIN_DSN)
+    admin.autocommit = True
+    cur = admin.cursor()
+    cur.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(
+        sql.Identifier(f"superstore_bench_s{scale}")
+    ))
+    cur.close()
+    admin.close()
+
+def copy_frame(cur, table, df):
+    """Bulk load DataFrame ke tabel lewat COPY FROM STDIN"""
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    columns = ", ".join(df.columns)
+    cur.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+
+def build_source(scale):
+    """Replikasi Superstore.xls sebanyak scale kali (order & customer baru per salinan)"""
+    base = pd.read_excel(EXCEL_FILE)
+    base.columns = [c.strip() for c in base.columns]
+    copies = []
+    for k in range(scale):
+        part = base.copy()
+        if k:
+            part["Order ID"] = part["Order ID"] + f"-{k}"
+            part["Customer ID"] = part["Customer ID"] + f"-{k}"
+        copies.append(part)
+    return pd.concat(copies, ignore_index=True)
+
+def seed_database(conn, scale):
+    """Isi database bench lengkap: OLTP, partisi, customer_rfm & star schema"""
+    random.seed(42)
+    df = build_source(scale)
+    cur = conn.cursor()
+    with open(SCHEMA_FILE) as f:
+        cur.execute(f.read())
+    conn.commit()
+
+    categories = pd.DataFrame({"category_name": sorted(df["Category"].unique())})
+    categories.insert(0, "category_id", range(1, len(categories) + 1))
+    cat_ids = dict(zip(categories["category_name"], categories["category_id"]))
+
+    subcategories = df[["Category", "Sub-Category"]].drop_duplicates().sort_values(["Category", "Sub-Category"])
+    subcategories = pd.DataFrame({
+        "subcategory_id": range(1, len(subcategories) + 1),
+        "category_id": subcategories["Category"].map(cat_ids).values,
+        "subcategory_name": subcategories["Sub-Category"].values,
+    })
+    sub_ids = {
+        (cid, name): sid for sid, cid, name in subcategories.itertuples(index=False)
+    }
+
+    customers = df.drop_duplicates("Customer ID")[[
+        "Customer ID", "Customer Name", "Segment", "Country", "City", "State", "Postal Code", "Region"
+    ]]
+    customers.columns = ["customer_id", "customer_name", "segment", "country", "city", "state", "postal_code", "region"]
+
+    products = df.drop_duplicates("Product ID")[["Product ID", "Category", "Sub-Category", "Product Name"]].copy()
+    products["category_id"] = products["Category"].map(cat_ids)
+    products["subcategory_id"] = [sub_ids[(c, s)] for c, s in zip(products["category_id"], products["Sub-Category"])]
+    products = products.rename(columns={"Product ID": "product_id", "Product Name": "product_name"})
+    products = products[["product_id", "category_id", "subcategory_id", "product_name"]]
+
+    sellers = generate_sellers()
+    sellers_by_region = sellers.groupby("seller_region")["seller_id"].apply(list).to_dict()
+
+    orders = df.drop_duplicates("Order ID")[["Order ID", "Order Date", "Ship Date", "Ship Mode", "Customer ID"]]
+    orders.columns = ["order_id", "order_date", "ship_date", "ship_mode", "customer_id"]
+
+    details = df[["Order ID", "Order Date", "Product ID", "Sales", "Quantity", "Discount", "Profit", "Region"]].copy()
+    details.columns = ["order_id", "order_date", "product_id", "sales", "quantity", "discount", "profit", "region"]
+    all_sellers = sellers["seller_id"].tolist()
+    details["seller_id"] = [random.choice(sellers_by_region.get(r, all_sellers)) for r in details["region"]]
+    details = details.drop(columns=["region"])
+
+    for table, frame in (
+        ("categories", categories),
+        ("subcategories", subcategories),
+        ("customers", customers),
+        ("products", products),
+        ("sellers", sellers),
+    ):
+        copy_frame(cur, table, frame)
+    cur.execute("SELECT setval('categories_category_id_seq', (SELECT MAX(category_id) FROM categories));")
+    cur.execute("SELECT setval('subcategories_subcategory_id_seq', (SELECT MAX(subcategory_id) FROM subcategories));")
+    conn.commit()
+
+    ensure_partitions(conn, orders["order_date"].min().date(), orders["order_date"].max().date())
+    copy_frame(cur, "orders", orders)
+    copy_frame(cur, "order_details", details)
+    conn.commit()
+    cur.close()
+
+    refresh_customer_rfm(conn)
+    refresh_star_schema(conn, full=True)
+
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("VACUUM ANALYZE;")
+    cur.close()
+    conn.autocommit = False
+    return len(details)
+
+# ==============================
+# MEASURE
+# ==============================
+def index_parents(conn):
+    """Map nama index partisi -> index induknya (nama partisi di-generate Postgres)"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT child.relname, parent.relname
+        FROM pg_inherits i
+        INNER JOIN pg_class child ON child.oid = i.inhrelid
+        INNER JOIN pg_class parent ON parent.oid = i.inhparent
+        WHERE child.relkind = 'i'
+    """)
+    parents = dict(cur.fetchall())
+    cur.close()
+    return parents
+
+def _normalize(name):
+    # partisi bulanan & default diperlakukan sama dengan tabel induknya
+    return re.sub(r"_(\d{4}_\d{2}|default)(?=_|$)", "", name)
+
+def plan_shape(plan, parents=None):
+    """Ringkas plan EXPLAIN (FORMAT JSON) jadi list node scan & join yang unik.
+
+    parents: map index partisi -> index induk (lihat index_parents)
+    """
+    parents = parents or {}
+    shape = set()
+
+    def walk(node):
+        node_type = node["Node Type"]
+        if "Index Name" in node:
+            index = parents.get(node["Index Name"], node["Index Name"])
+            shape.add(f"{node_type} using {_normalize(index)}")
+        elif "Relation Name" in node:
+            shape.add(f"{node_type} on {_normalize(node['Relation Name'])}")
+        elif node_type in JOIN_NODES:
+            shape.add(node_type)
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return sorted(shape)
+
+def explain_shape(conn, query, params):
+    cur = conn.cursor()
+    cur.execute("EXPLAIN (FORMAT JSON) " + query.strip().rstrip(';'), params or None)
+    plan = cur.fetchone()[0]
+    cur.close()
+    return plan_shape(plan, index_parents(conn))
+
+def percentile(values, pct):
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+def run_cases(config, query_metrics, repeat):
+    results = {}
+    for case, func_name, args, kwargs in CASES:
+        func = getattr(config, func_name)
+        func(*args, **kwargs)  # warm-up (cache & plan)
+        query, params = query_metrics.last_sql()
+        timings = []
+        rows = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings.append((time.perf_counter() - start) * 1000)
+            rows = len(result)
+        results[case] = {
+            "rows": rows,
+            "p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(percentile(timings, 95), 2),
+            "max_ms": round(max(timings), 2),
+            "plan": explain_shape(config.readers.get(), query, params),
+        }
+        print(f"  {case:28s} p50={results[case]['p50_ms']:9.2f}ms  p95={results[case]['p95_ms']:9.2f}ms  rows={rows}")
+    return results
+
+def index_usage(conn, cases):
+    """Index di tabel order/fact beserta case yang plan-nya memakai index tsb.
+
+    Index tanpa pemakai dilaporkan supaya bisa dievaluasi (biaya write tanpa
+    manfaat baca).
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_index x
+        INNER JOIN pg_class c ON c.oid = x.indexrelid
+        INNER JOIN pg_class t ON t.oid = x.indrelid
+        WHERE t.relname IN ('orders', 'order_details', 'fact_order_line')
+        ORDER BY t.relname, c.relname
+    """)
+    usage = {name: [] for (name,) in cur.fetchall()}
+    cur.close()
+    for case, result in cases.items():
+        for node in result["plan"]:
+            if " using " not in node:
+                continue
+            name = node.split(" using ", 1)[1]
+            if name in usage and case not in usage[name]:
+                usage[name].append(case)
+    return usage
+
+def print_index_usage(usage):
+    print("  Index usage:")
+    for name, cases in usage.items():
+        status = ", ".join(cases) if cases else "TIDAK DIPAKAI"
+        print(f"    {name:40s} {status}")
+
+# ==============================
+# COMPARE
+# ==============================
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Return list pesan regresi (kosong kalau aman)"""
+    problems = []
+    for scale, cases in results.items():
+        base_cases = baseline.get(scale, {})
+        for case, current in cases.items():
+            base = base_cases.get(case)
+            if base is None:
+                continue
+            limit = base["p50_ms"] * (1 + tolerance)
+            if current["p50_ms"] > limit and current["p50_ms"] - base["p50_ms"] > min_delta_ms:
+                problems.append(
+                    f"[scale {scale}] {case}: p50 {current['p50_ms']}ms > baseline {base['p50_ms']}ms (+{tolerance:.0%})"
+                )
+            if current["plan"] != base["plan"]:
+                removed = sorted(set(base["plan"]) - set(current["plan"]))
+                added = sorted(set(current["plan"]) - set(base["plan"]))
+                problems.append(f"[scale {scale}] {case}: plan berubah, hilang={removed} baru={added}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark & regression check query config.py")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="kenaikan p50 yang masih diterima (0.5 = 50%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="abaikan selisih latency di bawah ini")
+    parser.add_argument("--keep-db", action="store_true", help="jangan drop database bench setelah selesai")
+    args = parser.parse_args()
+
+    # config.py harus di-import setelah database bench pertama siap
+    os.environ["SUPERSTORE_DSN"] = bench_dsn(args.scales[0])
+    # latency sudah dicatat di sini, slow-query log tidak perlu ikut bicara
+    os.environ.setdefault("SUPERSTORE_SLOW_QUERY_MS", "600000")
+    results = {}
+    config = query_metrics = None
+    for scale in args.scales:
+        print(f"Seeding scale {scale} ...")
+        recreate_database(scale)
+        conn = psycopg2.connect(bench_dsn(scale))
+        lines = seed_database(conn, scale)
+        conn.close()
+        print(f"  {lines:,} order lines")
+
+        if config is None:
+            import config
+            import query_metrics
+        else:
+            config.readers.close()
+            config.readers = ReaderPool([bench_dsn(scale)], writer=bench_dsn(scale))
+        results[str(scale)] = run_cases(config, query_metrics, args.repeat)
+        print_index_usage(index_usage(config.readers.get(), results[str(scale)]))
+
+        if not args.keep_db:
+            config.readers.close()
+            drop_database(scale)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Hasil disimpan di {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline di-update: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Baseline {args.baseline} belum ada, jalankan dengan --update-baseline dulu")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    problems = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    for problem in problems:
+        print("REGRESI", problem)
+    if problems:
+        return 1
+    print("Tidak ada regresi terhadap baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# charts.py
+# Helper rendering chart Plotly untuk data besar.
+#
+# Figure Plotly dikirim ke browser sebagai JSON berisi semua titik, jadi
+# chart per seller/produk membengkak begitu entity-nya ribuan. Di sini data
+# dikecilkan di server sebelum jadi figure:
+# - bar: hanya BAR_BUDGET bar teratas (limit_bars)
+# - scatter: di atas POINT_BUDGET titik di-bin ke grid, satu titik per sel
+#   (posisi rata-rata, ukuran = jumlah titik asli) (bin_points)
+# - scatter di atas WEBGL_THRESHOLD titik digambar dengan WebGL (scattergl)
+# - fit_figure membangun ulang figure dengan budget setengahnya sampai JSON
+#   figure <= MAX_FIGURE_BYTES
+import os
+import logging
+
+import numpy as np
+
+logger = logging.getLogger("superstore.charts")
+
+# Maksimal titik per figure sebelum di-bin
+POINT_BUDGET = int(os.environ.get("SUPERSTORE_CHART_POINT_BUDGET", "2000"))
+# Maksimal bar per chart bar
+BAR_BUDGET = 50
+# Mulai jumlah titik ini scatter memakai WebGL (sama dengan render_mode='auto' plotly express)
+WEBGL_THRESHOLD = 1000
+# Batas ukuran JSON satu figure (bytes)
+MAX_FIGURE_BYTES = int(os.environ.get("SUPERSTORE_CHART_MAX_BYTES", str(1024 * 1024)))
+MIN_POINT_BUDGET = 100
+
+def render_mode(points):
+    """render_mode plotly express untuk jumlah titik points"""
+    return 'webgl' if points > WEBGL_THRESHOLD else 'svg'
+
+def limit_bars(data, value, budget=BAR_BUDGET):
+    """budget baris dengan value terbesar, urutan baris asli dipertahankan"""
+    if len(data) <= budget:
+        return data
+    return data.loc[data[value].nlargest(budget, keep='first').index.sort_values()]
+
+def _bin_index(values, bins):
+    lo, hi = values.min(), values.max()
+    if not hi > lo:
+        return np.zeros(len(values), dtype=np.int64)
+    return np.minimum(((values - lo) / (hi - lo) * bins).astype(np.int64), bins - 1)
+
+def bin_points(data, x, y, budget=POINT_BUDGET, by=None, sums=()):
+    """Kecilkan scatter jadi <= budget titik dengan grid binning.
+
+    Titik di satu sel grid (per grup by, kalau diisi) digabung: x/y = rata-rata,
+    'points' = jumlah titik asli, kolom sums dijumlahkan. Data yang sudah
+    <= budget dikembalikan apa adanya dengan points = 1.
+    """
+    data = data.dropna(subset=[x, y])
+    if len(data) <= budget:
+        return data.assign(points=1)
+    groups = data[by].nunique() if by else 1
+    side = max(1, int(np.sqrt(budget / groups)))
+    cell = (
+        _bin_index(data[x].to_numpy(dtype=float), side) * side
+        + _bin_index(data[y].to_numpy(dtype=float), side)
+    )
+    aggs = {x: (x, 'mean'), y: (y, 'mean'), 'points': (x, 'size')}
+    aggs.update({col: (col, 'sum') for col in sums})
+    keys = [by, '_cell'] if by else ['_cell']
+    result = data.assign(_cell=cell).groupby(keys, observed=True, sort=False).agg(**aggs)
+    logger.debug("bin_points %s vs %s: %d -> %d titik", x, y, len(data), len(result))
+    return result.reset_index().drop(columns='_cell')
+
+def figure_bytes(fig):
+    """Ukuran JSON figure yang dikirim ke browser"""
+    return len(fig.to_json())
+
+def fit_figure(build, budget=POINT_BUDGET, max_bytes=MAX_FIGURE_BYTES):
+    """build(budget) -> Figure; budget dipotong setengah sampai JSON figure <= max_bytes"""
+    while True:
+        fig = build(budget)
+        size = figure_bytes(fig)
+        if size <= max_bytes or budget <= MIN_POINT_BUDGET:
+            if size > max_bytes:
+                logger.warning("figure %d bytes melewati batas %d", size, max_bytes)
+            return fig
+        budget //= 2
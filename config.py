@@ -1,23 +1,170 @@
-import psycopg2
+import os
 import pandas as pd
 
+from db import ReaderPool
+from extract import read_sql_copy
+from frames import compact_frame
+from query_metrics import instrument, record_sql
+from sketches import merge_cells
+from leaderboards import LEADERBOARD_SIZE
 
-conn = psycopg2.connect(
-    dbname="superstore",
-    user="postgres",
-    password="2436",
-    host="localhost",
-    port="5432"
-)
 
+# Query dashboard dibaca dari reader (replica, round-robin dengan cek lag);
+# DSN writer/reader diatur di db.py (env SUPERSTORE_*_DSN atau db.ini)
+readers = ReaderPool()
 
+# Engine untuk extract besar (load_data & get_* full table):
+# "copy" = COPY ... TO STDOUT (cepat), "read_sql" = pd.read_sql biasa
+EXTRACT_ENGINE = os.environ.get("SUPERSTORE_EXTRACT_ENGINE", "copy")
 
-def load_data():
-    """Load semua data dengan JOIN 7 tabel (termasuk categories & subcategories)"""
-    query = """
+# Backend query: "postgres" (default) atau "duckdb" = DuckDB in-process di atas
+# snapshot Parquet hasil ETL (lihat snapshot.py), tanpa koneksi ke Postgres
+BACKEND = os.environ.get("SUPERSTORE_BACKEND", "postgres")
+if BACKEND == "duckdb":
+    from snapshot import open_snapshot, read_snapshot
+    duck = open_snapshot()
+else:
+    duck = None
+
+# Mode approximate: distinct count & quantile dari sketch di kpi_sketches
+# (lihat sketches.py). Bisa di-override per panggilan dengan approximate=True/False
+APPROXIMATE = os.environ.get("SUPERSTORE_APPROXIMATE", "0") == "1"
+
+# Semua fungsi query di bawah dicatat latency/rows/bytes-nya (lihat query_metrics.py)
+instrumented = instrument(get_conn=None if duck is not None else lambda: readers.get())
+
+def _read(query, params=None, large=False):
+    """Jalankan query dan kembalikan DataFrame.
+
+    large=True untuk hasil besar: lewat COPY TO STDOUT kalau EXTRACT_ENGINE="copy".
+    """
+    record_sql(query, params)
+    if duck is not None:
+        return read_snapshot(duck, query, params)
+    # koneksi pinjaman per call: query dari thread berbeda (load paralel di
+    # app.py, session Streamlit lain) tidak antre di satu koneksi
+    with readers.connection() as conn:
+        if large and EXTRACT_ENGINE == "copy":
+            return read_sql_copy(query, conn, params=params)
+        return pd.read_sql(query, conn, params=params or None)
+
+
+def _date_filter(columns, start_date=None, end_date=None):
+    """Filter rentang tanggal (inklusif) pada kolom partisi order_date.
+
+    Filter langsung di kolom partition key supaya Postgres hanya membaca
+    partisi bulanan yang dibutuhkan (partition pruning). Untuk query yang
+    JOIN orders, kirim kedua kolom karena filter range tidak diturunkan
+    otomatis lewat kondisi JOIN.
+    """
+    if isinstance(columns, str):
+        columns = (columns,)
+    conditions = []
+    params = {}
+    for column in columns:
+        if start_date is not None:
+            conditions.append(f"{column} >= %(start_date)s")
+            params['start_date'] = start_date
+        if end_date is not None:
+            conditions.append(f"{column} <= %(end_date)s")
+            params['end_date'] = end_date
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    return where, params
+
+
+def _approximate(approximate):
+    return APPROXIMATE if approximate is None else approximate
+
+
+def _leaderboard_period(start_date=None, end_date=None):
+    """Periode tabel leaderboards yang persis sama dengan rentang tanggal.
+
+    Tanpa filter -> 'all', 1 Jan s/d 31 Des -> 'YYYY', tanggal 1 s/d akhir
+    bulan -> 'YYYY-MM'. Rentang lain return None (query exact ke fact).
+    """
+    if start_date is None and end_date is None:
+        return 'all'
+    if start_date is None or end_date is None:
+        return None
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    if start != start.normalize() or end != end.normalize() or start.day != 1:
+        return None
+    if end == start + pd.offsets.MonthEnd(0):
+        return start.strftime('%Y-%m')
+    if start.month == 1 and end == start + pd.offsets.YearEnd(0):
+        return start.strftime('%Y')
+    return None
+
+
+def _leaderboard(dimension, limit, start_date=None, end_date=None):
+    """Parameter query leaderboards, atau None kalau harus query exact"""
+    period = _leaderboard_period(start_date, end_date)
+    if period is None or int(limit) > LEADERBOARD_SIZE:
+        return None
+    return {'dimension': dimension, 'period': period, 'limit': int(limit)}
+
+
+def _kpi_cells(start_date=None, end_date=None):
+    """Cell kpi_sketches yang bulannya beririsan dengan rentang tanggal.
+
+    Granularitas sketch per bulan: start_date/end_date di tengah bulan
+    tetap mengikutkan bulan tersebut secara penuh.
+    """
+    conditions = []
+    params = {}
+    if start_date is not None:
+        conditions.append("month >= DATE_TRUNC('month', CAST(%(start_date)s AS DATE))")
+        params['start_date'] = start_date
+    if end_date is not None:
+        conditions.append("month <= CAST(%(end_date)s AS DATE)")
+        params['end_date'] = end_date
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    query = f"""
+    SELECT 
+        month,
+        segment,
+        region,
+        line_count,
+        sales,
+        profit,
+        customers_hll,
+        orders_hll,
+        order_value_sketch
+    FROM kpi_sketches
+    {where};
+    """
+    return _read(query, params)
+
+
+@instrumented
+def load_data(start_date=None, end_date=None, compact=False):
+    """Load semua data dari fact_order_line + 4 dimensi (JOIN lewat surrogate key INTEGER)
+
+    compact=True mengembalikan frame ber-dtype hemat memori (lihat frames.py).
+    """
+    query, params = load_data_sql(start_date, end_date)
+    
+    # Load data
+    data = _read(query, params, large=True)
+    
+    # Convert numeric columns
+    numeric_cols = ['quantity', 'sales', 'profit', 'discount', 'seller_rating']
+    for col in numeric_cols:
+        if col in data.columns:
+            data[col] = pd.to_numeric(data[col], errors='coerce')
+    
+    if compact:
+        data = compact_frame(data)
+    
+    return data
+
+def load_data_sql(start_date=None, end_date=None):
+    """(query, params) load_data, juga dipakai export.py"""
+    where, params = _date_filter("f.order_date", start_date, end_date)
+    query = f"""
     SELECT 
         o.order_id,
-        o.order_date, 
+        f.order_date, 
         o.ship_date,
         o.ship_mode,
         c.customer_id,
@@ -29,38 +176,75 @@ def load_data():
         c.postal_code,
         c.region,
         p.product_id,
-        cat.category_name as category,
-        sub.subcategory_name as sub_category,
+        p.category_name as category,
+        p.subcategory_name as sub_category,
         p.product_name,
         s.seller_id,
         s.seller_name,
         s.seller_region,
         s.seller_rating,
-        d.quantity, 
-        d.sales, 
-        d.discount, 
-        d.profit
-    FROM order_details d
-    INNER JOIN orders o ON d.order_id = o.order_id
-    INNER JOIN customers c ON o.customer_id = c.customer_id
-    INNER JOIN products p ON d.product_id = p.product_id
-    INNER JOIN categories cat ON p.category_id = cat.category_id
-    INNER JOIN subcategories sub ON p.subcategory_id = sub.subcategory_id
-    INNER JOIN sellers s ON d.seller_id = s.seller_id
-    ORDER BY o.order_date DESC;
+        f.quantity, 
+        f.sales, 
+        f.discount, 
+        f.profit
+    FROM fact_order_line f
+    INNER JOIN dim_order o ON f.order_key = o.order_key
+    INNER JOIN dim_customer c ON f.customer_key = c.customer_key
+    INNER JOIN dim_product p ON f.product_key = p.product_key
+    INNER JOIN dim_seller s ON f.seller_key = s.seller_key
+    {where}
+    ORDER BY f.order_date DESC;
     """
-    
-    # Load data
-    data = pd.read_sql(query, conn)
-    
-    # Convert numeric columns
-    numeric_cols = ['quantity', 'sales', 'profit', 'discount', 'seller_rating']
-    for col in numeric_cols:
-        if col in data.columns:
-            data[col] = pd.to_numeric(data[col], errors='coerce')
-    
-    return data
+    return query, params
+
+# Kolom dimensi yang dimuat filter_store.py (key surrogate + atribut untuk filter/label)
+STORE_DIMENSIONS = {
+    'dim_order': ['order_key', 'order_id'],
+    'dim_customer': ['customer_key', 'customer_name', 'segment', 'region'],
+    'dim_product': ['product_key', 'product_name', 'category_name'],
+    'dim_seller': ['seller_key', 'seller_name', 'seller_region', 'seller_rating'],
+}
+
+@instrumented
+def load_fact_columns():
+    """Fact order line versi sempit (key + measure) untuk store kolumnar filter_store.py"""
+    query = """
+    SELECT 
+        order_date,
+        order_key,
+        customer_key,
+        product_key,
+        COALESCE(seller_key, 0) as seller_key,
+        quantity,
+        sales,
+        COALESCE(profit, 0) as profit
+    FROM fact_order_line;
+    """
+    return _read(query, large=True)
+
+@instrumented
+def load_dimension(table):
+    """Kolom STORE_DIMENSIONS[table] dari satu tabel dimensi"""
+    columns = ", ".join(STORE_DIMENSIONS[table])
+    key = STORE_DIMENSIONS[table][0]
+    return _read(f"SELECT {columns} FROM {table} ORDER BY {key};", large=True)
+
+@instrumented
+def get_filter_options():
+    """Nilai yang bisa dipilih di filter sidebar: kolom filter (region/segment/category/seller) & value"""
+    query = """
+    SELECT 'region' as filter, region::text as value FROM dim_customer WHERE region IS NOT NULL GROUP BY region
+    UNION ALL
+    SELECT 'segment', segment::text FROM dim_customer WHERE segment IS NOT NULL GROUP BY segment
+    UNION ALL
+    SELECT 'category', category_name FROM dim_product GROUP BY category_name
+    UNION ALL
+    SELECT 'seller', seller_name FROM dim_seller GROUP BY seller_name
+    ORDER BY filter, value;
+    """
+    return _read(query)
 
+@instrumented
 def get_categories():
     query = """
     SELECT 
@@ -70,9 +254,10 @@ def get_categories():
     FROM categories
     ORDER BY category_id;
     """
-    return pd.read_sql(query, conn)
+    return _read(query, large=True)
 
 
+@instrumented
 def get_subcategories():
     query = """
     SELECT
@@ -82,9 +267,10 @@ def get_subcategories():
     FROM subcategories
     ORDER BY subcategory_id;
     """
-    return pd.read_sql(query, conn)
+    return _read(query, large=True)
 
 
+@instrumented
 def get_sellers():
     query = """
     SELECT
@@ -98,9 +284,10 @@ def get_sellers():
     FROM sellers
     ORDER BY seller_id;
     """
-    return pd.read_sql(query, conn)
+    return _read(query, large=True)
 
 
+@instrumented
 def get_customers():
     query = """
     SELECT
@@ -115,9 +302,10 @@ def get_customers():
     FROM customers
     ORDER BY customer_id;
     """
-    return pd.read_sql(query, conn)
+    return _read(query, large=True)
 
 
+@instrumented
 def get_products():
     query = """
     SELECT
@@ -128,10 +316,15 @@ def get_products():
     FROM products
     ORDER BY product_id;
     """
-    return pd.read_sql(query, conn)
+    return _read(query, large=True)
 
 
+@instrumented
 def get_orders():
+    query, params = get_orders_sql()
+    return _read(query, params, large=True)
+
+def get_orders_sql():
     query = """
     SELECT
         order_id,
@@ -142,14 +335,20 @@ def get_orders():
     FROM orders
     ORDER BY order_date DESC;
     """
-    return pd.read_sql(query, conn)
+    return query, {}
 
 
+@instrumented
 def get_order_details():
+    query, params = get_order_details_sql()
+    return _read(query, params, large=True)
+
+def get_order_details_sql():
     query = """
     SELECT
         id,
         order_id,
+        order_date,
         product_id,
         seller_id,
         sales,
@@ -159,193 +358,449 @@ def get_order_details():
     FROM order_details
     ORDER BY id;
     """
-    return pd.read_sql(query, conn)
+    return query, {}
 
 
-def get_sales_by_category():
+@instrumented
+def get_sales_by_category(start_date=None, end_date=None):
     """Query optimized: Sales per kategori"""
-    query = """
+    query, params = get_sales_by_category_sql(start_date, end_date)
+    return _read(query, params)
+
+def get_sales_by_category_sql(start_date=None, end_date=None):
+    where, params = _date_filter("f.order_date", start_date, end_date)
+    query = f"""
     SELECT 
-        cat.category_name as category,
-        COUNT(d.id) as total_orders,
-        SUM(d.quantity) as total_quantity,
-        SUM(d.sales) as total_sales,
-        SUM(d.profit) as total_profit,
-        AVG(d.sales) as avg_sales
-    FROM order_details d
-    INNER JOIN products p ON d.product_id = p.product_id
-    INNER JOIN categories cat ON p.category_id = cat.category_id
-    GROUP BY cat.category_name
+        p.category_name as category,
+        COUNT(f.order_line_id) as total_orders,
+        SUM(f.quantity) as total_quantity,
+        SUM(f.sales) as total_sales,
+        SUM(f.profit) as total_profit,
+        AVG(f.sales) as avg_sales
+    FROM fact_order_line f
+    INNER JOIN dim_product p ON f.product_key = p.product_key
+    {where}
+    GROUP BY p.category_name
     ORDER BY total_sales DESC;
     """
-    return pd.read_sql(query, conn)
-
-def get_sales_by_segment():
-    """Query optimized: Sales per segment"""
-    query = """
+    return query, params
+
+@instrumented
+def get_sales_by_segment(start_date=None, end_date=None, approximate=None):
+    """Query optimized: Sales per segment (approximate: distinct count dari HyperLogLog)"""
+    if _approximate(approximate):
+        result = merge_cells(_kpi_cells(start_date, end_date), ['segment'])
+        result = result[['segment', 'total_orders', 'total_customers', 'total_sales', 'total_profit']]
+        return result.sort_values('total_sales', ascending=False, ignore_index=True)
+    where, params = _date_filter("f.order_date", start_date, end_date)
+    query = f"""
     SELECT 
         c.segment,
-        COUNT(DISTINCT o.order_id) as total_orders,
-        COUNT(DISTINCT c.customer_id) as total_customers,
-        SUM(d.sales) as total_sales,
-        SUM(d.profit) as total_profit
-    FROM order_details d
-    INNER JOIN orders o ON d.order_id = o.order_id
-    INNER JOIN customers c ON o.customer_id = c.customer_id
+        COUNT(DISTINCT f.order_key) as total_orders,
+        COUNT(DISTINCT f.customer_key) as total_customers,
+        SUM(f.sales) as total_sales,
+        SUM(f.profit) as total_profit
+    FROM fact_order_line f
+    INNER JOIN dim_customer c ON f.customer_key = c.customer_key
+    {where}
     GROUP BY c.segment
     ORDER BY total_sales DESC;
     """
-    return pd.read_sql(query, conn)
-
-def get_top_products(limit=10):
-    """Query optimized: Top produk terlaris"""
+    return _read(query, params)
+
+@instrumented
+def get_top_products(limit=10, start_date=None, end_date=None):
+    """Query optimized: Top produk terlaris (dari tabel leaderboards kalau periodenya pas)"""
+    params = _leaderboard('product', limit, start_date, end_date)
+    if params is not None:
+        query = """
+        SELECT 
+            p.product_name,
+            p.category_name as category,
+            p.subcategory_name as sub_category,
+            l.line_count as order_count,
+            l.quantity as total_quantity,
+            l.sales as total_sales,
+            l.profit as total_profit
+        FROM leaderboards l
+        INNER JOIN dim_product p ON l.entity_key = p.product_key
+        WHERE l.dimension = %(dimension)s AND l.period = %(period)s AND l.rank <= %(limit)s
+        ORDER BY l.rank;
+        """
+        return _read(query, params)
+    where, params = _date_filter("f.order_date", start_date, end_date)
     query = f"""
     SELECT 
         p.product_name,
-        cat.category_name as category,
-        sub.subcategory_name as sub_category,
-        COUNT(d.id) as order_count,
-        SUM(d.quantity) as total_quantity,
-        SUM(d.sales) as total_sales,
-        SUM(d.profit) as total_profit
-    FROM order_details d
-    INNER JOIN products p ON d.product_id = p.product_id
-    INNER JOIN categories cat ON p.category_id = cat.category_id
-    INNER JOIN subcategories sub ON p.subcategory_id = sub.subcategory_id
-    GROUP BY p.product_id, p.product_name, cat.category_name, sub.subcategory_name
-    ORDER BY total_sales DESC
+        p.category_name as category,
+        p.subcategory_name as sub_category,
+        COUNT(f.order_line_id) as order_count,
+        SUM(f.quantity) as total_quantity,
+        SUM(f.sales) as total_sales,
+        SUM(f.profit) as total_profit
+    FROM fact_order_line f
+    INNER JOIN dim_product p ON f.product_key = p.product_key
+    {where}
+    GROUP BY p.product_key, p.product_name, p.category_name, p.subcategory_name
+    ORDER BY total_sales DESC, p.product_key
     LIMIT {limit};
     """
-    return pd.read_sql(query, conn)
-
-def get_top_customers(limit=10):
-    """Query optimized: Top customer berdasarkan total pembelian"""
+    return _read(query, params)
+
+@instrumented
+def get_top_customers(limit=10, start_date=None, end_date=None):
+    """Query optimized: Top customer berdasarkan total pembelian (dari tabel leaderboards kalau periodenya pas)"""
+    params = _leaderboard('customer', limit, start_date, end_date)
+    if params is not None:
+        query = """
+        SELECT 
+            c.customer_name,
+            c.segment,
+            c.region,
+            l.order_count as total_orders,
+            l.sales as total_sales,
+            l.profit as total_profit,
+            l.sales / l.line_count as avg_order_value
+        FROM leaderboards l
+        INNER JOIN dim_customer c ON l.entity_key = c.customer_key
+        WHERE l.dimension = %(dimension)s AND l.period = %(period)s AND l.rank <= %(limit)s
+        ORDER BY l.rank;
+        """
+        return _read(query, params)
+    where, params = _date_filter("f.order_date", start_date, end_date)
     query = f"""
     SELECT 
         c.customer_name,
         c.segment,
         c.region,
-        COUNT(DISTINCT o.order_id) as total_orders,
-        SUM(d.sales) as total_sales,
-        SUM(d.profit) as total_profit,
-        AVG(d.sales) as avg_order_value
-    FROM customers c
-    INNER JOIN orders o ON c.customer_id = o.customer_id
-    INNER JOIN order_details d ON o.order_id = d.order_id
-    GROUP BY c.customer_id, c.customer_name, c.segment, c.region
-    ORDER BY total_sales DESC
+        COUNT(DISTINCT f.order_key) as total_orders,
+        SUM(f.sales) as total_sales,
+        SUM(f.profit) as total_profit,
+        AVG(f.sales) as avg_order_value
+    FROM fact_order_line f
+    INNER JOIN dim_customer c ON f.customer_key = c.customer_key
+    {where}
+    GROUP BY c.customer_key, c.customer_name, c.segment, c.region
+    ORDER BY total_sales DESC, c.customer_key
     LIMIT {limit};
     """
-    return pd.read_sql(query, conn)
-
-def get_sales_trend_monthly():
-    """Query optimized: Trend penjualan per bulan"""
-    query = """
+    return _read(query, params)
+
+@instrumented
+def get_sales_trend_monthly(start_date=None, end_date=None, approximate=None):
+    """Query optimized: Trend penjualan per bulan langsung dari fact_order_line
+    (approximate: dari rollup kpi_sketches)"""
+    if _approximate(approximate):
+        result = merge_cells(_kpi_cells(start_date, end_date), ['month'])
+        result['month'] = pd.to_datetime(result['month']).astype('datetime64[us]').dt.tz_localize('UTC')
+        result['avg_sales'] = result['total_sales'] / result['line_count']
+        return result[['month', 'total_orders', 'total_sales', 'total_profit', 'avg_sales']]
+    where, params = _date_filter("f.order_date", start_date, end_date)
+    query = f"""
     SELECT 
-        DATE_TRUNC('month', o.order_date) as month,
-        COUNT(DISTINCT o.order_id) as total_orders,
-        SUM(d.sales) as total_sales,
-        SUM(d.profit) as total_profit,
-        AVG(d.sales) as avg_sales
-    FROM order_details d
-    INNER JOIN orders o ON d.order_id = o.order_id
-    GROUP BY DATE_TRUNC('month', o.order_date)
+        DATE_TRUNC('month', f.order_date::timestamptz) as month,
+        COUNT(DISTINCT f.order_key) as total_orders,
+        SUM(f.sales) as total_sales,
+        SUM(f.profit) as total_profit,
+        AVG(f.sales) as avg_sales
+    FROM fact_order_line f
+    {where}
+    GROUP BY DATE_TRUNC('month', f.order_date::timestamptz)
     ORDER BY month;
     """
-    return pd.read_sql(query, conn)
-
-def get_top_sellers(limit=10):
-    """Query: Top sellers berdasarkan total sales"""
+    return _read(query, params)
+
+@instrumented
+def get_top_sellers(limit=10, start_date=None, end_date=None):
+    """Query: Top sellers berdasarkan total sales (dari tabel leaderboards kalau periodenya pas)"""
+    params = _leaderboard('seller', limit, start_date, end_date)
+    if params is not None:
+        query = """
+        SELECT 
+            s.seller_name,
+            s.seller_region,
+            s.seller_rating,
+            l.line_count as total_orders,
+            l.quantity as total_quantity,
+            l.sales as total_sales,
+            l.profit as total_profit,
+            ROUND(l.profit / l.line_count, 2) as avg_profit_per_order
+        FROM leaderboards l
+        INNER JOIN dim_seller s ON l.entity_key = s.seller_key
+        WHERE l.dimension = %(dimension)s AND l.period = %(period)s AND l.rank <= %(limit)s
+        ORDER BY l.rank;
+        """
+        return _read(query, params)
+    where, params = _date_filter("f.order_date", start_date, end_date)
     query = f"""
     SELECT 
         s.seller_name,
         s.seller_region,
         s.seller_rating,
-        COUNT(d.id) as total_orders,
-        SUM(d.quantity) as total_quantity,
-        SUM(d.sales) as total_sales,
-        SUM(d.profit) as total_profit,
-        ROUND(AVG(d.profit), 2) as avg_profit_per_order
-    FROM order_details d
-    INNER JOIN sellers s ON d.seller_id = s.seller_id
-    GROUP BY s.seller_id, s.seller_name, s.seller_region, s.seller_rating
-    ORDER BY total_sales DESC
+        COUNT(f.order_line_id) as total_orders,
+        SUM(f.quantity) as total_quantity,
+        SUM(f.sales) as total_sales,
+        SUM(f.profit) as total_profit,
+        ROUND(AVG(f.profit), 2) as avg_profit_per_order
+    FROM fact_order_line f
+    INNER JOIN dim_seller s ON f.seller_key = s.seller_key
+    {where}
+    GROUP BY s.seller_key, s.seller_name, s.seller_region, s.seller_rating
+    ORDER BY total_sales DESC, s.seller_key
     LIMIT {limit};
     """
-    return pd.read_sql(query, conn)
+    return _read(query, params)
 
-def get_seller_performance():
+@instrumented
+def get_seller_performance(start_date=None, end_date=None):
     """Query: Performa seller berdasarkan rating vs profit"""
-    query = """
+    query, params = get_seller_performance_sql(start_date, end_date)
+    return _read(query, params)
+
+def get_seller_performance_sql(start_date=None, end_date=None):
+    where, params = _date_filter("f.order_date", start_date, end_date)
+    query = f"""
     SELECT 
         s.seller_name,
+        s.seller_region,
         s.seller_rating,
-        SUM(d.sales) as total_sales,
-        SUM(d.profit) as total_profit,
-        COUNT(d.id) as total_orders
-    FROM order_details d
-    INNER JOIN sellers s ON d.seller_id = s.seller_id
-    GROUP BY s.seller_id, s.seller_name, s.seller_rating
-    ORDER BY s.seller_rating DESC;
+        SUM(f.sales) as total_sales,
+        SUM(f.profit) as total_profit,
+        COUNT(f.order_line_id) as total_orders
+    FROM fact_order_line f
+    INNER JOIN dim_seller s ON f.seller_key = s.seller_key
+    {where}
+    GROUP BY s.seller_key, s.seller_name, s.seller_region, s.seller_rating
+    ORDER BY s.seller_rating DESC, s.seller_name;
     """
-    return pd.read_sql(query, conn)
+    return query, params
 
-def get_profit_by_category():
+@instrumented
+def get_profit_by_category(start_date=None, end_date=None):
     """Query optimized: Profit per kategori untuk stacked bar chart"""
-    query = """
+    query, params = get_profit_by_category_sql(start_date, end_date)
+    return _read(query, params)
+
+def get_profit_by_category_sql(start_date=None, end_date=None):
+    where, params = _date_filter("f.order_date", start_date, end_date)
+    query = f"""
     SELECT 
-        cat.category_name as category,
-        SUM(d.profit) as total_profit,
-        SUM(CASE WHEN d.profit > 0 THEN d.profit ELSE 0 END) as positive_profit,
-        SUM(CASE WHEN d.profit < 0 THEN d.profit ELSE 0 END) as negative_profit,
-        COUNT(d.id) as order_count
-    FROM order_details d
-    INNER JOIN products p ON d.product_id = p.product_id
-    INNER JOIN categories cat ON p.category_id = cat.category_id
-    GROUP BY cat.category_name
+        p.category_name as category,
+        SUM(f.profit) as total_profit,
+        SUM(CASE WHEN f.profit > 0 THEN f.profit ELSE 0 END) as positive_profit,
+        SUM(CASE WHEN f.profit < 0 THEN f.profit ELSE 0 END) as negative_profit,
+        COUNT(f.order_line_id) as order_count
+    FROM fact_order_line f
+    INNER JOIN dim_product p ON f.product_key = p.product_key
+    {where}
+    GROUP BY p.category_name
     ORDER BY total_profit DESC;
     """
-    return pd.read_sql(query, conn)
+    return query, params
 
-def get_order_invoice(order_id):
-    """Get complete invoice detail for specific order"""
+@instrumented
+def get_loss_products(top_n=15, start_date=None, end_date=None):
+    """Query optimized: Produk dengan quantity tinggi tapi profit negatif (pakai partial index profit < 0)"""
+    query, params = get_loss_products_sql(top_n, start_date, end_date)
+    return _read(query, params)
+
+def get_loss_products_sql(top_n=15, start_date=None, end_date=None):
+    where, params = _date_filter("f.order_date", start_date, end_date)
+    where = f"{where} AND f.profit < 0" if where else "WHERE f.profit < 0"
     query = f"""
     SELECT 
-        o.order_id,
-        o.order_date,
-        o.ship_date,
-        o.ship_mode,
-        c.customer_id,
+        p.product_name,
+        p.category_name as category,
+        SUM(f.quantity) as quantity,
+        SUM(f.profit) as profit
+    FROM fact_order_line f
+    INNER JOIN dim_product p ON f.product_key = p.product_key
+    {where}
+    GROUP BY p.product_name, p.category_name
+    ORDER BY quantity DESC, p.product_name
+    LIMIT {int(top_n)};
+    """
+    return query, params
+
+@instrumented
+def get_customer_spending(limit=20):
+    """Tabel overview: customer dengan total belanja terbesar (dari leaderboard_totals).
+
+    total_rows = jumlah semua customer, untuk keterangan "N dari total".
+    """
+    query = """
+    SELECT 
         c.customer_name,
-        c.segment,
-        c.country,
-        c.city,
-        c.state,
-        c.postal_code,
-        c.region,
-        p.product_id,
+        SUM(t.line_count) as total_orders,
+        SUM(t.sales) as total_sales,
+        SUM(t.profit) as total_profit,
+        COUNT(*) OVER () as total_rows
+    FROM leaderboard_totals t
+    INNER JOIN dim_customer c ON t.entity_key = c.customer_key
+    WHERE t.dimension = 'customer' AND t.period = 'all'
+    GROUP BY c.customer_name
+    ORDER BY total_sales DESC, c.customer_name
+    LIMIT %(limit)s;
+    """
+    return _read(query, {'limit': int(limit)})
+
+@instrumented
+def get_product_sales(limit=20):
+    """Tabel overview: produk dengan quantity terjual terbanyak (dari leaderboard_totals)"""
+    query = """
+    SELECT 
         p.product_name,
-        cat.category_name,
-        sub.subcategory_name,
-        s.seller_name,
-        s.seller_region,
-        d.quantity,
-        d.sales,
-        d.discount,
-        d.profit
+        p.category_name as category,
+        SUM(t.quantity) as total_quantity,
+        SUM(t.sales) as total_sales,
+        SUM(t.profit) as total_profit,
+        COUNT(*) OVER () as total_rows
+    FROM leaderboard_totals t
+    INNER JOIN dim_product p ON t.entity_key = p.product_key
+    WHERE t.dimension = 'product' AND t.period = 'all'
+    GROUP BY p.product_name, p.category_name
+    ORDER BY total_quantity DESC, p.product_name, p.category_name
+    LIMIT %(limit)s;
+    """
+    return _read(query, {'limit': int(limit)})
+
+@instrumented
+def get_recent_orders(limit=20):
+    """Tabel overview: order terbaru + total per order (index dim_order(order_date DESC))"""
+    query = """
+    SELECT 
+        o.order_id,
+        c.customer_name,
+        o.order_date,
+        SUM(f.sales) as total_sales,
+        SUM(f.profit) as total_profit,
+        COUNT(*) as items_count,
+        (SELECT COUNT(*) FROM dim_order) as total_rows
+    FROM (
+        SELECT order_key, order_id, order_date
+        FROM dim_order
+        ORDER BY order_date DESC, order_id
+        LIMIT %(limit)s
+    ) o
+    INNER JOIN fact_order_line f ON f.order_key = o.order_key AND f.order_date = o.order_date
+    INNER JOIN dim_customer c ON f.customer_key = c.customer_key
+    GROUP BY o.order_id, o.order_date, c.customer_name
+    ORDER BY o.order_date DESC, o.order_id;
+    """
+    return _read(query, {'limit': int(limit)})
+
+@instrumented
+def get_data_summary():
+    """Ringkasan murah untuk sidebar: jumlah order line & rentang bulan (dari kpi_sketches)"""
+    query = """
+    SELECT 
+        COALESCE(SUM(line_count), 0) as total_records,
+        MIN(month) as first_month,
+        MAX(month) as last_month
+    FROM kpi_sketches;
+    """
+    result = _read(query)
+    for col in ('first_month', 'last_month'):
+        result[col] = pd.to_datetime(result[col])
+    return result
+
+@instrumented
+def get_kpi_summary(start_date=None, end_date=None, approximate=None):
+    """KPI tile: distinct customer & order, total sales/profit dan quantile nilai order.
+
+    approximate=True me-merge sketch di kpi_sketches (tanpa scan fact_order_line).
+    """
+    if _approximate(approximate):
+        result = merge_cells(_kpi_cells(start_date, end_date))
+        return result.drop(columns='line_count')
+    where, params = _date_filter("f.order_date", start_date, end_date)
+    query = f"""
+    WITH order_values AS (
+        SELECT 
+            f.order_key,
+            f.customer_key,
+            SUM(f.sales) as order_value,
+            SUM(f.profit) as profit
+        FROM fact_order_line f
+        {where}
+        GROUP BY f.order_key, f.customer_key
+    )
+    SELECT 
+        COUNT(DISTINCT customer_key) as total_customers,
+        COUNT(*) as total_orders,
+        SUM(order_value) as total_sales,
+        SUM(profit) as total_profit,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY order_value) as order_value_p50,
+        PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY order_value) as order_value_p90,
+        PERCENTILE_CONT(0.99) WITHIN GROUP (ORDER BY order_value) as order_value_p99
+    FROM order_values;
+    """
+    return _read(query, params)
+
+# Kolom line invoice (alias.kolom) hasil _invoice_lines
+INVOICE_SELECT = [
+    'o.order_id', 'o.order_date', 'o.ship_date', 'o.ship_mode',
+    'c.customer_id', 'c.customer_name', 'c.segment', 'c.country', 'c.city',
+    'c.state', 'c.postal_code', 'c.region',
+    'p.product_id', 'p.product_name', 'cat.category_name', 'sub.subcategory_name',
+    's.seller_name', 's.seller_region',
+    'd.quantity', 'd.sales', 'd.discount', 'd.profit',
+]
+INVOICE_COLUMNS = [column.split('.')[1] for column in INVOICE_SELECT]
+
+def _invoice_lines(order_ids):
+    """Semua line invoice untuk list order_id dalam satu query.
+
+    order_ids dikirim sebagai satu parameter array (bukan string
+    interpolasi), hasil dikelompokkan per order sesuai urutan order_ids.
+    """
+    select = ",\n        ".join(INVOICE_SELECT)
+    query = f"""
+    SELECT 
+        {select}
     FROM order_details d
-    INNER JOIN orders o ON d.order_id = o.order_id
+    INNER JOIN orders o ON d.order_id = o.order_id AND d.order_date = o.order_date
     INNER JOIN customers c ON o.customer_id = c.customer_id
     INNER JOIN products p ON d.product_id = p.product_id
     INNER JOIN categories cat ON p.category_id = cat.category_id
     INNER JOIN subcategories sub ON p.subcategory_id = sub.subcategory_id
     INNER JOIN sellers s ON d.seller_id = s.seller_id
-    WHERE o.order_id = '{order_id}'
-    ORDER BY d.id;
+    WHERE o.order_id = ANY(%(order_ids)s)
+    ORDER BY array_position(%(order_ids)s, o.order_id), d.id;
     """
-    return pd.read_sql(query, conn)
+    return _read(query, {'order_ids': [str(order_id) for order_id in order_ids]})
+
+@instrumented
+def get_order_invoice(order_id):
+    """Get complete invoice detail for specific order"""
+    return _invoice_lines([order_id])
 
+@instrumented
+def get_order_invoices(order_ids):
+    """Invoice banyak order sekaligus (satu round trip), line urut per order.
 
+    Untuk billing run ribuan invoice pakai invoices.export_invoices yang
+    memanggil fungsi ini per batch.
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    if not order_ids:
+        return pd.DataFrame(columns=INVOICE_COLUMNS)
+    return _invoice_lines(order_ids)
+
+@instrumented
+def get_order_ids(start_date=None, end_date=None):
+    """order_id (urut tanggal) dalam rentang tanggal, untuk batch invoice"""
+    where, params = _date_filter("order_date", start_date, end_date)
+    query = f"""
+    SELECT order_id
+    FROM orders
+    {where}
+    ORDER BY order_date, order_id;
+    """
+    return _read(query, params)['order_id'].tolist()
+
+
+@instrumented
 def search_orders(search_term="", limit=50):
     """Search orders by order_id, customer name, or product name"""
     query = f"""
@@ -360,7 +815,7 @@ def search_orders(search_term="", limit=50):
         SUM(d.profit) as total_profit
     FROM orders o
     INNER JOIN customers c ON o.customer_id = c.customer_id
-    INNER JOIN order_details d ON o.order_id = d.order_id
+    INNER JOIN order_details d ON o.order_id = d.order_id AND o.order_date = d.order_date
     WHERE 
         o.order_id ILIKE '%{search_term}%' OR
         c.customer_name ILIKE '%{search_term}%'
@@ -368,113 +823,71 @@ def search_orders(search_term="", limit=50):
     ORDER BY o.order_date DESC
     LIMIT {limit};
     """
-    return pd.read_sql(query, conn)
+    return _read(query)
 
+@instrumented
 def get_rfm_analysis():
-    """Get RFM (Recency, Frequency, Monetary) Analysis"""
+    """Get RFM (Recency, Frequency, Monetary) Analysis dari snapshot customer_rfm"""
     query = """
-    WITH customer_metrics AS (
-        SELECT 
-            c.customer_id,
-            c.customer_name,
-            c.segment,
-            c.region,
-            MAX(o.order_date) as last_order_date,
-            COUNT(DISTINCT o.order_id) as frequency,
-            SUM(d.sales) as monetary
-        FROM customers c
-        INNER JOIN orders o ON c.customer_id = o.customer_id
-        INNER JOIN order_details d ON o.order_id = d.order_id
-        GROUP BY c.customer_id, c.customer_name, c.segment, c.region
-    ),
-    rfm_calc AS (
-        SELECT 
-            *,
-            CURRENT_DATE - last_order_date as recency_days,
-            NTILE(5) OVER (ORDER BY CURRENT_DATE - last_order_date DESC) as r_score,
-            NTILE(5) OVER (ORDER BY frequency ASC) as f_score,
-            NTILE(5) OVER (ORDER BY monetary ASC) as m_score
-        FROM customer_metrics
-    )
     SELECT 
-        customer_id,
-        customer_name,
-        segment,
-        region,
-        last_order_date,
-        recency_days,
-        frequency,
-        monetary,
-        r_score,
-        f_score,
-        m_score,
-        (r_score + f_score + m_score) as rfm_score,
-        CASE 
-            WHEN r_score >= 4 AND f_score >= 4 AND m_score >= 4 THEN 'Champions'
-            WHEN r_score >= 3 AND f_score >= 3 AND m_score >= 3 THEN 'Loyal Customers'
-            WHEN r_score >= 4 AND f_score <= 2 THEN 'New Customers'
-            WHEN r_score <= 2 AND f_score >= 3 THEN 'At Risk'
-            WHEN r_score <= 2 AND f_score <= 2 THEN 'Lost Customers'
-            WHEN r_score >= 3 AND f_score <= 2 AND m_score >= 3 THEN 'Potential Loyalists'
-            WHEN m_score >= 4 THEN 'Big Spenders'
-            ELSE 'Regular Customers'
-        END as customer_segment
-    FROM rfm_calc
-    ORDER BY rfm_score DESC, monetary DESC;
-    """
-    return pd.read_sql(query, conn)
+        r.customer_id,
+        c.customer_name,
+        c.segment,
+        c.region,
+        r.last_order_date,
+        CURRENT_DATE - r.last_order_date as recency_days,
+        r.frequency,
+        r.monetary,
+        r.r_score,
+        r.f_score,
+        r.m_score,
+        r.rfm_score,
+        r.customer_segment
+    FROM customer_rfm r
+    INNER JOIN customers c ON r.customer_id = c.customer_id
+    ORDER BY r.rfm_score DESC, r.monetary DESC;
+    """
+    return _read(query)
 
 
+@instrumented
 def get_rfm_segment_summary():
-    """Get summary statistics per RFM segment"""
+    """Get summary statistics per RFM segment dari snapshot customer_rfm"""
     query = """
-    WITH customer_metrics AS (
-        SELECT 
-            c.customer_id,
-            c.customer_name,
-            c.segment,
-            c.region,
-            MAX(o.order_date) as last_order_date,
-            COUNT(DISTINCT o.order_id) as frequency,
-            SUM(d.sales) as monetary
-        FROM customers c
-        INNER JOIN orders o ON c.customer_id = o.customer_id
-        INNER JOIN order_details d ON o.order_id = d.order_id
-        GROUP BY c.customer_id, c.customer_name, c.segment, c.region
-    ),
-    rfm_calc AS (
-        SELECT 
-            *,
-            CURRENT_DATE - last_order_date as recency_days,
-            NTILE(5) OVER (ORDER BY CURRENT_DATE - last_order_date DESC) as r_score,
-            NTILE(5) OVER (ORDER BY frequency ASC) as f_score,
-            NTILE(5) OVER (ORDER BY monetary ASC) as m_score
-        FROM customer_metrics
-    ),
-    rfm_segments AS (
-        SELECT 
-            *,
-            CASE 
-                WHEN r_score >= 4 AND f_score >= 4 AND m_score >= 4 THEN 'Champions'
-                WHEN r_score >= 3 AND f_score >= 3 AND m_score >= 3 THEN 'Loyal Customers'
-                WHEN r_score >= 4 AND f_score <= 2 THEN 'New Customers'
-                WHEN r_score <= 2 AND f_score >= 3 THEN 'At Risk'
-                WHEN r_score <= 2 AND f_score <= 2 THEN 'Lost Customers'
-                WHEN r_score >= 3 AND f_score <= 2 AND m_score >= 3 THEN 'Potential Loyalists'
-                WHEN m_score >= 4 THEN 'Big Spenders'
-                ELSE 'Regular Customers'
-            END as customer_segment
-        FROM rfm_calc
-    )
     SELECT 
         customer_segment,
         COUNT(*) as customer_count,
-        ROUND(AVG(recency_days), 0) as avg_recency_days,
+        ROUND(AVG(CURRENT_DATE - last_order_date), 0) as avg_recency_days,
         ROUND(AVG(frequency), 1) as avg_frequency,
         ROUND(AVG(monetary), 2) as avg_monetary,
         ROUND(SUM(monetary), 2) as total_revenue
-    FROM rfm_segments
+    FROM customer_rfm
     GROUP BY customer_segment
     ORDER BY total_revenue DESC;
     """
-    return pd.read_sql(query, conn)
+    return _read(query)
+
+
+
+# Fungsi query yang bisa di-export export.py -> builder (query, params)-nya.
+# Hanya fungsi yang hasilnya persis satu query tanpa olahan pandas; fungsi
+# lain (sketch approximate, leaderboard, beberapa query) tidak bisa di-stream.
+EXPORT_QUERIES = {
+    'load_data': load_data_sql,
+    'get_orders': get_orders_sql,
+    'get_order_details': get_order_details_sql,
+    'get_sales_by_category': get_sales_by_category_sql,
+    'get_seller_performance': get_seller_performance_sql,
+    'get_profit_by_category': get_profit_by_category_sql,
+    'get_loss_products': get_loss_products_sql,
+}
+
+
+def query_sql(func, *args, **kwargs):
+    """(query, params) fungsi query func (objek atau nama) lewat EXPORT_QUERIES, tanpa eksekusi"""
+    name = func if isinstance(func, str) else func.__name__
+    if name not in EXPORT_QUERIES:
+        raise ValueError(
+            f"{name} tidak bisa di-export (tidak punya SQL builder); "
+            f"pilih salah satu dari {sorted(EXPORT_QUERIES)} atau pakai --sql")
+    return EXPORT_QUERIES[name](*args, **kwargs)
@@ -1,18 +1,16 @@
 # convert.py
 import pandas as pd
-import psycopg2
 from psycopg2.extras import execute_values
 import datetime
 
-# ---------- CONFIG ----------
-DB_CONFIG = dict(
-    dbname="superstore",
-    user="postgres",
-    password="2436",
-    host="localhost",
-    port="5432"
-)
+from db import connect_writer
+from data_version import bump_data_version
+from partitions import ensure_partitions
+from rfm import refresh_customer_rfm
+from snapshot import export_snapshot
+from star_schema import refresh_star_schema, vacuum_analyze
 
+# ---------- CONFIG ----------
 EXCEL_FILE = "Superstore.xls"  # ganti kalau beda
 SAMPLE_ROWS = None  # set ke int kalau mau sample, atau None semua
 
@@ -80,7 +78,7 @@ def main():
     # "Customer Name","Segment","Country","City","State","Postal Code","Region",
     # "Product ID","Category","Sub-Category","Product Name","Sales","Quantity","Discount","Profit"
 
-    conn = psycopg2.connect(**DB_CONFIG)
+    conn = connect_writer()
     cur = conn.cursor()
 
     # CLEAN target tables in safe FK order
@@ -229,6 +227,11 @@ def main():
     order_cols = ["Order ID", "Order Date", "Ship Date", "Ship Mode", "Customer ID"]
     orders = df[order_cols].drop_duplicates(subset=["Order ID"])
 
+    # partisi bulanan harus sudah ada sebelum insert orders & order_details
+    order_dates = [d for d in (parse_date(x) for x in orders["Order Date"]) if d is not None]
+    if order_dates:
+        ensure_partitions(conn, min(order_dates), max(order_dates))
+
     order_values = []
     for _, r in orders.iterrows():
         oid = norm_str(r["Order ID"])
@@ -242,7 +245,7 @@ def main():
         """
         INSERT INTO orders (order_id, order_date, ship_date, ship_mode, customer_id)
         VALUES %s
-        ON CONFLICT (order_id) DO NOTHING;
+        ON CONFLICT (order_id, order_date) DO NOTHING;
         """,
         order_values
     )
@@ -251,27 +254,49 @@ def main():
     # -------------------------
     # 6) order_details
     # -------------------------
-    od_cols = ["Order ID", "Product ID", "Sales", "Quantity", "Discount", "Profit"]
+    od_cols = ["Order ID", "Order Date", "Product ID", "Sales", "Quantity", "Discount", "Profit"]
     odf = df[od_cols]
 
     od_inserts = []
     for _, r in odf.iterrows():
         oid = norm_str(r["Order ID"])
+        odate = parse_date(r.get("Order Date"))
         pid = norm_str(r["Product ID"])
         sales = r.get("Sales") if not pd.isna(r.get("Sales")) else 0
         qty = int(r.get("Quantity")) if not pd.isna(r.get("Quantity")) else 0
         discount = r.get("Discount") if not pd.isna(r.get("Discount")) else 0
         profit = r.get("Profit") if not pd.isna(r.get("Profit")) else 0
-        od_inserts.append((oid, pid, sales, qty, discount, profit))
+        od_inserts.append((oid, odate, pid, sales, qty, discount, profit))
 
     execute_values(cur,
         """
-        INSERT INTO order_details (order_id, product_id, sales, quantity, discount, profit)
+        INSERT INTO order_details (order_id, order_date, product_id, sales, quantity, discount, profit)
         VALUES %s;
         """,
         od_inserts
     )
+    bump_data_version(conn, [
+        'categories', 'subcategories', 'customers', 'products', 'orders', 'order_details'
+    ])
     conn.commit()
+    # visibility map untuk index-only scan covering index orders/order_details
+    vacuum_analyze(conn, "orders")
+    vacuum_analyze(conn, "order_details")
+
+    # -------------------------
+    # 7) customer_rfm snapshot (full rebuild karena tabel di-truncate di atas)
+    # -------------------------
+    refresh_customer_rfm(conn)
+
+    # -------------------------
+    # 8) analytics star schema (fact_order_line + dimensi)
+    # -------------------------
+    refresh_star_schema(conn, full=True)
+
+    # -------------------------
+    # 9) snapshot Parquet untuk backend duckdb (lihat snapshot.py)
+    # -------------------------
+    export_snapshot(conn)
 
     cur.close()
     conn.close()
@@ -2,6 +2,16 @@
 -- RESET
 -- ============================================
 
+DROP TABLE IF EXISTS data_version CASCADE;
+DROP TABLE IF EXISTS leaderboards CASCADE;
+DROP TABLE IF EXISTS leaderboard_totals CASCADE;
+DROP TABLE IF EXISTS kpi_sketches CASCADE;
+DROP TABLE IF EXISTS fact_order_line CASCADE;
+DROP TABLE IF EXISTS dim_order CASCADE;
+DROP TABLE IF EXISTS dim_customer CASCADE;
+DROP TABLE IF EXISTS dim_product CASCADE;
+DROP TABLE IF EXISTS dim_seller CASCADE;
+DROP TABLE IF EXISTS customer_rfm CASCADE;
 DROP TABLE IF EXISTS order_details CASCADE;
 DROP TABLE IF EXISTS orders CASCADE;
 DROP TABLE IF EXISTS products CASCADE;
@@ -9,6 +19,7 @@ DROP TABLE IF EXISTS subcategories CASCADE;
 DROP TABLE IF EXISTS categories CASCADE;
 DROP TABLE IF EXISTS customers CASCADE;
 DROP TABLE IF EXISTS sellers CASCADE;
+DROP SCHEMA IF EXISTS archive CASCADE;
 
 DROP TYPE IF EXISTS segment_enum;
 DROP TYPE IF EXISTS region_enum;
@@ -75,45 +86,190 @@ CREATE TABLE products (
     FOREIGN KEY (subcategory_id) REFERENCES subcategories(subcategory_id)
 );
 
--- ORDERS
+-- ORDERS (partisi RANGE per bulan berdasarkan order_date, dibuat oleh partitions.py)
 CREATE TABLE orders (
-    order_id VARCHAR(50) PRIMARY KEY,
+    order_id VARCHAR(50) NOT NULL,
     order_date DATE NOT NULL,
     ship_date DATE,
     ship_mode ship_mode_enum,
     customer_id VARCHAR(50) NOT NULL,
+    PRIMARY KEY (order_id, order_date),
     FOREIGN KEY (customer_id) REFERENCES customers(customer_id),
     CONSTRAINT chk_ship_date CHECK (ship_date >= order_date)
-);
+) PARTITION BY RANGE (order_date);
 
--- ORDER DETAILS
+-- ORDER DETAILS (ikut membawa order_date supaya partisinya sejajar dengan orders)
 CREATE TABLE order_details (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     order_id VARCHAR(50) NOT NULL,
+    order_date DATE NOT NULL,
     product_id VARCHAR(50) NOT NULL,
     seller_id VARCHAR(50),
     sales DECIMAL(10,2) NOT NULL,
     quantity INTEGER NOT NULL,
     discount DECIMAL(5,2) DEFAULT 0,
     profit DECIMAL(10,2),
-    FOREIGN KEY (order_id) REFERENCES orders(order_id),
+    PRIMARY KEY (id, order_date),
+    FOREIGN KEY (order_id, order_date) REFERENCES orders(order_id, order_date),
     FOREIGN KEY (product_id) REFERENCES products(product_id),
     FOREIGN KEY (seller_id) REFERENCES sellers(seller_id),
     CONSTRAINT chk_quantity CHECK (quantity > 0),
     CONSTRAINT chk_discount CHECK (discount BETWEEN 0 AND 1),
     CONSTRAINT chk_sales CHECK (sales >= 0)
+) PARTITION BY RANGE (order_date);
+
+-- Partisi default untuk tanggal di luar partisi bulanan yang sudah ada
+CREATE TABLE orders_default PARTITION OF orders DEFAULT;
+CREATE TABLE order_details_default PARTITION OF order_details DEFAULT;
+
+-- CUSTOMER RFM SNAPSHOT (di-maintain incremental oleh rfm.py)
+CREATE TABLE customer_rfm (
+    customer_id VARCHAR(50) PRIMARY KEY,
+    last_order_date DATE NOT NULL,
+    frequency INTEGER NOT NULL,
+    monetary DECIMAL(14,2) NOT NULL,
+    r_score SMALLINT,
+    f_score SMALLINT,
+    m_score SMALLINT,
+    rfm_score SMALLINT,
+    customer_segment VARCHAR(30),
+    updated_at TIMESTAMP DEFAULT now(),
+    FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
+);
+
+-- ============================================
+-- ANALYTICS STAR SCHEMA (diisi oleh star_schema.py)
+-- Surrogate key INTEGER supaya JOIN & index lebih kecil dari VARCHAR(50)
+-- ============================================
+
+CREATE TABLE dim_customer (
+    customer_key SERIAL PRIMARY KEY,
+    customer_id VARCHAR(50) UNIQUE NOT NULL,
+    customer_name VARCHAR(255) NOT NULL,
+    segment segment_enum,
+    country VARCHAR(100),
+    city VARCHAR(100),
+    state VARCHAR(100),
+    postal_code VARCHAR(20),
+    region region_enum
+);
+
+-- category & subcategory di-denormalisasi ke dimensi produk
+CREATE TABLE dim_product (
+    product_key SERIAL PRIMARY KEY,
+    product_id VARCHAR(50) UNIQUE NOT NULL,
+    product_name VARCHAR(255) NOT NULL,
+    category_name VARCHAR(100) NOT NULL,
+    subcategory_name VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE dim_seller (
+    seller_key SERIAL PRIMARY KEY,
+    seller_id VARCHAR(50) UNIQUE NOT NULL,
+    seller_name VARCHAR(255) NOT NULL,
+    seller_region region_enum,
+    seller_rating DECIMAL(3,2)
+);
+
+CREATE TABLE dim_order (
+    order_key SERIAL PRIMARY KEY,
+    order_id VARCHAR(50) NOT NULL,
+    order_date DATE NOT NULL,
+    ship_date DATE,
+    ship_mode ship_mode_enum,
+    UNIQUE (order_id, order_date)
+);
+
+-- Fact table sempit: surrogate key, tanggal & measure saja.
+-- order_line_id = order_details.id; dipartisi sama seperti order_details.
+-- Tanpa FK supaya load ETL tetap cepat (konsistensi dijaga star_schema.py).
+CREATE TABLE fact_order_line (
+    order_line_id INTEGER NOT NULL,
+    order_date DATE NOT NULL,
+    order_key INTEGER NOT NULL,
+    customer_key INTEGER NOT NULL,
+    product_key INTEGER NOT NULL,
+    seller_key INTEGER,
+    quantity INTEGER NOT NULL,
+    sales DECIMAL(10,2) NOT NULL,
+    discount DECIMAL(5,2),
+    profit DECIMAL(10,2),
+    PRIMARY KEY (order_line_id, order_date)
+) PARTITION BY RANGE (order_date);
+
+CREATE TABLE fact_order_line_default PARTITION OF fact_order_line DEFAULT;
+
+-- Rollup approximate per (bulan, segment, region), diisi oleh sketches.py.
+-- Sketch bisa di-merge antar cell: HyperLogLog untuk distinct customer/order,
+-- DDSketch untuk quantile nilai order. Measure aditif disimpan exact.
+CREATE TABLE kpi_sketches (
+    month DATE NOT NULL,
+    segment VARCHAR(30) NOT NULL,
+    region VARCHAR(30) NOT NULL,
+    line_count INTEGER NOT NULL,
+    sales DECIMAL(14,2) NOT NULL,
+    profit DECIMAL(14,2) NOT NULL,
+    customers_hll BYTEA NOT NULL,
+    orders_hll BYTEA NOT NULL,
+    order_value_sketch BYTEA NOT NULL,
+    PRIMARY KEY (month, segment, region)
+);
+
+-- Leaderboard top-K per dimensi (product/customer/seller) dan periode
+-- ('all', 'YYYY', 'YYYY-MM'), diisi oleh leaderboards.py.
+-- leaderboard_totals = total berjalan per entity (ditambah delta fact line baru),
+-- leaderboards = LEADERBOARD_SIZE entity teratas per periode, sudah di-rank.
+CREATE TABLE leaderboard_totals (
+    dimension VARCHAR(10) NOT NULL,
+    period VARCHAR(7) NOT NULL,
+    entity_key INTEGER NOT NULL,
+    line_count INTEGER NOT NULL,
+    order_count INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    sales DECIMAL(14,2) NOT NULL,
+    profit DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (dimension, period, entity_key)
+);
+
+CREATE TABLE leaderboards (
+    dimension VARCHAR(10) NOT NULL,
+    period VARCHAR(7) NOT NULL,
+    rank INTEGER NOT NULL,
+    entity_key INTEGER NOT NULL,
+    line_count INTEGER NOT NULL,
+    order_count INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    sales DECIMAL(14,2) NOT NULL,
+    profit DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (dimension, period, rank)
+);
+
+-- Versi data per tabel, dinaikkan oleh ETL lewat data_version.bump_data_version
+-- (sekaligus NOTIFY superstore_data_changed) untuk invalidasi cache dashboard.
+CREATE TABLE data_version (
+    table_name VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
 -- ============================================
 -- INDEXES
 -- ============================================
 
-CREATE INDEX idx_orders_customer ON orders(customer_id);
-CREATE INDEX idx_orders_order_date ON orders(order_date);
+-- Index di-tuning untuk query mix dashboard (cek hasilnya dengan bench_queries.py).
+-- Covering index (INCLUDE measure) memungkinkan index-only scan untuk agregat,
+-- jadi query tidak perlu kembali ke heap. Jalankan VACUUM setelah load supaya
+-- visibility map terisi: convert.py (orders & order_details), add_sellers.py
+-- (order_details) dan star_schema.py (fact_order_line) sudah melakukannya.
+-- Tidak ada index order_date di tabel terpartisi: partisi bulanan sudah
+-- memangkas range order_date (partition pruning), dan di dalam partisi data
+-- tidak urut tanggal (convert.py memasukkan sesuai urutan spreadsheet).
+
+CREATE INDEX idx_orders_customer ON orders(customer_id) INCLUDE (order_date);
 
-CREATE INDEX idx_order_details_order ON order_details(order_id);
-CREATE INDEX idx_order_details_product ON order_details(product_id);
-CREATE INDEX idx_order_details_seller ON order_details(seller_id);
+CREATE INDEX idx_order_details_order ON order_details(order_id, order_date) INCLUDE (sales);
+CREATE INDEX idx_order_details_product ON order_details(product_id) INCLUDE (sales, profit, quantity, discount);
+CREATE INDEX idx_order_details_seller ON order_details(seller_id) INCLUDE (sales, profit, quantity, discount);
 
 CREATE INDEX idx_sellers_region ON sellers(seller_region);
 
@@ -122,3 +278,16 @@ CREATE INDEX idx_customers_region ON customers(region);
 
 CREATE INDEX idx_products_category ON products(category_id);
 CREATE INDEX idx_products_subcategory ON products(subcategory_id);
+
+CREATE INDEX idx_customer_rfm_segment ON customer_rfm(customer_segment);
+
+-- Fact table: covering index per dimensi untuk agregat category/segment/seller
+CREATE INDEX idx_fact_order_line_order ON fact_order_line(order_key);
+CREATE INDEX idx_fact_order_line_customer ON fact_order_line(customer_key) INCLUDE (order_key, sales, profit);
+CREATE INDEX idx_fact_order_line_product ON fact_order_line(product_key) INCLUDE (sales, profit, quantity, discount);
+CREATE INDEX idx_fact_order_line_seller ON fact_order_line(seller_key) INCLUDE (sales, profit, quantity, discount);
+-- Partial index untuk analisis produk rugi (get_loss_products)
+CREATE INDEX idx_fact_order_line_loss ON fact_order_line(product_key) INCLUDE (quantity, profit) WHERE profit < 0;
+
+-- Order terbaru untuk tabel Order Summary di overview (top-N tanpa sort penuh)
+CREATE INDEX idx_dim_order_date ON dim_order(order_date DESC, order_id);
@@ -0,0 +1,229 @@
+# dashboard_snapshot.py
+# Snapshot dataset dashboard yang dibagi semua session dalam satu proses
+# Streamlit.
+#
+# Setiap dataset (agregat halaman, pilihan filter, dll) dimuat sekali oleh
+# loader-nya lalu disimpan di DashboardSnapshot; session berikutnya hanya
+# mendapat view (shallow copy copy-on-write pandas, tanpa pickle / copy data
+# seperti st.cache_data). Dataset yang sedang dimuat tidak dimuat ulang oleh
+# session lain: mereka menunggu loader yang sama (single flight).
+#
+# warm_up() memuat semua dataset di background thread saat proses pertama
+# kali menjalankan app, jadi session setelah deploy tidak menunggu query
+# halaman lain. refresh() memuat ulang dataset di background dan menukarnya
+# sekaligus; sampai selesai session tetap membaca versi lama.
+#
+# RefreshScheduler menjalankan refresh itu di luar request: tiap interval
+# detik dan/atau saat diminta (data_version berubah, lihat app.py), jadi
+# user tidak pernah menunggu recompute.
+#
+#   python dashboard_snapshot.py        # waktu warm-up per dataset (tanpa Streamlit)
+import sys
+import time
+import logging
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from query_metrics import set_page
+
+logger = logging.getLogger("superstore.snapshot")
+
+# Jumlah thread warm-up / refresh
+WARMUP_WORKERS = 4
+
+# Dataset halaman tanpa filter -> (method DataSource, kwargs)
+SOURCE_DATASETS = {
+    'loss_products': ('get_loss_products', {'top_n': 15}),
+    'seller_stats': ('get_top_sellers', {'limit': 10}),
+    'seller_performance': ('get_seller_performance', {}),
+    'kpi_summary': ('get_kpi_summary', {}),
+    'data_summary': ('get_data_summary', {}),
+    'customer_spending': ('get_customer_spending', {'limit': 20}),
+    'product_sales': ('get_product_sales', {'limit': 20}),
+    'recent_orders': ('get_recent_orders', {'limit': 20}),
+    'category_sales': ('get_sales_by_category', {}),
+    'filter_options': ('get_filter_options', {}),
+}
+
+def source_loaders(source, datasets=SOURCE_DATASETS):
+    """dict name -> loader tanpa argumen untuk DashboardSnapshot, dari DataSource source"""
+    return {
+        name: functools.partial(getattr(source, method), **kwargs)
+        for name, (method, kwargs) in datasets.items()
+    }
+
+def _view(data):
+    """View read-only untuk session: DataFrame di-shallow-copy (copy-on-write),
+    jadi rename / assign kolom di session tidak mengubah snapshot"""
+    if isinstance(data, pd.DataFrame):
+        return data.copy(deep=False)
+    return data
+
+class DashboardSnapshot:
+    """Dataset name -> hasil loaders[name](), dimuat sekali dan dibagi antar session"""
+
+    def __init__(self, loaders, workers=WARMUP_WORKERS):
+        self.loaders = loaders
+        self.workers = workers
+        self._data = {}
+        self._loading = {name: threading.Lock() for name in loaders}
+        self._lock = threading.Lock()
+        # name -> generasi, dinaikkan invalidate(): hasil loader yang mulai
+        # sebelum invalidate dibuang
+        self._generation = dict.fromkeys(loaders, 0)
+        # name -> (detik load, waktu selesai)
+        self.loaded = {}
+        # name -> berapa kali dataset sudah dimuat (naik tiap swap)
+        self.versions = dict.fromkeys(loaders, 0)
+        self.errors = {}
+
+    def _load(self, name):
+        generation = self._generation[name]
+        start = time.perf_counter()
+        data = self.loaders[name]()
+        seconds = time.perf_counter() - start
+        with self._lock:
+            if generation == self._generation[name]:
+                self._data[name] = data
+                self.loaded[name] = (seconds, time.time())
+                self.versions[name] += 1
+                self.errors.pop(name, None)
+        return data
+
+    def get(self, name):
+        """View dataset name; dimuat dulu kalau belum ada di snapshot"""
+        data = self._data.get(name)
+        if data is None:
+            with self._loading[name]:
+                data = self._data.get(name)
+                if data is None:
+                    data = self._load(name)
+        return _view(data)
+
+    def ready(self, name):
+        return name in self._data
+
+    def version(self, name):
+        """Versi dataset name; berubah setiap kali dataset baru ditukar masuk"""
+        return self.versions[name]
+
+    def load_all(self, names=None, reload=False):
+        """Muat dataset names (None = semua) paralel di thread ini; reload=True memuat ulang yang sudah ada"""
+        names = [name for name in (names or self.loaders) if name in self.loaders]
+
+        def load(name):
+            set_page("snapshot")
+            try:
+                with self._loading[name]:
+                    if reload or name not in self._data:
+                        self._load(name)
+            except Exception as e:
+                self.errors[name] = e
+                logger.exception("snapshot %s gagal dimuat", name)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(names)))) as pool:
+            list(pool.map(load, names))
+        logger.info("snapshot %d dataset dimuat (%.1fs)", len(names), time.perf_counter() - start)
+
+    def _start(self, names, reload):
+        thread = threading.Thread(
+            target=self.load_all, args=(names, reload), name="dashboard-snapshot", daemon=True)
+        thread.start()
+        return thread
+
+    def warm_up(self, names=None):
+        """Muat dataset yang belum ada di background; return thread-nya"""
+        return self._start(names, reload=False)
+
+    def refresh(self, names=None):
+        """Muat ulang dataset di background; versi lama tetap dibaca sampai yang baru siap"""
+        return self._start(names, reload=True)
+
+    def invalidate(self, names=None):
+        """Buang dataset dari snapshot (None = semua); dimuat lagi saat diminta"""
+        names = set(self.loaders if names is None else names)
+        with self._lock:
+            for name in names & set(self.loaders):
+                self._generation[name] += 1
+                self._data.pop(name, None)
+                self.loaded.pop(name, None)
+
+    def status(self):
+        """(jumlah dataset siap, jumlah dataset)"""
+        return len(self._data), len(self.loaders)
+
+class RefreshScheduler:
+    """Background thread yang me-refresh dataset DashboardSnapshot di luar request.
+
+    Semua dataset di-refresh tiap interval detik (0 = hanya saat diminta),
+    dan dataset yang diminta lewat request() di-refresh secepatnya. Permintaan
+    yang masuk selama refresh berjalan digabung dan dijalankan setelahnya.
+    """
+
+    def __init__(self, snapshot, interval=0):
+        self.snapshot = snapshot
+        self.interval = interval
+        self.runs = 0
+        self.last_run = None
+        self._pending = set()
+        self._wake = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="snapshot-refresh", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._wake:
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def request(self, names=None):
+        """Jadwalkan refresh dataset names (None = semua) secepatnya"""
+        with self._wake:
+            self._pending.update(self.snapshot.loaders if names is None else names)
+            self._wake.notify()
+
+    def _next(self, due):
+        """Tunggu sampai ada permintaan atau interval jatuh tempo; return (names, due berikutnya)"""
+        with self._wake:
+            while not self._pending and not self._stop.is_set():
+                timeout = None if due is None else due - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    return list(self.snapshot.loaders), time.monotonic() + self.interval
+                self._wake.wait(timeout)
+            names, self._pending = sorted(self._pending), set()
+            return names, due
+
+    def _run(self):
+        due = time.monotonic() + self.interval if self.interval > 0 else None
+        while not self._stop.is_set():
+            names, due = self._next(due)
+            if self._stop.is_set():
+                return
+            start = time.perf_counter()
+            self.snapshot.load_all(names, reload=True)
+            self.runs += 1
+            self.last_run = (names, time.perf_counter() - start, time.time())
+
+if __name__ == "__main__":
+    from datasource import make_source
+    source = make_source(sys.argv[1] if len(sys.argv) > 1 else None)
+    snapshot = DashboardSnapshot(source_loaders(source))
+    start = time.perf_counter()
+    snapshot.warm_up().join()
+    for name, (seconds, _) in sorted(snapshot.loaded.items(), key=lambda item: -item[1][0]):
+        print(f"{name:20s} {seconds * 1000:8.1f}ms")
+    print(f"warm-up {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    for name in snapshot.loaders:
+        snapshot.get(name)
+    print(f"get semua dataset setelah warm-up {(time.perf_counter() - start) * 1000:.2f}ms")
@@ -0,0 +1,147 @@
+# data_version.py
+# Versi data per tabel + notifikasi perubahan lewat Postgres LISTEN/NOTIFY.
+#
+# Setiap write path (ETL) memanggil bump_data_version(conn, tables) sebelum
+# commit: versi tabel di data_version dinaikkan dan NOTIFY dikirim di channel
+# CHANNEL. NOTIFY bersifat transaksional, jadi listener baru menerimanya
+# setelah data yang berubah ter-commit.
+#
+# Dashboard menjalankan DataVersionListener di background thread dan hanya
+# meng-evict cache yang bergantung pada tabel yang berubah (lihat app.py).
+# Notifikasi yang terlewat saat koneksi listener putus ditangkap lewat
+# perbandingan isi data_version setelah reconnect.
+import json
+import time
+import select
+import logging
+import threading
+
+import psycopg2
+
+from db import writer_dsn
+
+logger = logging.getLogger("superstore.data_version")
+
+CHANNEL = "superstore_data_changed"
+# Jeda reconnect listener (detik), naik sampai RECONNECT_MAX_SECONDS
+RECONNECT_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 30.0
+
+def bump_data_version(conn, tables):
+    """Naikkan versi tabel yang berubah dan kirim NOTIFY (ikut transaksi conn).
+
+    Caller yang commit. Return dict tabel -> versi baru.
+    """
+    tables = sorted(set(tables))
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO data_version AS v (table_name, version, updated_at)
+        SELECT t, 1, now() FROM UNNEST(%s::text[]) AS t
+        ON CONFLICT (table_name) DO UPDATE SET
+            version = v.version + 1,
+            updated_at = now()
+        RETURNING table_name, version;
+    """, (tables,))
+    versions = dict(cur.fetchall())
+    cur.execute("SELECT pg_notify(%s, %s);", (CHANNEL, json.dumps({'tables': versions})))
+    cur.close()
+    return versions
+
+def current_versions(conn):
+    """dict tabel -> versi saat ini"""
+    cur = conn.cursor()
+    cur.execute("SELECT table_name, version FROM data_version;")
+    versions = dict(cur.fetchall())
+    cur.close()
+    return versions
+
+class DataVersionListener:
+    """Background thread LISTEN CHANNEL, panggil on_change(set tabel) saat ada perubahan.
+
+    Koneksi selalu ke writer: NOTIFY tidak diteruskan ke replica dan LISTEN
+    tidak bisa dijalankan di hot standby.
+    """
+
+    def __init__(self, on_change, dsn=None, poll_seconds=5.0):
+        self.on_change = on_change
+        self.dsn = dsn
+        self.poll_seconds = poll_seconds
+        self.versions = {}
+        self._synced = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="data-version-listener", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _apply(self, versions):
+        """Panggil on_change untuk tabel yang versinya beda dari yang terakhir dilihat"""
+        # != bukan >: create_tables.sql me-reset versi ke 1
+        changed = {
+            table for table, version in versions.items()
+            if version != self.versions.get(table)
+        }
+        self.versions.update({table: versions[table] for table in changed})
+        if changed:
+            logger.info("data berubah: %s", ", ".join(sorted(changed)))
+            try:
+                self.on_change(changed)
+            except Exception:
+                logger.exception("on_change gagal untuk %s", sorted(changed))
+
+    def _listen(self, conn):
+        cur = conn.cursor()
+        cur.execute(f"LISTEN {CHANNEL};")
+        cur.close()
+        versions = current_versions(conn)
+        if self._synced:
+            # reconnect: tangkap perubahan yang terjadi saat koneksi putus
+            self._apply(versions)
+        else:
+            self.versions = versions
+            self._synced = True
+
+        while not self._stop.is_set():
+            if select.select([conn], [], [], self.poll_seconds) == ([], [], []):
+                continue
+            conn.poll()
+            versions = {}
+            while conn.notifies:
+                payload = json.loads(conn.notifies.pop(0).payload)
+                versions.update(payload.get('tables', {}))
+            self._apply(versions)
+
+    def _run(self):
+        delay = RECONNECT_SECONDS
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn or writer_dsn())
+                conn.autocommit = True
+                delay = RECONNECT_SECONDS
+                self._listen(conn)
+            except (psycopg2.Error, OSError) as e:
+                logger.warning("listener %s terputus: %s (reconnect %.0fs)", CHANNEL, e, delay)
+                self._stop.wait(delay)
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+            finally:
+                if conn is not None and not conn.closed:
+                    conn.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    listener = DataVersionListener(lambda tables: print(time.strftime('%H:%M:%S'), sorted(tables)))
+    print(f"LISTEN {CHANNEL} (Ctrl+C untuk berhenti)")
+    listener.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        listener.stop()
@@ -0,0 +1,459 @@
+# datasource.py
+# Satu interface data untuk kedua dashboard (app.py & app_streamlit.py).
+#
+# DataSource mendefinisikan query yang dipakai dashboard: load_data() plus
+# agregat get_* dengan kolom & urutan yang sama persis dengan fungsi di
+# config.py. Implementasi:
+#   - PostgresSource : agregat dijalankan di database lewat config.py
+#                      (atau DuckDB kalau SUPERSTORE_BACKEND=duckdb)
+#   - FrameSource    : DataFrame in-memory, agregat dihitung pandas
+#   - CsvSource      : FrameSource dari file CSV (mis. superstore_data.csv)
+#   - ParquetSource  : FrameSource dari file Parquet dengan kolom yang sama
+#
+# Bandingkan hasil & latency antar backend:
+#   python datasource.py postgres csv:superstore_data.csv
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+from frames import compact_frame
+from filter_store import FilterStore
+
+DEFAULT_SOURCE = os.environ.get("SUPERSTORE_SOURCE", "postgres")
+
+# Fungsi agregat yang disediakan semua backend (nama sama dengan config.py)
+AGGREGATES = [
+    'get_sales_by_category',
+    'get_sales_by_segment',
+    'get_top_products',
+    'get_top_customers',
+    'get_sales_trend_monthly',
+    'get_top_sellers',
+    'get_seller_performance',
+    'get_profit_by_category',
+    'get_loss_products',
+    'get_kpi_summary',
+    'get_data_summary',
+    'get_customer_spending',
+    'get_product_sales',
+    'get_recent_orders',
+    'get_filter_options',
+]
+
+class DataSource(ABC):
+    """Interface sumber data dashboard; backend yang belum lengkap gagal saat dibuat"""
+
+    name = "base"
+
+    @abstractmethod
+    def load_data(self, start_date=None, end_date=None):
+        """Semua order line (kolom sama dengan config.load_data), dtype compact"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_sales_by_category(self, start_date=None, end_date=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_sales_by_segment(self, start_date=None, end_date=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_top_products(self, limit=10, start_date=None, end_date=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_top_customers(self, limit=10, start_date=None, end_date=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_sales_trend_monthly(self, start_date=None, end_date=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_top_sellers(self, limit=10, start_date=None, end_date=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_seller_performance(self, start_date=None, end_date=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_profit_by_category(self, start_date=None, end_date=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_loss_products(self, top_n=15, start_date=None, end_date=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_kpi_summary(self, start_date=None, end_date=None):
+        """Satu baris: total_customers, total_orders, total_sales, total_profit, order_value_p50/p90/p99"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_data_summary(self):
+        """Satu baris: total_records, first_month, last_month (untuk sidebar)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_customer_spending(self, limit=20):
+        """Top customer by sales: customer_name, total_orders (line), total_sales, total_profit, total_rows"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_product_sales(self, limit=20):
+        """Top produk by quantity: product_name, category, total_quantity, total_sales, total_profit, total_rows"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_recent_orders(self, limit=20):
+        """Order terbaru: order_id, customer_name, order_date, total_sales, total_profit, items_count, total_rows"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_filter_options(self):
+        """Pilihan filter global: filter (region/segment/category/seller), value; urut filter, value"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_filter_store(self):
+        """FilterStore (filter_store.py) berisi semua order line, untuk filter global dashboard"""
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+# ==============================
+# POSTGRES
+# ==============================
+class PostgresSource(DataSource):
+    """Agregat di-push ke database lewat fungsi query config.py"""
+
+    name = "postgres"
+
+    def __init__(self):
+        # import di sini supaya sumber file/in-memory tidak butuh koneksi database
+        import config
+        self.config = config
+
+    def load_data(self, start_date=None, end_date=None):
+        return self.config.load_data(start_date=start_date, end_date=end_date, compact=True)
+
+    def get_sales_by_category(self, start_date=None, end_date=None):
+        return self.config.get_sales_by_category(start_date, end_date)
+
+    def get_sales_by_segment(self, start_date=None, end_date=None):
+        return self.config.get_sales_by_segment(start_date, end_date)
+
+    def get_top_products(self, limit=10, start_date=None, end_date=None):
+        return self.config.get_top_products(limit, start_date, end_date)
+
+    def get_top_customers(self, limit=10, start_date=None, end_date=None):
+        return self.config.get_top_customers(limit, start_date, end_date)
+
+    def get_sales_trend_monthly(self, start_date=None, end_date=None):
+        return self.config.get_sales_trend_monthly(start_date, end_date)
+
+    def get_top_sellers(self, limit=10, start_date=None, end_date=None):
+        return self.config.get_top_sellers(limit, start_date, end_date)
+
+    def get_seller_performance(self, start_date=None, end_date=None):
+        return self.config.get_seller_performance(start_date, end_date)
+
+    def get_profit_by_category(self, start_date=None, end_date=None):
+        return self.config.get_profit_by_category(start_date, end_date)
+
+    def get_loss_products(self, top_n=15, start_date=None, end_date=None):
+        return self.config.get_loss_products(top_n, start_date, end_date)
+
+    def get_kpi_summary(self, start_date=None, end_date=None):
+        return self.config.get_kpi_summary(start_date, end_date)
+
+    def get_data_summary(self):
+        return self.config.get_data_summary()
+
+    def get_customer_spending(self, limit=20):
+        return self.config.get_customer_spending(limit)
+
+    def get_product_sales(self, limit=20):
+        return self.config.get_product_sales(limit)
+
+    def get_recent_orders(self, limit=20):
+        return self.config.get_recent_orders(limit)
+
+    def get_filter_options(self):
+        return self.config.get_filter_options()
+
+    def load_filter_store(self):
+        return FilterStore.from_star_schema(self.config)
+
+# ==============================
+# IN-MEMORY
+# ==============================
+class FrameSource(DataSource):
+    """Agregat dihitung pandas dari satu DataFrame order line"""
+
+    name = "frame"
+
+    def __init__(self, data):
+        self.data = compact_frame(data)
+
+    def _frame(self, start_date=None, end_date=None):
+        data = self.data
+        if start_date is not None:
+            data = data[data['order_date'] >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            data = data[data['order_date'] <= pd.Timestamp(end_date)]
+        return data
+
+    def _group(self, data, keys):
+        return data.groupby(keys, observed=True, sort=False)
+
+    def load_data(self, start_date=None, end_date=None):
+        data = self._frame(start_date, end_date)
+        return data.sort_values('order_date', ascending=False, kind='stable').reset_index(drop=True)
+
+    def get_sales_by_category(self, start_date=None, end_date=None):
+        data = self._frame(start_date, end_date)
+        result = self._group(data, 'category').agg(
+            total_orders=('sales', 'size'),
+            total_quantity=('quantity', 'sum'),
+            total_sales=('sales', 'sum'),
+            total_profit=('profit', 'sum'),
+            avg_sales=('sales', 'mean'),
+        ).reset_index()
+        return _finish(result, 'total_sales')
+
+    def get_sales_by_segment(self, start_date=None, end_date=None):
+        data = self._frame(start_date, end_date)
+        result = self._group(data, 'segment').agg(
+            total_orders=('order_id', 'nunique'),
+            total_customers=('customer_id', 'nunique'),
+            total_sales=('sales', 'sum'),
+            total_profit=('profit', 'sum'),
+        ).reset_index()
+        return _finish(result, 'total_sales')
+
+    def get_top_products(self, limit=10, start_date=None, end_date=None):
+        data = self._frame(start_date, end_date)
+        result = self._group(data, ['product_id', 'product_name', 'category', 'sub_category']).agg(
+            order_count=('sales', 'size'),
+            total_quantity=('quantity', 'sum'),
+            total_sales=('sales', 'sum'),
+            total_profit=('profit', 'sum'),
+        ).reset_index().drop(columns='product_id')
+        return _finish(result, 'total_sales', limit)
+
+    def get_top_customers(self, limit=10, start_date=None, end_date=None):
+        data = self._frame(start_date, end_date)
+        result = self._group(data, ['customer_id', 'customer_name', 'segment', 'region']).agg(
+            total_orders=('order_id', 'nunique'),
+            total_sales=('sales', 'sum'),
+            total_profit=('profit', 'sum'),
+            avg_order_value=('sales', 'mean'),
+        ).reset_index().drop(columns='customer_id')
+        return _finish(result, 'total_sales', limit)
+
+    def get_sales_trend_monthly(self, start_date=None, end_date=None):
+        data = self._frame(start_date, end_date)
+        month = data['order_date'].dt.to_period('M').dt.to_timestamp().dt.tz_localize('UTC')
+        result = data.assign(month=month).groupby('month').agg(
+            total_orders=('order_id', 'nunique'),
+            total_sales=('sales', 'sum'),
+            total_profit=('profit', 'sum'),
+            avg_sales=('sales', 'mean'),
+        ).reset_index()
+        return _finish(result, 'month', ascending=True)
+
+    def get_top_sellers(self, limit=10, start_date=None, end_date=None):
+        data = self._frame(start_date, end_date)
+        result = self._group(data, ['seller_id', 'seller_name', 'seller_region', 'seller_rating']).agg(
+            total_orders=('sales', 'size'),
+            total_quantity=('quantity', 'sum'),
+            total_sales=('sales', 'sum'),
+            total_profit=('profit', 'sum'),
+            avg_profit_per_order=('profit', 'mean'),
+        ).reset_index().drop(columns='seller_id')
+        result['avg_profit_per_order'] = result['avg_profit_per_order'].round(2)
+        return _finish(result, 'total_sales', limit)
+
+    def get_seller_performance(self, start_date=None, end_date=None):
+        data = self._frame(start_date, end_date)
+        result = self._group(data, ['seller_id', 'seller_name', 'seller_region', 'seller_rating']).agg(
+            total_sales=('sales', 'sum'),
+            total_profit=('profit', 'sum'),
+            total_orders=('sales', 'size'),
+        ).reset_index().drop(columns='seller_id')
+        return _finish(result, ['seller_rating', 'seller_name'], ascending=[False, True])
+
+    def get_profit_by_category(self, start_date=None, end_date=None):
+        data = self._frame(start_date, end_date)
+        data = data.assign(
+            positive_profit=data['profit'].clip(lower=0),
+            negative_profit=data['profit'].clip(upper=0),
+        )
+        result = self._group(data, 'category').agg(
+            total_profit=('profit', 'sum'),
+            positive_profit=('positive_profit', 'sum'),
+            negative_profit=('negative_profit', 'sum'),
+            order_count=('profit', 'size'),
+        ).reset_index()
+        return _finish(result, 'total_profit')
+
+    def get_loss_products(self, top_n=15, start_date=None, end_date=None):
+        data = self._frame(start_date, end_date)
+        data = data[data['profit'] < 0]
+        result = self._group(data, ['product_name', 'category']).agg(
+            quantity=('quantity', 'sum'),
+            profit=('profit', 'sum'),
+        ).reset_index()
+        return _finish(result, ['quantity', 'product_name'], top_n, ascending=[False, True])
+
+    def get_kpi_summary(self, start_date=None, end_date=None):
+        data = self._frame(start_date, end_date)
+        orders = self._group(data, ['order_id', 'order_date']).agg(
+            customer_id=('customer_id', 'first'),
+            order_value=('sales', 'sum'),
+            profit=('profit', 'sum'),
+        )
+        result = pd.DataFrame([{
+            'total_customers': orders['customer_id'].nunique(),
+            'total_orders': len(orders),
+            'total_sales': orders['order_value'].sum(),
+            'total_profit': orders['profit'].sum(),
+            'order_value_p50': orders['order_value'].quantile(0.5),
+            'order_value_p90': orders['order_value'].quantile(0.9),
+            'order_value_p99': orders['order_value'].quantile(0.99),
+        }])
+        return _finish(result, 'total_sales')
+
+    def get_data_summary(self):
+        month = self.data['order_date'].dt.to_period('M').dt.to_timestamp()
+        return pd.DataFrame([{
+            'total_records': np.int64(len(self.data)),
+            'first_month': month.min(),
+            'last_month': month.max(),
+        }])
+
+    def get_customer_spending(self, limit=20):
+        result = self._group(self.data, 'customer_name').agg(
+            total_orders=('sales', 'size'),
+            total_sales=('sales', 'sum'),
+            total_profit=('profit', 'sum'),
+        ).reset_index()
+        result['total_rows'] = len(result)
+        return _finish(result, ['total_sales', 'customer_name'], limit, ascending=[False, True])
+
+    def get_product_sales(self, limit=20):
+        result = self._group(self.data, ['product_name', 'category']).agg(
+            total_quantity=('quantity', 'sum'),
+            total_sales=('sales', 'sum'),
+            total_profit=('profit', 'sum'),
+        ).reset_index()
+        result['total_rows'] = len(result)
+        return _finish(result, ['total_quantity', 'product_name', 'category'], limit, ascending=[False, True, True])
+
+    def get_recent_orders(self, limit=20):
+        result = self._group(self.data, ['order_id', 'order_date']).agg(
+            customer_name=('customer_name', 'first'),
+            total_sales=('sales', 'sum'),
+            total_profit=('profit', 'sum'),
+            items_count=('sales', 'size'),
+        ).reset_index()
+        result['total_rows'] = len(result)
+        result = result[['order_id', 'customer_name', 'order_date', 'total_sales', 'total_profit', 'items_count', 'total_rows']]
+        return _finish(result, ['order_date', 'order_id'], limit, ascending=[False, True])
+
+    def get_filter_options(self):
+        result = pd.concat([
+            pd.DataFrame({'filter': name, 'value': self.data[column].dropna().astype(str).unique()})
+            for name, column in (('region', 'region'), ('segment', 'segment'),
+                                 ('category', 'category'), ('seller', 'seller_name'))
+        ], ignore_index=True)
+        return result.sort_values(['filter', 'value'], ignore_index=True)
+
+    def load_filter_store(self):
+        return FilterStore.from_frame(self.data)
+
+def _finish(result, sort_by, limit=None, ascending=False):
+    """Sort + limit seperti ORDER BY ... LIMIT, kolom kategori kembali jadi string"""
+    for col in result.columns:
+        if isinstance(result[col].dtype, pd.CategoricalDtype):
+            result[col] = result[col].astype(object)
+        elif pd.api.types.is_integer_dtype(result[col]):
+            result[col] = result[col].astype(np.int64)
+        elif pd.api.types.is_float_dtype(result[col]):
+            result[col] = result[col].astype(np.float64)
+    result = result.sort_values(sort_by, ascending=ascending, kind='stable')
+    if limit is not None:
+        result = result.head(int(limit))
+    return result.reset_index(drop=True)
+
+class CsvSource(FrameSource):
+    """Order line dari file CSV dengan kolom seperti superstore_data.csv"""
+
+    def __init__(self, path):
+        self.name = f"csv:{path}"
+        super().__init__(pd.read_csv(path, parse_dates=['order_date', 'ship_date']))
+
+class ParquetSource(FrameSource):
+    """Order line dari file Parquet dengan kolom seperti superstore_data.csv"""
+
+    def __init__(self, path):
+        self.name = f"parquet:{path}"
+        super().__init__(pd.read_parquet(path))
+
+def make_source(spec=None):
+    """Buat DataSource dari spec: "postgres", "csv:<path>" atau "parquet:<path>" """
+    spec = spec or DEFAULT_SOURCE
+    kind, _, path = spec.partition(":")
+    if kind == "postgres":
+        return PostgresSource()
+    if kind == "csv":
+        return CsvSource(path or "superstore_data.csv")
+    if kind == "parquet":
+        return ParquetSource(path)
+    raise ValueError(f"Sumber data tidak dikenal: {spec}")
+
+# ==============================
+# COMPARE BACKENDS
+# ==============================
+def frames_equal(left, right):
+    """Bandingkan dua hasil agregat (kolom, jumlah baris & nilai, toleransi float)"""
+    if list(left.columns) != list(right.columns) or len(left) != len(right):
+        return False
+    for col in left.columns:
+        a, b = left[col], right[col]
+        if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            if not np.allclose(a.astype(float), b.astype(float), rtol=1e-6, equal_nan=True):
+                return False
+        elif not (a.astype(str).values == b.astype(str).values).all():
+            return False
+    return True
+
+def compare_sources(sources, repeat=5):
+    """Jalankan setiap agregat di semua sumber; print latency median & apakah hasil sama"""
+    for agg in AGGREGATES:
+        results = []
+        for source in sources:
+            func = getattr(source, agg)
+            result = func()
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - start) * 1000)
+            results.append((source.name, result, sorted(timings)[len(timings) // 2]))
+        base = results[0][1]
+        line = "  ".join(f"{name}={ms:8.2f}ms" for name, _, ms in results)
+        same = all(frames_equal(base, result) for _, result, _ in results[1:])
+        print(f"{agg:26s} {line}  {'SAMA' if same else 'BEDA'}")
+
+if __name__ == "__main__":
+    specs = sys.argv[1:] or ["postgres", "csv:superstore_data.csv"]
+    compare_sources([make_source(spec) for spec in specs])
@@ -0,0 +1,203 @@
+# db.py
+# Konfigurasi koneksi terpusat untuk semua script.
+#
+# - writer : dipakai ETL (convert.py, add_sellers.py, rfm.py, partitions.py,
+#            star_schema.py) untuk INSERT/UPDATE/DDL.
+# - readers: dipakai query dashboard di config.py. Bisa lebih dari satu
+#            (replica), dipilih round-robin. Replica yang lag-nya melebihi
+#            max_lag_seconds dilewati; kalau semua reader lag/mati, query
+#            dialihkan ke writer.
+#
+# Urutan sumber konfigurasi (yang pertama ada dipakai):
+#   1. env var SUPERSTORE_WRITER_DSN, SUPERSTORE_READER_DSNS (dipisah koma),
+#      SUPERSTORE_MAX_LAG_SECONDS
+#   2. SUPERSTORE_DSN (lama) -> writer sekaligus satu-satunya reader
+#   3. file konfigurasi SUPERSTORE_DB_CONFIG (default db.ini), lihat db.ini.example
+#   4. default localhost:5432
+import os
+import time
+import logging
+import threading
+import configparser
+from contextlib import contextmanager
+
+import psycopg2
+
+logger = logging.getLogger("superstore.db")
+
+DEFAULT_DSN = "dbname=superstore user=postgres password=2436 host=localhost port=5432"
+CONFIG_FILE = os.environ.get("SUPERSTORE_DB_CONFIG", "db.ini")
+
+# Hasil cek lag replica di-cache sekian detik supaya tidak dicek tiap query
+LAG_CHECK_INTERVAL = 5.0
+
+# Koneksi idle yang disimpan per DSN untuk ReaderPool.connection()
+POOL_SIZE = int(os.environ.get("SUPERSTORE_READER_POOL_SIZE", "4"))
+
+# Replica dianggap tidak lag kalau semua WAL yang diterima sudah di-replay
+# (replay timestamp tetap tua kalau writer memang sedang idle)
+LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+def _split(value):
+    return [dsn.strip() for dsn in value.split(",") if dsn.strip()]
+
+def load_settings():
+    """Return dict writer (DSN), readers (list DSN) dan max_lag_seconds (None = tanpa cek)"""
+    parser = configparser.ConfigParser()
+    parser.read(CONFIG_FILE)
+    section = parser["database"] if parser.has_section("database") else {}
+
+    writer = (
+        os.environ.get("SUPERSTORE_WRITER_DSN")
+        or os.environ.get("SUPERSTORE_DSN")
+        or section.get("writer")
+        or DEFAULT_DSN
+    )
+    if os.environ.get("SUPERSTORE_READER_DSNS"):
+        readers = _split(os.environ["SUPERSTORE_READER_DSNS"])
+    elif os.environ.get("SUPERSTORE_DSN"):
+        readers = [os.environ["SUPERSTORE_DSN"]]
+    else:
+        readers = _split(section.get("readers", "")) or [writer]
+
+    max_lag = os.environ.get("SUPERSTORE_MAX_LAG_SECONDS") or section.get("max_lag_seconds")
+    return {
+        'writer': writer,
+        'readers': readers,
+        'max_lag_seconds': float(max_lag) if max_lag else None,
+    }
+
+def writer_dsn():
+    return load_settings()['writer']
+
+def connect_writer():
+    """Koneksi baru ke writer (untuk ETL)"""
+    return psycopg2.connect(writer_dsn())
+
+def replica_lag(conn):
+    """Lag replay replica dalam detik (0 untuk primary)"""
+    cur = conn.cursor()
+    try:
+        cur.execute(LAG_QUERY)
+        lag = float(cur.fetchone()[0])
+    finally:
+        cur.close()
+    conn.rollback()
+    return lag
+
+class ReaderPool:
+    """Koneksi ke reader DSN, dipilih round-robin.
+
+    get() mengembalikan koneksi (bersama) reader berikutnya yang sehat dan
+    (kalau max_lag_seconds diset) lag-nya di bawah batas. Kalau tidak ada,
+    pakai koneksi writer sebagai fallback.
+
+    connection() memilih DSN dengan cara yang sama tapi meminjamkan koneksi
+    sendiri selama blok with, sehingga beberapa query dari thread berbeda
+    bisa jalan paralel (koneksi psycopg2 yang dipakai bersama diserialisasi).
+    """
+
+    def __init__(self, readers=None, writer=None, max_lag_seconds=None):
+        settings = load_settings()
+        self.readers = list(readers or settings['readers'])
+        self.writer = writer or settings['writer']
+        self.max_lag_seconds = max_lag_seconds if max_lag_seconds is not None else settings['max_lag_seconds']
+        self._conns = {}
+        self._idle = {}
+        self._lag = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _connection(self, dsn):
+        conn = self._conns.get(dsn)
+        if conn is None or conn.closed:
+            conn = psycopg2.connect(dsn)
+            self._conns[dsn] = conn
+        return conn
+
+    def _lag_ok(self, dsn, conn):
+        if self.max_lag_seconds is None:
+            return True
+        checked_at, lag = self._lag.get(dsn, (0.0, None))
+        if lag is None or time.monotonic() - checked_at > LAG_CHECK_INTERVAL:
+            lag = replica_lag(conn)
+            self._lag[dsn] = (time.monotonic(), lag)
+        if lag > self.max_lag_seconds:
+            logger.warning("reader %s lag %.1fs > %.1fs, dilewati", _host(dsn), lag, self.max_lag_seconds)
+            return False
+        return True
+
+    def _pick(self):
+        """(dsn, koneksi bersama) reader berikutnya yang sehat, atau writer. Dipanggil dengan lock."""
+        for _ in range(len(self.readers)):
+            dsn = self.readers[self._next % len(self.readers)]
+            self._next += 1
+            try:
+                conn = self._connection(dsn)
+                if self._lag_ok(dsn, conn):
+                    return dsn, conn
+            except psycopg2.Error as e:
+                logger.warning("reader %s tidak bisa dipakai: %s", _host(dsn), e)
+                self._conns.pop(dsn, None)
+        logger.warning("tidak ada reader yang sehat, query dialihkan ke writer")
+        return self.writer, self._connection(self.writer)
+
+    def get(self):
+        with self._lock:
+            return self._pick()[1]
+
+    @contextmanager
+    def connection(self):
+        """Pinjam koneksi reader khusus untuk thread ini selama blok with"""
+        with self._lock:
+            dsn = self._pick()[0]
+            idle = self._idle.setdefault(dsn, [])
+            conn = idle.pop() if idle else None
+        if conn is None or conn.closed:
+            conn = psycopg2.connect(dsn)
+        try:
+            yield conn
+        finally:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    conn.close()
+            with self._lock:
+                idle = self._idle.setdefault(dsn, [])
+                if not conn.closed and len(idle) < POOL_SIZE:
+                    idle.append(conn)
+                elif not conn.closed:
+                    conn.close()
+
+    def status(self):
+        """List dict per reader: dsn host, connected, lag terakhir"""
+        with self._lock:
+            return [
+                {
+                    'reader': _host(dsn),
+                    'connected': dsn in self._conns and not self._conns[dsn].closed,
+                    'lag_seconds': self._lag.get(dsn, (None, None))[1],
+                }
+                for dsn in self.readers
+            ]
+
+    def close(self):
+        with self._lock:
+            for conn in list(self._conns.values()) + [c for idle in self._idle.values() for c in idle]:
+                if not conn.closed:
+                    conn.close()
+            self._conns.clear()
+            self._idle.clear()
+            self._lag.clear()
+
+def _host(dsn):
+    """DSN tanpa password untuk log"""
+    params = psycopg2.extensions.parse_dsn(dsn)
+    return f"{params.get('host', 'localhost')}:{params.get('port', '5432')}/{params.get('dbname', '')}"
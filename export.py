@@ -0,0 +1,303 @@
+# export.py
+# Export dataset analytics (load_data atau query config.py lain) ke CSV/Parquet
+# secara streaming, tanpa menampung seluruh hasil di memori.
+#
+# - Postgres: COPY (query) TO STDOUT dialirkan lewat pipe ke reader CSV
+#   streaming pyarrow, per blok jadi RecordBatch. CSV tanpa partisi langsung
+#   ditulis dari COPY ke file.
+# - DuckDB (SUPERSTORE_BACKEND=duckdb): fetch_record_batch dari snapshot.
+#
+# Parquet ditulis per row group ROW_GROUP_SIZE baris (zstd). Opsional output
+# dipecah per bulan/tahun dari kolom tanggal: satu file per periode di folder
+# tujuan; baris yang ditahan semua file partisi dibatasi MAX_PENDING_ROWS.
+#
+# --query hanya menerima fungsi config.py yang punya SQL builder
+# (config.EXPORT_QUERIES), supaya yang di-export persis hasil fungsinya.
+#
+#   python export.py superstore.parquet
+#   python export.py export/ --format csv --partition-by month
+#   python export.py top.csv --query get_top_products --start-date 2017-01-01
+#   python export.py losses.parquet --sql "SELECT * FROM fact_order_line WHERE profit < 0"
+import os
+import sys
+import time
+import argparse
+import threading
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import config
+from extract import bind_query, describe_query
+from snapshot import convert_options
+
+ROW_GROUP_SIZE = 128 * 1024
+# ukuran blok CSV yang di-parse sekaligus dari stream COPY
+BLOCK_SIZE = 4 * 1024 * 1024
+DUCKDB_BATCH_ROWS = 64 * 1024
+# Maksimal baris yang ditahan semua sink partisi sekaligus; di atas itu sink
+# terbesar di-flush jadi row group
+MAX_PENDING_ROWS = ROW_GROUP_SIZE
+
+# partition_by -> jumlah karakter prefix 'YYYY-MM-DD' yang jadi kunci file
+PARTITIONS = {'year': 4, 'month': 7}
+
+# ==============================
+# SUMBER RECORD BATCH
+# ==============================
+def _copy_sql(query):
+    return f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+
+def _postgres_batches(query, params=None):
+    """(schema, iterator RecordBatch) dari COPY TO STDOUT lewat pipe.
+
+    COPY jalan di thread terpisah dan menulis ke ujung tulis pipe, reader
+    CSV pyarrow membaca ujung lainnya per BLOCK_SIZE, jadi memori yang
+    dipakai sebatas beberapa blok.
+    """
+    conn = config.readers.get()
+    query = bind_query(conn, query, params)
+    cur = conn.cursor()
+    columns = describe_query(cur, query)
+    cur.close()
+
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def produce():
+        try:
+            with os.fdopen(write_fd, 'wb') as out:
+                cur = conn.cursor()
+                cur.copy_expert(_copy_sql(query), out)
+                cur.close()
+        except Exception as e:
+            errors.append(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    source = os.fdopen(read_fd, 'rb')
+    reader = pacsv.open_csv(
+        source,
+        read_options=pacsv.ReadOptions(block_size=BLOCK_SIZE),
+        convert_options=convert_options(columns),
+    )
+
+    def batches():
+        try:
+            for batch in reader:
+                yield batch
+        finally:
+            source.close()
+            producer.join()
+            conn.rollback()
+        if errors:
+            raise errors[0]
+
+    return reader.schema, batches()
+
+def _duckdb_batches(query, params=None):
+    from snapshot import to_duckdb_sql
+    cur = config.duck.cursor()
+    cur.execute(to_duckdb_sql(query, params), params or None)
+    reader = cur.fetch_record_batch(DUCKDB_BATCH_ROWS)
+
+    def batches():
+        try:
+            yield from reader
+        finally:
+            cur.close()
+
+    return reader.schema, batches()
+
+def record_batches(query, params=None):
+    """(schema, iterator RecordBatch) hasil query dari backend aktif config.py"""
+    if config.duck is not None:
+        return _duckdb_batches(query, params)
+    return _postgres_batches(query, params)
+
+# ==============================
+# WRITER
+# ==============================
+class _ParquetSink:
+    """ParquetWriter yang menahan batch sampai ROW_GROUP_SIZE baris per row group"""
+
+    def __init__(self, path, schema):
+        self.writer = pq.ParquetWriter(path, schema, compression='zstd')
+        self.pending = []
+        self.pending_rows = 0
+
+    def write(self, batch):
+        self.pending.append(batch)
+        self.pending_rows += batch.num_rows
+        if self.pending_rows >= ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.writer.write_table(pa.Table.from_batches(self.pending), row_group_size=ROW_GROUP_SIZE)
+            self.pending = []
+            self.pending_rows = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+class _CsvSink:
+    # CSVWriter langsung menulis setiap batch, tidak ada yang ditahan
+    pending_rows = 0
+
+    def __init__(self, path, schema):
+        self.writer = pacsv.CSVWriter(path, schema)
+
+    def write(self, batch):
+        self.writer.write_batch(batch)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.writer.close()
+
+SINKS = {'parquet': _ParquetSink, 'csv': _CsvSink}
+
+def _partition_keys(batch, column, partition_by):
+    """Kunci partisi ('YYYY' / 'YYYY-MM') per baris dari kolom tanggal"""
+    values = pc.cast(batch.column(column), pa.string())
+    return pc.utf8_slice_codeunits(values, 0, PARTITIONS[partition_by])
+
+def _write_partitioned(batches, schema, out_dir, fmt, partition_by, date_column):
+    """Tulis batch ke satu file per partisi di out_dir; return jumlah baris.
+
+    Sink partisi yang kuncinya tidak muncul lagi di batch berikutnya langsung
+    ditutup: hasil yang urut tanggal (load_data) tidak pernah kembali ke
+    periode sebelumnya, jadi yang terbuka hanya periode di batch terakhir.
+    Kalau kunci yang sudah ditutup muncul lagi (query tidak urut), barisnya
+    masuk file baru {kunci}-{n}. Baris yang ditahan semua sink dibatasi
+    MAX_PENDING_ROWS. File ditulis sebagai .tmp dan di-rename setelah export
+    selesai, sama seperti output satu file.
+    """
+    if schema.get_field_index(date_column) < 0:
+        raise ValueError(f"Kolom {date_column} tidak ada di hasil query, tidak bisa dipartisi")
+    os.makedirs(out_dir, exist_ok=True)
+    sinks = {}
+    files = {}
+    done = []
+    rows = 0
+
+    def open_sink(name):
+        count = files.get(name, 0)
+        files[name] = count + 1
+        path = os.path.join(out_dir, f"{name}.{fmt}" if count == 0 else f"{name}-{count}.{fmt}")
+        sinks[name] = (SINKS[fmt](path + ".tmp", schema), path)
+
+    def close_sink(name):
+        sink, path = sinks.pop(name)
+        sink.close()
+        done.append(path)
+
+    try:
+        for batch in batches:
+            keys = _partition_keys(batch, date_column, partition_by)
+            seen = set()
+            for key in pc.unique(keys).to_pylist():
+                part = batch.filter(pc.equal(keys, key)) if key is not None else batch.filter(pc.is_null(keys))
+                name = key or "unknown"
+                seen.add(name)
+                if name not in sinks:
+                    open_sink(name)
+                sinks[name][0].write(part)
+            for name in [name for name in sinks if name not in seen]:
+                close_sink(name)
+            while sum(sink.pending_rows for sink, _ in sinks.values()) > MAX_PENDING_ROWS:
+                max((sink for sink, _ in sinks.values()), key=lambda sink: sink.pending_rows).flush()
+            rows += batch.num_rows
+    finally:
+        for name in list(sinks):
+            close_sink(name)
+    for path in done:
+        os.replace(path + ".tmp", path)
+    return rows
+
+def export_query(query, path, params=None, fmt=None, partition_by=None, date_column='order_date'):
+    """Stream hasil query ke path (file, atau folder kalau partition_by diisi).
+
+    fmt "csv" / "parquet" (default dari ekstensi path, folder -> parquet).
+    partition_by "month" / "year" memecah output per periode date_column.
+    Return jumlah baris yang ditulis.
+    """
+    if fmt is None:
+        fmt = "csv" if path.endswith(".csv") else "parquet"
+    if fmt not in SINKS:
+        raise ValueError(f"Format tidak dikenal: {fmt} (pakai csv atau parquet)")
+    if partition_by is not None and partition_by not in PARTITIONS:
+        raise ValueError(f"partition_by harus salah satu dari {sorted(PARTITIONS)}")
+
+    if partition_by is None and fmt == "csv" and config.duck is None:
+        return _copy_csv(query, path, params)
+
+    schema, batches = record_batches(query, params)
+    if partition_by is not None:
+        return _write_partitioned(batches, schema, path, fmt, partition_by, date_column)
+
+    tmp_path = path + ".tmp"
+    sink = SINKS[fmt](tmp_path, schema)
+    rows = 0
+    try:
+        for batch in batches:
+            sink.write(batch)
+            rows += batch.num_rows
+    finally:
+        sink.close()
+    os.replace(tmp_path, path)
+    return rows
+
+def _copy_csv(query, path, params=None):
+    """CSV tanpa partisi: COPY TO STDOUT langsung ke file, tanpa parse sama sekali"""
+    conn = config.readers.get()
+    tmp_path = path + ".tmp"
+    cur = conn.cursor()
+    try:
+        with open(tmp_path, 'wb') as out:
+            cur.copy_expert(_copy_sql(bind_query(conn, query, params)), out)
+        rows = cur.rowcount
+    finally:
+        cur.close()
+        conn.rollback()
+    os.replace(tmp_path, path)
+    return rows
+
+def export_function(func, path, *args, fmt=None, partition_by=None, date_column='order_date', **kwargs):
+    """Export hasil fungsi query config.py (objek fungsi atau nama, mis. "load_data").
+
+    Hanya fungsi di config.EXPORT_QUERIES; lainnya ValueError.
+    """
+    query, params = config.query_sql(func, *args, **kwargs)
+    return export_query(query, path, params, fmt, partition_by, date_column)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export streaming dataset ke CSV / Parquet")
+    parser.add_argument("output", help="file tujuan, atau folder kalau --partition-by")
+    parser.add_argument("--query", default="load_data", choices=sorted(config.EXPORT_QUERIES),
+                        help="fungsi config.py yang di-export (default load_data)")
+    parser.add_argument("--sql", help="SQL bebas (menggantikan --query)")
+    parser.add_argument("--start-date")
+    parser.add_argument("--end-date")
+    parser.add_argument("--format", choices=sorted(SINKS))
+    parser.add_argument("--partition-by", choices=sorted(PARTITIONS))
+    parser.add_argument("--date-column", default="order_date")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    options = dict(fmt=args.format, partition_by=args.partition_by, date_column=args.date_column)
+    if args.sql:
+        rows = export_query(args.sql, args.output, **options)
+    else:
+        dates = {key: value for key, value in
+                 (('start_date', args.start_date), ('end_date', args.end_date)) if value is not None}
+        rows = export_function(args.query, args.output, **options, **dates)
+    print(f"{rows:,} baris ditulis ke {args.output} ({time.perf_counter() - start:.1f}s)")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# extract.py
+# Fast extract path: jalankan query lewat COPY (SELECT ...) TO STDOUT lalu
+# parse stream CSV langsung ke kolom bertipe dengan reader pandas/pyarrow.
+# Jauh lebih cepat dari pd.read_sql yang membuat object Python per nilai.
+#
+# NULL vs string kosong: COPY CSV menulis NULL sebagai field kosong tanpa
+# quote dan '' sebagai "". Reader pyarrow membedakan keduanya
+# (quoted_strings_can_be_null=False); reader pandas "c" tidak, jadi di jalur
+# itu NULL dikirim sebagai NULL_MARKER.
+import tempfile
+import pandas as pd
+from psycopg2.extensions import encodings
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# Buffer COPY di memori sampai ukuran ini, selebihnya spill ke file temp
+SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+# OID tipe Postgres -> cara parse kolom CSV
+INT_OIDS = {20, 21, 23}            # int8, int2, int4
+FLOAT_OIDS = {700, 701, 1700}      # float4, float8, numeric
+BOOL_OIDS = {16}
+DATE_OIDS = {1082, 1114}           # date, timestamp
+TIMESTAMPTZ_OIDS = {1184}
+
+# Penanda NULL COPY untuk reader pandas "c" (lihat header)
+NULL_MARKER = r'\N'
+
+def _strip_query(query):
+    return query.strip().rstrip(';').strip()
+
+def bind_query(conn, query, params=None):
+    """Gabungkan params ke query (COPY tidak mendukung parameter server-side)"""
+    query = _strip_query(query)
+    if not params:
+        return query
+    cur = conn.cursor()
+    bound = cur.mogrify(query, params).decode(encodings[conn.encoding])
+    cur.close()
+    return bound
+
+def describe_query(cur, query):
+    """Ambil (nama kolom, type OID) hasil query tanpa mengeksekusi datanya"""
+    cur.execute(f"SELECT * FROM ({query}) q LIMIT 0")
+    return [(col.name, col.type_code) for col in cur.description]
+
+def copy_query(conn, query, params=None, out=None, null=None):
+    """Stream hasil query sebagai CSV (dengan header) ke file object out.
+
+    null: penanda NULL (mis. NULL_MARKER); default COPY = field kosong tanpa quote.
+    Return file object (SpooledTemporaryFile kalau out=None), posisi di awal.
+    """
+    cur = conn.cursor()
+    query = bind_query(conn, query, params)
+    if out is None:
+        out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode='w+b')
+    options = "FORMAT csv, HEADER true"
+    if null is not None:
+        options += f", NULL '{null}'"
+    cur.copy_expert(f"COPY ({query}) TO STDOUT WITH ({options})", out)
+    cur.close()
+    out.seek(0)
+    return out
+
+def _arrow_type(oid):
+    """Type OID Postgres -> tipe Arrow untuk read_sql_copy (date & timestamp jadi datetime64)"""
+    if oid in INT_OIDS:
+        return pa.int64()
+    if oid in FLOAT_OIDS:
+        return pa.float64()
+    if oid in BOOL_OIDS:
+        return pa.bool_()
+    if oid in DATE_OIDS:
+        return pa.timestamp('us')
+    if oid in TIMESTAMPTZ_OIDS:
+        return pa.timestamp('us', tz='UTC')
+    return pa.string()
+
+def _read_arrow(buf, columns):
+    """CSV COPY -> DataFrame lewat pyarrow.csv; field kosong tanpa quote = NULL, "" = ''"""
+    convert = pacsv.ConvertOptions(
+        column_types={name: _arrow_type(oid) for name, oid in columns},
+        true_values=['t'],
+        false_values=['f'],
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False,
+    )
+    return pacsv.read_csv(buf, convert_options=convert).to_pandas()
+
+def _read_pandas(buf, columns):
+    """CSV COPY (NULL = NULL_MARKER) -> DataFrame lewat reader pandas "c" """
+    dtype = {}
+    parse_dates = []
+    tz_columns = []
+    bool_columns = []
+    for name, oid in columns:
+        if oid in INT_OIDS:
+            # biarkan parser infer: int64, atau float64 kalau ada NULL
+            continue
+        elif oid in FLOAT_OIDS:
+            dtype[name] = 'float64'
+        elif oid in BOOL_OIDS:
+            dtype[name] = 'str'
+            bool_columns.append(name)
+        elif oid in DATE_OIDS:
+            parse_dates.append(name)
+        elif oid in TIMESTAMPTZ_OIDS:
+            tz_columns.append(name)
+        else:
+            dtype[name] = 'str'
+
+    data = pd.read_csv(
+        buf,
+        engine="c",
+        dtype=dtype,
+        parse_dates=parse_dates or None,
+        keep_default_na=False,
+        na_values=[NULL_MARKER]
+    )
+    for name in tz_columns:
+        data[name] = pd.to_datetime(data[name], utc=True, format='ISO8601')
+    for name in bool_columns:
+        data[name] = data[name].map({'t': True, 'f': False})
+    return data
+
+def _empty_frame(columns, arrow):
+    """DataFrame 0 baris dengan kolom (dan sebisanya dtype) hasil query"""
+    if arrow:
+        return pa.schema([(name, _arrow_type(oid)) for name, oid in columns]).empty_table().to_pandas()
+    dtype = {oid: 'float64' for oid in FLOAT_OIDS}
+    return pd.DataFrame({name: pd.Series(dtype=dtype.get(oid, 'object')) for name, oid in columns})
+
+def read_sql_copy(query, conn, params=None):
+    """Pengganti pd.read_sql(query, conn, params) lewat COPY TO STDOUT.
+
+    Tipe kolom diambil dari metadata query (LIMIT 0) supaya teks seperti
+    postal_code tetap string dan kolom tanggal langsung jadi datetime64.
+    NULL jadi NaN/None, string kosong tetap '' (sama dengan pd.read_sql).
+    """
+    query = bind_query(conn, query, params)
+    cur = conn.cursor()
+    columns = describe_query(cur, query)
+    cur.close()
+
+    arrow = CSV_ENGINE == "pyarrow"
+    buf = copy_query(conn, query, null=None if arrow else NULL_MARKER)
+    try:
+        if buf.read(1) == b'':
+            return _empty_frame(columns, arrow)
+        buf.seek(0)
+        return _read_arrow(buf, columns) if arrow else _read_pandas(buf, columns)
+    finally:
+        buf.close()
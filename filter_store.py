@@ -0,0 +1,733 @@
+# filter_store.py
+# Store kolumnar in-memory untuk filter global dashboard (rentang tanggal,
+# region, segment, kategori, seller).
+#
+# Order line disimpan sebagai array numpy per kolom, urut order_date:
+# - dimensi jadi kode integer kecil (kode 0 = kosong), measure float64
+# - filter tanggal = searchsorted (rentang baris kontigu, tanpa scan)
+# - filter dimensi = lookup tabel boolean per kode (allowed[kode])
+# - agregat = np.bincount per kode entity (customer/produk/seller/order)
+# Tidak ada groupby pandas atau query database saat widget filter berubah,
+# jadi satu halaman dihitung dalam hitungan milidetik walau jutaan baris.
+#
+# get_* mengembalikan kolom & urutan yang sama dengan fungsi DataSource /
+# config.py, jadi halaman dashboard bisa memakai keduanya.
+#
+#   python filter_store.py                     # benchmark dari sumber default
+#   python filter_store.py parquet:ld.parquet
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# key filter -> kolom kode per line
+FILTER_COLUMNS = {
+    'regions': 'region',
+    'segments': 'segment',
+    'categories': 'category',
+    'sellers': 'seller',
+}
+
+# Rollup bulanan: nama -> (kolom kode sel per line, shape). 'loss' = rollup
+# produk khusus line dengan profit < 0
+ROLLUPS = {
+    'cube': ('cell', 'cube'),
+    'product': ('product_cell', 'product'),
+    'loss': ('product_cell', 'product'),
+}
+
+# Sumbu cube sesudah bulan (sumbu 0); filter dimensi = masking per sumbu
+CUBE_COLUMNS = ['region', 'segment', 'category', 'seller']
+CUBE_AXES = {column: axis for axis, column in enumerate(CUBE_COLUMNS, start=1)}
+MEASURES = ('lines', 'quantity', 'sales', 'profit')
+
+# Jumlah hasil seleksi (per kombinasi filter) yang disimpan
+SELECTION_CACHE_SIZE = 8
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+def _int_dtype(n):
+    """dtype integer terkecil untuk kode 0..n"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def _encode(values):
+    """(kode, label): kode 0 untuk kosong/NaN, label[0] = None, label lain terurut"""
+    codes, uniques = pd.factorize(values, sort=True)
+    labels = np.empty(len(uniques) + 1, dtype=object)
+    labels[1:] = np.asarray(uniques, dtype=object)
+    return (codes + 1).astype(_int_dtype(len(labels))), labels
+
+def _days(dates):
+    """Tanggal -> jumlah hari sejak 1970-01-01 (int32)"""
+    dates = np.asarray(pd.to_datetime(dates).values, dtype='datetime64[D]')
+    return (dates - EPOCH).astype(np.int32)
+
+def _first(codes, values, size):
+    """Nilai values pada kemunculan pertama tiap kode (array panjang size)"""
+    unique, index = np.unique(codes, return_index=True)
+    result = np.zeros(size, dtype=np.asarray(values).dtype)
+    result[unique] = np.asarray(values)[index]
+    return result
+
+def _lookup(keys, values, size):
+    """Array panjang size dengan values[i] di posisi keys[i] (key surrogate -> atribut)"""
+    values = np.asarray(values)
+    result = np.zeros(size, dtype=values.dtype) if values.dtype != object else np.full(size, None, dtype=object)
+    result[np.asarray(keys)] = values
+    return result
+
+def active_filters(filters):
+    """True kalau ada filter yang benar-benar membatasi data"""
+    return bool(filters) and any(value not in (None, [], ()) for value in filters.values())
+
+def filters_key(filters):
+    """Key hashable dari dict filter (untuk cache)"""
+    return tuple(sorted(
+        (name, tuple(sorted(value)) if isinstance(value, (list, tuple, set)) else value)
+        for name, value in (filters or {}).items()
+        if value not in (None, [], ())
+    ))
+
+def _pairs(names, categories):
+    """Kode (product_name, category) terurut + array label nama & kategori per kode"""
+    codes, uniques = pd.factorize(pd.MultiIndex.from_arrays([names, categories]), sort=True)
+    return (
+        codes.astype(np.int32),
+        np.asarray(uniques.get_level_values(0), dtype=object),
+        np.asarray(uniques.get_level_values(1), dtype=object),
+    )
+
+class _Selection:
+    """Order line yang lolos filter.
+
+    Baris (slice kalau hanya filter tanggal, selain itu array index) baru
+    dihitung saat agregat per entity memintanya; agregat per bulan / region /
+    segment / kategori / seller cukup membaca rollup (lihat cube()).
+    Kolom & hasil bincount di-cache, jadi agregat satu halaman berbagi scan.
+    """
+
+    def __init__(self, store, lo, hi, start_day, end_day, allowed):
+        self.store = store
+        self.lo, self.hi = lo, hi
+        self.start_day, self.end_day = start_day, end_day
+        # kolom yang difilter -> tabel boolean per kode
+        self.allowed = allowed
+        self._rows = None
+        self._columns = {}
+        self._sums = {}
+        self._cubes = {}
+        # hasil FilterStore._order_totals
+        self.orders = None
+
+    @property
+    def rows(self):
+        if self._rows is None:
+            if not self.allowed:
+                self._rows = slice(self.lo, self.hi)
+            else:
+                self._rows = np.flatnonzero(self.store._mask(self.lo, self.hi, self.allowed)) + self.lo
+        return self._rows
+
+    def column(self, name):
+        if name not in self._columns:
+            self._columns[name] = self.store.lines[name][self.rows]
+        return self._columns[name]
+
+    def sum(self, key, measure):
+        """Total measure ('lines' = jumlah line) per kode key, array sepanjang jumlah kode"""
+        if (key, measure) not in self._sums:
+            weights = None if measure == 'lines' else self.column(measure)
+            self._sums[key, measure] = np.bincount(
+                self.column(key), weights=weights, minlength=self.store.sizes[key]
+            )
+        return self._sums[key, measure]
+
+    def cube(self, measure):
+        """Measure per (bulan, region, segment, kategori, seller) untuk seleksi ini"""
+        if measure not in self._cubes:
+            self._cubes[measure] = self.store._cube(self, measure)
+        return self._cubes[measure]
+
+class FilterStore:
+    """Order line kolumnar + rollup bulanan + atribut entity, dengan agregat get_*(filters).
+
+    lines    : kolom per line, urut (day, order): day, order, product (kode
+               pasangan product_name+category), region, segment, category,
+               seller, cell & product_cell (kode sel rollup), quantity, sales, profit
+    rollup   : ROLLUPS -> measure -> array per bulan (cube: bulan x region x
+               segment x kategori x seller; product/loss: bulan x produk)
+    orders   : per kode order (urut tanggal): order_id, day, customer (distinct
+               count), customer_name (kode label), region, segment, total
+               lines/sales/profit
+    labels   : label per kode: region, segment, category, seller,
+               customer_name, product_name, product_category
+    sellers  : seller_region & seller_rating per kode seller
+    """
+
+    def __init__(self, lines, orders, labels, sellers):
+        days = lines['day']
+        first_month = int(_months(days.min())) if len(days) else 0
+        month = _months(days) - first_month
+        n_months = int(month.max()) + 1 if len(month) else 1
+        self.first_month = first_month
+        # hari pertama tiap bulan rollup (+ bulan sesudahnya), untuk memotong rentang tanggal
+        self.month_days = _month_days(first_month, n_months + 1)
+        self.shapes = {
+            'cube': (n_months,) + tuple(len(labels[column]) for column in CUBE_COLUMNS),
+            'product': (n_months, len(labels['product_name'])),
+        }
+        cell = month
+        for column, size in zip(CUBE_COLUMNS, self.shapes['cube'][1:]):
+            cell = cell * size + lines[column]
+        lines['cell'] = cell.astype(np.int32)
+        lines['product_cell'] = (month * self.shapes['product'][1] + lines['product']).astype(np.int32)
+
+        # urut (day, order), lalu kode order dinomori ulang sesuai urutan itu:
+        # order di satu rentang tanggal = rentang kode yang rapat & monoton
+        order = np.lexsort((lines['order'], days))
+        self.lines = {name: np.ascontiguousarray(values[order]) for name, values in lines.items()}
+        codes = self.lines['order']
+        first_line = np.r_[True, codes[1:] != codes[:-1]] if len(codes) else np.zeros(0, dtype=bool)
+        self.orders = {name: values[codes[first_line]] for name, values in orders.items()}
+        self.lines['order'] = (np.cumsum(first_line) - 1).astype(np.int32)
+        self.labels = labels
+        self.sellers = sellers
+        self.sizes = {
+            'product': len(labels['product_name']),
+            'order': len(self.orders['order_id']),
+            'cell': int(np.prod(self.shapes['cube'])),
+            'product_cell': int(np.prod(self.shapes['product'])),
+        }
+
+        # total per order + region/segment order (kalau konstan dalam satu order):
+        # filter tanggal/region/segment cukup memotong & memfilter array order
+        for measure in ('lines', 'sales', 'profit'):
+            self.orders[measure] = self._bincount(slice(None), 'order', measure)
+        self.order_columns = set()
+        for column in ('region', 'segment'):
+            self.orders[column] = self.lines[column][first_line]
+            if np.array_equal(self.orders[column][self.lines['order']], self.lines[column]):
+                self.order_columns.add(column)
+
+        self.rollup = {
+            name: {
+                measure: self._bincount(slice(None), column, measure, self._where(name, slice(None)))
+                         .reshape(self.shapes[shape])
+                for measure in MEASURES
+            }
+            for name, (column, shape) in ROLLUPS.items()
+        }
+        # kode kategori per kode produk, untuk filter kategori di rollup produk
+        category_code = {label: code for code, label in enumerate(labels['category'])}
+        self.product_category = np.array([category_code.get(label, 0) for label in labels['product_category']], dtype=np.int32)
+        self._selections = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _where(self, name, rows):
+        """Filter baris tambahan rollup name (loss = hanya line dengan profit < 0)"""
+        return self.lines['profit'][rows] < 0 if name == 'loss' else None
+
+    def _bincount(self, rows, key, measure, keep=None):
+        codes = self.lines[key][rows]
+        weights = None if measure == 'lines' else self.lines[measure][rows]
+        if keep is not None:
+            codes = codes[keep]
+            weights = None if weights is None else weights[keep]
+        return np.bincount(codes, weights=weights, minlength=self.sizes[key]).astype(np.float64)
+
+    @property
+    def rows(self):
+        return len(self.lines['day'])
+
+    def memory_mb(self):
+        """Total memori array line + order (MB)"""
+        arrays = list(self.lines.values()) + list(self.orders.values())
+        return sum(values.nbytes for values in arrays) / 1024 ** 2
+
+    # ==============================
+    # BUILD
+    # ==============================
+    @classmethod
+    def from_frame(cls, data):
+        """Dari DataFrame order line (kolom seperti config.load_data)"""
+        day = _days(data['order_date'])
+        order, order_keys = pd.factorize(pd.MultiIndex.from_arrays([data['order_id'], day]))
+        customer, _ = pd.factorize(data['customer_id'])
+        customer_name, customer_names = _encode(data['customer_name'])
+        product, product_names, product_categories = _pairs(data['product_name'], data['category'])
+        region, region_labels = _encode(data['region'])
+        segment, segment_labels = _encode(data['segment'])
+        category, category_labels = _encode(data['category'])
+        seller, seller_labels = _encode(data['seller_name'])
+        seller_region, seller_regions = _encode(data['seller_region'])
+        seller_rating = pd.to_numeric(data['seller_rating'], errors='coerce').to_numpy(np.float64)
+
+        n_orders = len(order_keys)
+        lines = {
+            'day': day,
+            'order': order.astype(np.int32),
+            'product': product,
+            'region': region,
+            'segment': segment,
+            'category': category,
+            'seller': seller,
+            'quantity': pd.to_numeric(data['quantity']).to_numpy(np.float64),
+            'sales': pd.to_numeric(data['sales']).to_numpy(np.float64),
+            'profit': pd.to_numeric(data['profit']).fillna(0).to_numpy(np.float64),
+        }
+        orders = {
+            'order_id': np.asarray(order_keys.get_level_values(0), dtype=object),
+            'day': np.asarray(order_keys.get_level_values(1), dtype=np.int32),
+            'customer': _first(order, customer.astype(np.int32), n_orders),
+            'customer_name': _first(order, customer_name.astype(np.int32), n_orders),
+        }
+        labels = {
+            'region': region_labels, 'segment': segment_labels,
+            'category': category_labels, 'seller': seller_labels,
+            'customer_name': customer_names,
+            'product_name': product_names, 'product_category': product_categories,
+        }
+        sellers = {
+            'seller_region': seller_regions[_first(seller, seller_region, len(seller_labels))],
+            'seller_rating': _first(seller, seller_rating, len(seller_labels)),
+        }
+        return cls(lines, orders, labels, sellers)
+
+    @classmethod
+    def from_star_schema(cls, config):
+        """Dari fact_order_line + dimensi lewat config.py (key surrogate = kode entity)"""
+        fact = config.load_fact_columns()
+        orders = config.load_dimension('dim_order')
+        customers = config.load_dimension('dim_customer')
+        products = config.load_dimension('dim_product')
+        sellers = config.load_dimension('dim_seller')
+
+        def size(dim, key):
+            values = [dim[key].max() if len(dim) else 0, fact[key].max() if len(fact) else 0]
+            return int(max(values)) + 1
+
+        n_orders = size(orders, 'order_key')
+        n_customers = size(customers, 'customer_key')
+        n_products = size(products, 'product_key')
+        n_sellers = size(sellers, 'seller_key')
+
+        customer_keys = customers['customer_key'].to_numpy()
+        product_keys = products['product_key'].to_numpy()
+        seller_keys = sellers['seller_key'].to_numpy()
+        region, region_labels = _encode(customers['region'].astype(object))
+        segment, segment_labels = _encode(customers['segment'].astype(object))
+        customer_name, customer_names = _encode(customers['customer_name'].astype(object))
+        category, category_labels = _encode(products['category_name'].astype(object))
+        product, product_names, product_categories = _pairs(
+            products['product_name'].astype(object), products['category_name'].astype(object)
+        )
+
+        customer = fact['customer_key'].to_numpy(np.int32)
+        product_key = fact['product_key'].to_numpy(np.int32)
+        order = fact['order_key'].to_numpy(np.int32)
+        day = _days(fact['order_date'])
+        lines = {
+            'day': day,
+            'order': order,
+            'product': _lookup(product_keys, product, n_products)[product_key],
+            'region': _lookup(customer_keys, region, n_customers)[customer],
+            'segment': _lookup(customer_keys, segment, n_customers)[customer],
+            'category': _lookup(product_keys, category, n_products)[product_key],
+            # kode seller = seller_key (0 = tanpa seller)
+            'seller': fact['seller_key'].to_numpy(_int_dtype(n_sellers)),
+            'quantity': fact['quantity'].to_numpy(np.float64),
+            'sales': pd.to_numeric(fact['sales']).to_numpy(np.float64),
+            'profit': pd.to_numeric(fact['profit']).to_numpy(np.float64),
+        }
+        order_customer = _first(order, customer, n_orders)
+        orders = {
+            'order_id': _lookup(orders['order_key'], orders['order_id'].astype(object), n_orders),
+            # order_date di fact = order_date dim_order (bagian dari key order)
+            'day': _first(order, day, n_orders),
+            'customer': order_customer,
+            'customer_name': _lookup(customer_keys, customer_name.astype(np.int32), n_customers)[order_customer],
+        }
+        labels = {
+            'region': region_labels, 'segment': segment_labels,
+            'category': category_labels,
+            'seller': _lookup(seller_keys, sellers['seller_name'].astype(object), n_sellers),
+            'customer_name': customer_names,
+            'product_name': product_names, 'product_category': product_categories,
+        }
+        sellers = {
+            'seller_region': _lookup(seller_keys, sellers['seller_region'].astype(object), n_sellers),
+            'seller_rating': _lookup(seller_keys, pd.to_numeric(sellers['seller_rating']).to_numpy(np.float64), n_sellers),
+        }
+        return cls(lines, orders, labels, sellers)
+
+    # ==============================
+    # FILTER
+    # ==============================
+    def options(self):
+        """dict filter -> list nilai yang bisa dipilih, plus min_date & max_date"""
+        result = {
+            key: sorted({label for label in self.labels[column] if label is not None})
+            for key, column in FILTER_COLUMNS.items()
+        }
+        days = self.lines['day']
+        result['min_date'] = (EPOCH + int(days[0])).astype(object) if len(days) else None
+        result['max_date'] = (EPOCH + int(days[-1])).astype(object) if len(days) else None
+        return result
+
+    def _allowed(self, column, values):
+        """Tabel boolean per kode: True kalau label kode ada di values"""
+        values = set(values)
+        return np.array([label is not None and label in values for label in self.labels[column]], dtype=bool)
+
+    def select(self, filters=None):
+        """_Selection baris yang lolos filter (di-cache per kombinasi filter)"""
+        key = filters_key(filters)
+        with self._lock:
+            if key in self._selections:
+                self._selections.move_to_end(key)
+                return self._selections[key]
+
+        filters = dict(key)
+        days = self.lines['day']
+        start_day = _days([filters['start_date']])[0] if filters.get('start_date') is not None else None
+        end_day = _days([filters['end_date']])[0] if filters.get('end_date') is not None else None
+        lo = int(np.searchsorted(days, start_day, side='left')) if start_day is not None else 0
+        hi = int(np.searchsorted(days, end_day, side='right')) if end_day is not None else len(days)
+        allowed = {
+            column: self._allowed(column, filters[name])
+            for name, column in FILTER_COLUMNS.items() if filters.get(name)
+        }
+        selection = _Selection(self, lo, max(lo, hi), start_day, end_day, allowed)
+
+        with self._lock:
+            self._selections[key] = selection
+            while len(self._selections) > SELECTION_CACHE_SIZE:
+                self._selections.popitem(last=False)
+        return selection
+
+    def _mask(self, lo, hi, allowed):
+        """Boolean per baris lo:hi yang lolos semua filter dimensi"""
+        mask = None
+        for column, keep in allowed.items():
+            keep = keep[self.lines[column][lo:hi]]
+            mask = keep if mask is None else mask & keep
+        return mask
+
+    def _rolled(self, sel, name, measure):
+        """Rollup name untuk rentang tanggal seleksi: bulan penuh dari
+        self.rollup, bulan terpotong di tepi rentang di-scan dari lines.
+        """
+        column, shape = ROLLUPS[name]
+        shape = self.shapes[shape]
+        result = np.zeros(shape)
+        month_days = self.month_days
+        first = int(np.searchsorted(month_days, sel.start_day, side='left')) if sel.start_day is not None else 0
+        end = (int(np.searchsorted(month_days, sel.end_day + 1, side='right')) - 1
+               if sel.end_day is not None else len(month_days) - 1)
+        edges = [(sel.lo, sel.hi)]
+        if first < end:
+            result[first:end] = self.rollup[name][measure][first:end]
+            days = self.lines['day']
+            edges = [
+                (sel.lo, int(np.searchsorted(days, month_days[first], side='left'))),
+                (int(np.searchsorted(days, month_days[end], side='left')), sel.hi),
+            ]
+        for lo, hi in edges:
+            if hi > lo:
+                rows = slice(lo, hi)
+                result += self._bincount(rows, column, measure, self._where(name, rows)).reshape(shape)
+        return result
+
+    def _cube(self, sel, measure):
+        """Rollup (bulan, region, segment, kategori, seller) seleksi, filter dimensi per sumbu"""
+        cube = self._rolled(sel, 'cube', measure)
+        for column, axis in CUBE_AXES.items():
+            if column in sel.allowed:
+                shape = [1] * cube.ndim
+                shape[axis] = -1
+                cube *= sel.allowed[column].reshape(shape)
+        return cube
+
+    # ==============================
+    # AGREGAT (kolom sama dengan DataSource)
+    # ==============================
+    def _order_totals(self, sel):
+        """(kode order yang punya line, lines, sales, profit per order tsb).
+
+        Tanpa filter kategori/seller cukup memotong total per order yang sudah
+        dihitung (kode order urut tanggal). Selain itu bincount line seleksi,
+        sepanjang rentang kode order seleksi saja.
+        """
+        if sel.orders is not None:
+            return sel.orders
+        if set(sel.allowed) <= self.order_columns:
+            codes = np.arange(0)
+            if sel.hi > sel.lo:
+                first, last = self.lines['order'][sel.lo], self.lines['order'][sel.hi - 1]
+                codes = np.arange(first, last + 1)
+                for column, keep in sel.allowed.items():
+                    codes = codes[keep[self.orders[column][codes]]]
+            sel.orders = (codes,) + tuple(self.orders[measure][codes] for measure in ('lines', 'sales', 'profit'))
+            return sel.orders
+
+        codes = sel.column('order')
+        offset = int(codes[0]) if len(codes) else 0
+        local = codes - offset
+        lines = np.bincount(local)
+        present = np.flatnonzero(lines)
+        sel.orders = (
+            present + offset,
+            lines[present],
+            np.bincount(local, weights=sel.column('sales'))[present],
+            np.bincount(local, weights=sel.column('profit'))[present],
+        )
+        return sel.orders
+
+    def _product_totals(self, sel, name):
+        """dict measure -> total per kode produk (name 'product' atau 'loss').
+
+        Tanpa filter region/segment/seller dari rollup (bulan, produk); filter
+        kategori diterapkan lewat kategori produk.
+        """
+        if set(sel.allowed) <= {'category'}:
+            totals = {measure: self._rolled(sel, name, measure).sum(axis=0) for measure in MEASURES}
+            if 'category' in sel.allowed:
+                keep = sel.allowed['category'][self.product_category]
+                totals = {measure: values * keep for measure, values in totals.items()}
+            return totals
+        if name == 'product':
+            return {measure: sel.sum('product', measure) for measure in MEASURES}
+        loss = sel.column('profit') < 0
+        product = sel.column('product')[loss]
+        return {
+            measure: np.bincount(
+                product, weights=None if measure == 'lines' else sel.column(measure)[loss],
+                minlength=self.sizes['product'])
+            for measure in MEASURES
+        }
+
+    def get_kpi_summary(self, filters=None):
+        sel = self.select(filters)
+        present, _, sales, profit = self._order_totals(sel)
+        customers = np.bincount(self.orders['customer'][present])
+        quantiles = np.quantile(sales, [0.5, 0.9, 0.99]) if len(sales) else [np.nan] * 3
+        return pd.DataFrame([{
+            'total_customers': np.int64(np.count_nonzero(customers)),
+            'total_orders': np.int64(len(present)),
+            'total_sales': float(sales.sum()),
+            'total_profit': float(profit.sum()),
+            'order_value_p50': quantiles[0],
+            'order_value_p90': quantiles[1],
+            'order_value_p99': quantiles[2],
+        }])
+
+    def get_data_summary(self, filters=None):
+        sel = self.select(filters)
+        lines = self._cube_totals(sel, 0)['lines']
+        months = np.flatnonzero(lines)
+        if len(months):
+            first, last = (_month_start(self.first_month + months[i]) for i in (0, -1))
+        else:
+            first = last = pd.NaT
+        return pd.DataFrame([{'total_records': np.int64(lines.sum()), 'first_month': first, 'last_month': last}])
+
+    def get_customer_spending(self, filters=None, limit=20):
+        sel = self.select(filters)
+        present, lines, sales, profit = self._order_totals(sel)
+        names = self.orders['customer_name'][present]
+        size = len(self.labels['customer_name'])
+        name_lines = np.bincount(names, weights=lines, minlength=size)
+        name_sales = np.bincount(names, weights=sales, minlength=size)
+        name_profit = np.bincount(names, weights=profit, minlength=size)
+        codes = np.flatnonzero(name_lines)
+        # kode nama terurut alfabet, jadi tie-break nama = tie-break kode
+        top = codes[np.lexsort((codes, -name_sales[codes]))][:int(limit)]
+        return pd.DataFrame({
+            'customer_name': self.labels['customer_name'][top],
+            'total_orders': name_lines[top].astype(np.int64),
+            'total_sales': name_sales[top],
+            'total_profit': name_profit[top],
+            'total_rows': np.int64(len(codes)),
+        })
+
+    def get_product_sales(self, filters=None, limit=20):
+        totals = self._product_totals(self.select(filters), 'product')
+        codes = np.flatnonzero(totals['lines'])
+        # kode produk terurut (nama, kategori), jadi tie-break = kode
+        top = codes[np.lexsort((codes, -totals['quantity'][codes]))][:int(limit)]
+        return pd.DataFrame({
+            'product_name': self.labels['product_name'][top],
+            'category': self.labels['product_category'][top],
+            'total_quantity': totals['quantity'][top].astype(np.int64),
+            'total_sales': totals['sales'][top],
+            'total_profit': totals['profit'][top],
+            'total_rows': np.int64(len(codes)),
+        })
+
+    def get_loss_products(self, filters=None, top_n=15):
+        totals = self._product_totals(self.select(filters), 'loss')
+        codes = np.flatnonzero(totals['lines'])
+        top = codes[np.lexsort((codes, -totals['quantity'][codes]))][:int(top_n)]
+        return pd.DataFrame({
+            'product_name': self.labels['product_name'][top],
+            'category': self.labels['product_category'][top],
+            'quantity': totals['quantity'][top].astype(np.int64),
+            'profit': totals['profit'][top],
+        })
+
+    def get_recent_orders(self, filters=None, limit=20):
+        sel = self.select(filters)
+        present, lines, sales, profit = self._order_totals(sel)
+        day = self.orders['day'][present]
+        # kode order urut tanggal: order terbaru di ujung, termasuk yang
+        # satu hari dengan order ke-limit (diurutkan ulang by order_id)
+        start = int(np.searchsorted(day, day[-int(limit)], side='left')) if len(day) > limit else 0
+        keep = slice(start, len(present))
+        codes = present[keep]
+        result = pd.DataFrame({
+            'order_id': self.orders['order_id'][codes],
+            'customer_name': self.labels['customer_name'][self.orders['customer_name'][codes]],
+            'order_date': pd.to_datetime(EPOCH + day[keep]),
+            'total_sales': sales[keep],
+            'total_profit': profit[keep],
+            'items_count': lines[keep].astype(np.int64),
+            'total_rows': np.int64(len(present)),
+        })
+        result = result.sort_values(['order_date', 'order_id'], ascending=[False, True], kind='stable')
+        return result.head(int(limit)).reset_index(drop=True)
+
+    def _cube_totals(self, sel, axis):
+        """dict measure -> total per kode sumbu axis cube (sumbu lain dijumlahkan)"""
+        other = tuple(i for i in range(len(self.shapes['cube'])) if i != axis)
+        return {measure: sel.cube(measure).sum(axis=other) for measure in MEASURES}
+
+    def get_sales_by_category(self, filters=None):
+        sel = self.select(filters)
+        totals = self._cube_totals(sel, CUBE_AXES['category'])
+        codes = np.flatnonzero(totals['lines'])
+        codes = codes[codes > 0]
+        lines = totals['lines'][codes]
+        result = pd.DataFrame({
+            'category': self.labels['category'][codes],
+            'total_orders': lines.astype(np.int64),
+            'total_quantity': totals['quantity'][codes].astype(np.int64),
+            'total_sales': totals['sales'][codes],
+            'total_profit': totals['profit'][codes],
+            'avg_sales': totals['sales'][codes] / lines,
+        })
+        return result.sort_values('total_sales', ascending=False, kind='stable').reset_index(drop=True)
+
+    def get_top_sellers(self, filters=None, limit=10):
+        sel = self.select(filters)
+        totals = self._cube_totals(sel, CUBE_AXES['seller'])
+        codes = np.flatnonzero(totals['lines'])
+        codes = codes[codes > 0]
+        lines = totals['lines'][codes]
+        result = pd.DataFrame({
+            'seller_name': self.labels['seller'][codes],
+            'seller_region': self.sellers['seller_region'][codes],
+            'seller_rating': self.sellers['seller_rating'][codes],
+            'total_orders': lines.astype(np.int64),
+            'total_quantity': totals['quantity'][codes].astype(np.int64),
+            'total_sales': totals['sales'][codes],
+            'total_profit': totals['profit'][codes],
+            'avg_profit_per_order': (totals['profit'][codes] / lines).round(2),
+        })
+        result = result.sort_values(['total_sales', 'seller_name'], ascending=[False, True], kind='stable')
+        return result.head(int(limit)).reset_index(drop=True)
+
+    def get_seller_performance(self, filters=None):
+        """Semua seller: rating vs sales/profit, urut rating tertinggi"""
+        sel = self.select(filters)
+        totals = self._cube_totals(sel, CUBE_AXES['seller'])
+        codes = np.flatnonzero(totals['lines'])
+        codes = codes[codes > 0]
+        result = pd.DataFrame({
+            'seller_name': self.labels['seller'][codes],
+            'seller_region': self.sellers['seller_region'][codes],
+            'seller_rating': self.sellers['seller_rating'][codes],
+            'total_sales': totals['sales'][codes],
+            'total_profit': totals['profit'][codes],
+            'total_orders': totals['lines'][codes].astype(np.int64),
+        })
+        result = result.sort_values(['seller_rating', 'seller_name'], ascending=[False, True], kind='stable')
+        return result.reset_index(drop=True)
+
+    def get_monthly_sales(self, filters=None):
+        """Sales/profit/quantity per (year, month), untuk halaman Yearly & YTD"""
+        sel = self.select(filters)
+        totals = self._cube_totals(sel, 0)
+        months = np.flatnonzero(totals['lines'])
+        absolute = months + self.first_month
+        return pd.DataFrame({
+            'year': (absolute // 12 + 1970).astype(np.int16),
+            'month': (absolute % 12 + 1).astype(np.int8),
+            'quantity': totals['quantity'][months].astype(np.int64),
+            'sales': totals['sales'][months],
+            'profit': totals['profit'][months],
+        })
+
+def _months(day):
+    """Hari sejak epoch -> indeks bulan sejak 1970-01"""
+    months = (EPOCH + np.asarray(day).astype('timedelta64[D]')).astype('datetime64[M]')
+    return (months - np.datetime64('1970-01', 'M')).astype(np.int32)
+
+def _month_days(first_month, count):
+    """Hari (sejak epoch) tanggal 1 untuk count bulan mulai indeks first_month"""
+    months = np.datetime64('1970-01', 'M') + first_month + np.arange(count)
+    return (months.astype('datetime64[D]') - EPOCH).astype(np.int32)
+
+def _month_start(month):
+    """Indeks bulan sejak 1970-01 -> Timestamp awal bulan"""
+    return pd.Timestamp(np.datetime64('1970-01', 'M') + int(month))
+
+# ==============================
+# BENCHMARK
+# ==============================
+# Agregat yang dihitung bersama untuk satu halaman dashboard (berbagi seleksi)
+PAGE_AGGREGATES = {
+    'overview': ['get_kpi_summary', 'get_data_summary', 'get_customer_spending',
+                 'get_product_sales', 'get_recent_orders', 'get_sales_by_category'],
+    'loss_products': ['get_loss_products'],
+    'seller_analytics': ['get_top_sellers', 'get_seller_performance'],
+    'yearly_sales': ['get_monthly_sales'],
+}
+
+def bench(store, filters, repeat=5):
+    """Latency median (ms) per halaman untuk filters, tanpa cache seleksi"""
+    timings = {}
+    for page, aggregates in PAGE_AGGREGATES.items():
+        samples = []
+        for _ in range(repeat):
+            store._selections.clear()
+            start = time.perf_counter()
+            for agg in aggregates:
+                getattr(store, agg)(filters)
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[page] = sorted(samples)[len(samples) // 2]
+    return timings
+
+if __name__ == "__main__":
+    from datasource import make_source
+    source = make_source(sys.argv[1] if len(sys.argv) > 1 else None)
+    start = time.perf_counter()
+    store = source.load_filter_store()
+    print(f"{store.rows:,} line dimuat ({time.perf_counter() - start:.1f}s, {store.memory_mb():.0f} MB)")
+    options = store.options()
+    examples = {
+        'tanpa filter': {},
+        'region': {'regions': options['regions'][:1]},
+        'region+segment+kategori': {'regions': options['regions'][:2], 'segments': options['segments'][:1],
+                                    'categories': options['categories'][:1]},
+        'tahun terakhir+seller': {'start_date': options['max_date'].replace(month=1, day=1),
+                                  'sellers': options['sellers'][:5]},
+    }
+    for label, filters in examples.items():
+        timings = bench(store, filters)
+        print(f"{label:26s} " + "  ".join(f"{page}={ms:.1f}ms" for page, ms in timings.items()))
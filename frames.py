@@ -0,0 +1,62 @@
+# frames.py
+# Representasi DataFrame yang lebih hemat memori untuk hasil load_data():
+# string low-cardinality jadi category (dictionary-encoded), string lain
+# disimpan Arrow-backed, angka di-downcast ke dtype terkecil yang aman.
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = "string"
+
+# Kolom yang selalu low-cardinality di dataset superstore
+CATEGORY_COLUMNS = [
+    'ship_mode', 'segment', 'country', 'city', 'state', 'region',
+    'category', 'sub_category', 'seller_id', 'seller_name', 'seller_region'
+]
+DATE_COLUMNS = ['order_date', 'ship_date']
+INTEGER_COLUMNS = ['quantity']
+# discount & rating cukup float32; sales/profit tetap float64 supaya
+# SUM di jutaan baris tidak kehilangan presisi sen
+FLOAT32_COLUMNS = ['discount', 'seller_rating']
+FLOAT64_COLUMNS = ['sales', 'profit']
+
+# String lain dijadikan category kalau nilai uniknya <= 50% jumlah baris
+CATEGORY_MAX_RATIO = 0.5
+
+def compact_frame(df):
+    """Konversi DataFrame ke dtype yang compact (return DataFrame baru)"""
+    data = df.copy()
+    n_rows = max(len(data), 1)
+
+    for col in data.columns:
+        series = data[col]
+        if col in DATE_COLUMNS:
+            data[col] = pd.to_datetime(series)
+        elif col in INTEGER_COLUMNS:
+            data[col] = pd.to_numeric(series, downcast='integer')
+        elif col in FLOAT32_COLUMNS:
+            data[col] = pd.to_numeric(series, errors='coerce').astype('float32')
+        elif col in FLOAT64_COLUMNS:
+            data[col] = pd.to_numeric(series, errors='coerce').astype('float64')
+        elif col in CATEGORY_COLUMNS:
+            data[col] = series.astype('category')
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if series.nunique(dropna=True) / n_rows <= CATEGORY_MAX_RATIO:
+                data[col] = series.astype('category')
+            else:
+                data[col] = series.astype(STRING_DTYPE)
+        elif pd.api.types.is_integer_dtype(series):
+            data[col] = pd.to_numeric(series, downcast='integer')
+    return data
+
+def add_date_parts(df):
+    """Tambah kolom year (int16) & month (int8) dari order_date"""
+    df['year'] = df['order_date'].dt.year.astype('int16')
+    df['month'] = df['order_date'].dt.month.astype('int8')
+    return df
+
+def frame_memory_mb(df):
+    """Total memori DataFrame (deep) dalam MB"""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
@@ -0,0 +1,122 @@
+# invoices.py
+# Export invoice massal (billing run) ke CSV atau JSON Lines.
+#
+# order_id diproses per batch BATCH_SIZE: tiap batch satu query
+# config.get_order_invoices (order_id dikirim sebagai array), lalu langsung
+# ditulis ke file. Memori yang dipakai sebanding ukuran batch, bukan jumlah
+# invoice, dan jumlah round trip = jumlah order / BATCH_SIZE.
+#
+#   python invoices.py invoices_2017.csv --start-date 2017-01-01 --end-date 2017-12-31
+#   python invoices.py billing.jsonl --orders order_ids.txt
+import os
+import sys
+import json
+import time
+import argparse
+from itertools import islice, groupby
+
+import config
+
+BATCH_SIZE = 500
+
+# Kolom level order (sama untuk semua line satu invoice), sisanya kolom line
+ORDER_COLUMNS = [
+    'order_id', 'order_date', 'ship_date', 'ship_mode',
+    'customer_id', 'customer_name', 'segment', 'country', 'city', 'state', 'postal_code', 'region',
+]
+
+def batches(order_ids, size=BATCH_SIZE):
+    """Potong iterable order_id jadi list berukuran size (lazy)"""
+    order_ids = iter(order_ids)
+    while True:
+        batch = list(islice(order_ids, size))
+        if not batch:
+            return
+        yield batch
+
+def iter_invoices(order_ids, batch_size=BATCH_SIZE):
+    """Yield (order_id, list dict line) per invoice, satu query per batch.
+
+    Line hasil get_order_invoices sudah berurutan per order, jadi cukup
+    dikelompokkan berurutan tanpa groupby pandas per invoice.
+    """
+    for batch in batches(order_ids, batch_size):
+        rows = config.get_order_invoices(batch).to_dict(orient='records')
+        for order_id, lines in groupby(rows, key=lambda row: row['order_id']):
+            yield order_id, list(lines)
+
+def invoice_record(lines):
+    """Line satu invoice -> dict header order + list line + total"""
+    record = {column: lines[0][column] for column in ORDER_COLUMNS}
+    record['lines'] = [
+        {column: value for column, value in line.items() if column not in record}
+        for line in lines
+    ]
+    record['total_sales'] = round(sum(float(line['sales']) for line in lines), 2)
+    record['total_profit'] = round(sum(float(line['profit']) for line in lines), 2)
+    return record
+
+def _write_csv(out, order_ids, batch_size):
+    count = 0
+    header_written = False
+    for batch in batches(order_ids, batch_size):
+        lines = config.get_order_invoices(batch)
+        lines.to_csv(out, header=not header_written, index=False)
+        header_written = True
+        count += lines['order_id'].nunique()
+    return count
+
+def _write_jsonl(out, order_ids, batch_size):
+    count = 0
+    for _, lines in iter_invoices(order_ids, batch_size):
+        out.write(json.dumps(invoice_record(lines), default=str) + "\n")
+        count += 1
+    return count
+
+def export_invoices(order_ids, path, fmt=None, batch_size=BATCH_SIZE):
+    """Tulis invoice untuk order_ids (iterable, boleh generator) ke path.
+
+    fmt "csv" (satu baris per line invoice) atau "jsonl" (satu objek JSON
+    per invoice); default ditebak dari ekstensi file. Ditulis ke file
+    sementara lalu di-rename supaya tidak ada file setengah jadi.
+    Return jumlah invoice yang ditulis.
+    """
+    if fmt is None:
+        fmt = "csv" if path.endswith(".csv") else "jsonl"
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Format tidak dikenal: {fmt} (pakai csv atau jsonl)")
+    writer = _write_csv if fmt == "csv" else _write_jsonl
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as out:
+        count = writer(out, order_ids, batch_size)
+    os.replace(tmp_path, path)
+    return count
+
+def read_order_ids(path):
+    """order_id dari file teks (satu per baris), dibaca lazy"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield line.strip()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export invoice massal ke CSV / JSON Lines")
+    parser.add_argument("output", help="file tujuan (.csv atau .jsonl/.json)")
+    parser.add_argument("--orders", help="file berisi order_id, satu per baris")
+    parser.add_argument("--start-date")
+    parser.add_argument("--end-date")
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.orders:
+        order_ids = read_order_ids(args.orders)
+    else:
+        order_ids = config.get_order_ids(args.start_date, args.end_date)
+
+    start = time.perf_counter()
+    count = export_invoices(order_ids, args.output, args.format, args.batch_size)
+    print(f"{count:,} invoice ditulis ke {args.output} ({time.perf_counter() - start:.1f}s)")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+# leaderboards.py
+# Leaderboard top-K product / customer / seller per periode, dipelihara incremental.
+#
+# - leaderboard_totals : total per (dimensi, periode, entity). Fact line baru
+#                        cukup ditambahkan sebagai delta (upsert), tanpa
+#                        membaca ulang fact_order_line lama.
+# - leaderboards       : LEADERBOARD_SIZE entity teratas (by sales) per periode,
+#                        di-rank ulang hanya untuk periode yang berubah.
+#
+# Periode: 'all' (sepanjang waktu), 'YYYY' (per tahun), 'YYYY-MM' (per bulan).
+# Bulan yang partisi fact-nya di-detach (partitions.py) dikurangkan lagi
+# lewat remove_leaderboard_months.
+# get_top_products / get_top_customers / get_top_sellers di config.py membaca
+# dari sini kalau rentang tanggalnya pas satu periode dan limit <= LEADERBOARD_SIZE.
+#
+#   python leaderboards.py        # rebuild penuh
+import os
+
+from db import connect_writer
+
+LEADERBOARD_SIZE = int(os.environ.get("SUPERSTORE_LEADERBOARD_SIZE", "100"))
+
+# dimensi -> kolom surrogate key di fact_order_line
+DIMENSIONS = {
+    'product': 'product_key',
+    'customer': 'customer_key',
+    'seller': 'seller_key',
+}
+
+# order_count = jumlah order distinct per entity. Order yang sudah punya line
+# lama untuk entity yang sama tidak dihitung lagi saat delta ditambahkan.
+DELTA_QUERY = """
+    INSERT INTO leaderboard_totals AS t (
+        dimension, period, entity_key, line_count, order_count, quantity, sales, profit
+    )
+    SELECT
+        %(dimension)s,
+        p.period,
+        f.{key},
+        COUNT(*),
+        COUNT(DISTINCT f.order_key) FILTER (WHERE f.new_order),
+        SUM(f.quantity),
+        SUM(f.sales),
+        SUM(f.profit)
+    FROM (
+        SELECT f.*, {new_order} AS new_order
+        FROM fact_order_line f
+        WHERE f.order_line_id > %(since)s AND f.{key} IS NOT NULL
+    ) f
+    CROSS JOIN LATERAL (VALUES
+        ('all'),
+        (to_char(f.order_date, 'YYYY')),
+        (to_char(f.order_date, 'YYYY-MM'))
+    ) AS p(period)
+    GROUP BY p.period, f.{key}
+    ON CONFLICT (dimension, period, entity_key) DO UPDATE SET
+        line_count = t.line_count + EXCLUDED.line_count,
+        order_count = t.order_count + EXCLUDED.order_count,
+        quantity = t.quantity + EXCLUDED.quantity,
+        sales = t.sales + EXCLUDED.sales,
+        profit = t.profit + EXCLUDED.profit
+    RETURNING t.period;
+"""
+
+NEW_ORDER = """NOT EXISTS (
+            SELECT 1 FROM fact_order_line o
+            WHERE o.order_key = f.order_key
+              AND o.{key} = f.{key}
+              AND o.order_line_id <= %(since)s
+        )"""
+
+RANK_QUERY = """
+    INSERT INTO leaderboards (
+        dimension, period, rank, entity_key, line_count, order_count, quantity, sales, profit
+    )
+    SELECT dimension, period, rank, entity_key, line_count, order_count, quantity, sales, profit
+    FROM (
+        SELECT
+            t.*,
+            ROW_NUMBER() OVER (PARTITION BY t.period ORDER BY t.sales DESC, t.entity_key) AS rank
+        FROM leaderboard_totals t
+        WHERE t.dimension = %(dimension)s AND t.period = ANY(%(periods)s)
+    ) ranked
+    WHERE rank <= %(size)s;
+"""
+
+# Kebalikan DELTA_QUERY untuk bulan yang dibuang. Satu order hanya punya satu
+# order_date, jadi order di bulan itu tidak pernah ikut dihitung di bulan lain
+# dan order_count bisa dikurangkan apa adanya.
+REMOVE_QUERY = """
+    UPDATE leaderboard_totals t SET
+        line_count = t.line_count - r.line_count,
+        order_count = t.order_count - r.order_count,
+        quantity = t.quantity - r.quantity,
+        sales = t.sales - r.sales,
+        profit = t.profit - r.profit
+    FROM (
+        SELECT
+            p.period,
+            f.{key} AS entity_key,
+            COUNT(*) AS line_count,
+            COUNT(DISTINCT f.order_key) AS order_count,
+            SUM(f.quantity) AS quantity,
+            SUM(f.sales) AS sales,
+            SUM(f.profit) AS profit
+        FROM fact_order_line f
+        CROSS JOIN LATERAL (VALUES
+            ('all'),
+            (to_char(f.order_date, 'YYYY')),
+            (to_char(f.order_date, 'YYYY-MM'))
+        ) AS p(period)
+        WHERE DATE_TRUNC('month', f.order_date)::date = ANY(%(months)s) AND f.{key} IS NOT NULL
+        GROUP BY p.period, f.{key}
+    ) r
+    WHERE t.dimension = %(dimension)s AND t.period = r.period AND t.entity_key = r.entity_key
+    RETURNING t.period;
+"""
+
+def _rerank(cur, dimension, periods, size):
+    """Tulis ulang LEADERBOARD_SIZE teratas untuk periods dari leaderboard_totals"""
+    cur.execute(
+        "DELETE FROM leaderboards WHERE dimension = %(dimension)s AND period = ANY(%(periods)s);",
+        {'dimension': dimension, 'periods': periods}
+    )
+    cur.execute(RANK_QUERY, {'dimension': dimension, 'periods': periods, 'size': size})
+
+def refresh_leaderboards(conn, since_line_id=None, size=LEADERBOARD_SIZE):
+    """Tambahkan fact line dengan order_line_id > since_line_id ke leaderboard.
+
+    since_line_id=None mengosongkan kedua tabel lalu membangun ulang dari
+    semua fact line (dipakai setelah refresh_fact(full=True)).
+    Return jumlah periode yang di-rank ulang (semua dimensi).
+    """
+    cur = conn.cursor()
+    if since_line_id is None:
+        cur.execute("TRUNCATE leaderboard_totals, leaderboards;")
+        since_line_id = 0
+
+    refreshed = 0
+    for dimension, key in DIMENSIONS.items():
+        params = {'dimension': dimension, 'since': since_line_id}
+        # full rebuild: semua order baru, lewati cek NOT EXISTS
+        new_order = NEW_ORDER.format(key=key) if since_line_id else "TRUE"
+        cur.execute(DELTA_QUERY.format(key=key, new_order=new_order), params)
+        periods = sorted({row[0] for row in cur.fetchall()})
+        if not periods:
+            continue
+        _rerank(cur, dimension, periods, size)
+        refreshed += len(periods)
+    conn.commit()
+    cur.close()
+    return refreshed
+
+def remove_leaderboard_months(conn, months, size=LEADERBOARD_SIZE):
+    """Kurangkan fact line bulan months (list tanggal awal bulan) dari leaderboard.
+
+    Dipanggil partitions.py SEBELUM partisi fact bulan itu di-detach, di
+    transaksi yang sama (tidak commit). Entity yang totalnya habis dibuang,
+    lalu periode yang berubah di-rank ulang. Return jumlah periode itu.
+    """
+    cur = conn.cursor()
+    refreshed = 0
+    for dimension, key in DIMENSIONS.items():
+        cur.execute(REMOVE_QUERY.format(key=key), {'dimension': dimension, 'months': list(months)})
+        periods = sorted({row[0] for row in cur.fetchall()})
+        if not periods:
+            continue
+        cur.execute(
+            "DELETE FROM leaderboard_totals WHERE dimension = %(dimension)s AND period = ANY(%(periods)s) AND line_count <= 0;",
+            {'dimension': dimension, 'periods': periods}
+        )
+        _rerank(cur, dimension, periods, size)
+        refreshed += len(periods)
+    cur.close()
+    return refreshed
+
+if __name__ == "__main__":
+    conn = connect_writer()
+    periods = refresh_leaderboards(conn)
+    print("Selesai. Periode leaderboard yang di-rank:", periods)
+    conn.close()
@@ -0,0 +1,243 @@
+# loadtest.py
+# Load test dashboard app.py: banyak session headless sekaligus.
+#
+# Setiap worker adalah proses terpisah (seperti satu proses server
+# Streamlit) yang menjalankan --sessions session AppTest di thread masing-
+# masing. Cache Streamlit (st.cache_resource / st.cache_data) dibagi antar
+# session dalam satu worker, sama seperti di server sungguhan. Tiap session
+# berpindah halaman menurut PAGE_MIX dan sesekali mengganti filter sidebar,
+# lalu latency setiap rerun dicatat.
+#
+# Hasil: p50/p95/p99 latency per halaman, throughput (page view/detik),
+# error app (exception di app.py), error harness (AppTest sendiri gagal,
+# mis. timeout) dan peak RSS per worker; disimpan ke --output (JSON).
+#
+#   python loadtest.py --workers 2 --sessions 8 --duration 60
+#   python loadtest.py --seed 5 --sessions 16     # seed database bench scale 5 dulu
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import functools
+import traceback
+import resource
+import threading
+import statistics
+import multiprocessing
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+RESULTS_FILE = "loadtest_results.json"
+# Timeout satu rerun AppTest (detik)
+RUN_TIMEOUT = 300
+
+# Proporsi page view per halaman (key app.PAGES)
+PAGE_MIX = {
+    'overview': 0.40,
+    'loss_products': 0.15,
+    'seller_analytics': 0.15,
+    'yearly_sales': 0.15,
+    'ytd_comparison': 0.15,
+}
+# Peluang satu page view juga mengganti filter region (sisanya filter dikosongkan lagi)
+FILTER_RATE = 0.2
+
+# Jenis error per sample: exception di app.py (at.exception) vs AppTest/harness gagal
+APP_ERROR = 'app'
+HARNESS_ERROR = 'harness'
+
+_compile_lock = threading.Lock()
+
+def serialize_script_compile():
+    """Compile app.py oleh AppTest dijalankan satu per satu di proses ini.
+
+    Setiap AppTest punya ScriptCache (dan lock) sendiri, jadi session di
+    thread lain bisa meng-compile app.py bersamaan; ast.parse/compile
+    CPython tidak aman dipanggil paralel seperti itu (SystemError "AST
+    constructor recursion depth mismatch"). Hanya harness yang terkunci,
+    rerun script app.py tetap paralel.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    get_bytecode = ScriptCache.get_bytecode
+    if getattr(get_bytecode, 'serialized', False):
+        return
+
+    @functools.wraps(get_bytecode)
+    def locked(self, script_path):
+        with _compile_lock:
+            return get_bytecode(self, script_path)
+
+    locked.serialized = True
+    ScriptCache.get_bytecode = locked
+
+def percentile(values, pct):
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+def _run(at):
+    start = time.perf_counter()
+    at.run(timeout=RUN_TIMEOUT)
+    return (time.perf_counter() - start) * 1000, APP_ERROR if at.exception else None
+
+def run_session(seed, duration, think, samples, sessions):
+    """Satu session: load awal, lalu navigasi acak sampai duration detik.
+
+    Sample: (halaman, ms, None / APP_ERROR / HARNESS_ERROR). Exception di
+    harness (timeout AppTest, load awal gagal sehingga sidebar kosong, dll)
+    dicatat sebagai HARNESS_ERROR halaman yang sedang dibuka dan session
+    berhenti; sessions mendapat (jumlah sample, selesai normal?).
+    """
+    from streamlit.testing.v1 import AppTest
+    from app import PAGES
+
+    rng = random.Random(seed)
+    count = 0
+    page = 'first_load'
+    start = time.perf_counter()
+    try:
+        at = AppTest.from_file(SCRIPT, default_timeout=RUN_TIMEOUT)
+        samples.append((page, *_run(at)))
+        count += 1
+        pages = list(PAGE_MIX)
+        weights = [PAGE_MIX[name] for name in pages]
+        regions = at.sidebar.multiselect[0].options if at.sidebar.multiselect else []
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            page = rng.choices(pages, weights)[0]
+            start = time.perf_counter()
+            at.sidebar.radio[0].set_value(PAGES[page]['label'])
+            if regions:
+                region = at.sidebar.multiselect[0]
+                if rng.random() < FILTER_RATE:
+                    region.set_value(rng.sample(regions, rng.randint(1, len(regions))))
+                elif region.value:
+                    region.set_value([])
+            samples.append((page, *_run(at)))
+            count += 1
+            if think:
+                time.sleep(rng.uniform(0, 2 * think))
+    except Exception:
+        traceback.print_exc()
+        samples.append((page, (time.perf_counter() - start) * 1000, HARNESS_ERROR))
+        sessions.append((count, False))
+        return
+    sessions.append((count, True))
+
+def worker(args):
+    """Satu proses worker: sessions session paralel; return sample & peak RSS"""
+    index, sessions_count, duration, think = args
+    serialize_script_compile()
+    samples = []
+    sessions = []
+    threads = [
+        threading.Thread(target=run_session, args=(index * 1000 + i, duration, think, samples, sessions), daemon=True)
+        for i in range(sessions_count)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        'worker': index,
+        'seconds': time.perf_counter() - start,
+        'samples': samples,
+        # session yang tidak melapor (thread mati karena BaseException) dihitung gagal
+        'sessions': sessions + [(0, False)] * (sessions_count - len(sessions)),
+        # ru_maxrss dalam KB di Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def summarize(results):
+    """Ringkas hasil worker: latency per halaman, throughput, error, memori"""
+    pages = {}
+    for result in results:
+        for page, ms, error in result['samples']:
+            stats = pages.setdefault(page, {'timings': [], 'errors': 0, 'harness_errors': 0})
+            stats['timings'].append(ms)
+            stats['errors'] += error == APP_ERROR
+            stats['harness_errors'] += error == HARNESS_ERROR
+    seconds = max(result['seconds'] for result in results)
+    views = sum(len(result['samples']) for result in results)
+    summary = {
+        'views': views,
+        'seconds': round(seconds, 1),
+        'throughput': round(views / seconds, 2),
+        'errors': sum(stats['errors'] for stats in pages.values()),
+        'harness_errors': sum(stats['harness_errors'] for stats in pages.values()),
+        # session yang berhenti karena exception / tanpa satu pun page view sukses
+        'sessions_failed': sum(not completed or not count for result in results for count, completed in result['sessions']),
+        'peak_rss_mb': [round(result['peak_rss_mb'], 1) for result in results],
+        'pages': {},
+    }
+    for page, stats in sorted(pages.items()):
+        timings = stats['timings']
+        summary['pages'][page] = {
+            'views': len(timings),
+            'errors': stats['errors'],
+            'harness_errors': stats['harness_errors'],
+            'p50_ms': round(statistics.median(timings), 1),
+            'p95_ms': round(percentile(timings, 95), 1),
+            'p99_ms': round(percentile(timings, 99), 1),
+            'max_ms': round(max(timings), 1),
+        }
+    return summary
+
+def print_summary(summary):
+    print(f"{'halaman':18s} {'views':>6s} {'err':>4s} {'hrn':>4s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}")
+    for page, stats in summary['pages'].items():
+        print(
+            f"{page:18s} {stats['views']:6d} {stats['errors']:4d} {stats['harness_errors']:4d} "
+            f"{stats['p50_ms']:7.1f}ms {stats['p95_ms']:7.1f}ms {stats['p99_ms']:7.1f}ms {stats['max_ms']:7.1f}ms"
+        )
+    print(
+        f"{summary['views']} page view dalam {summary['seconds']}s = {summary['throughput']} view/s, "
+        f"{summary['errors']} error app, {summary['harness_errors']} error harness, "
+        f"{summary['sessions_failed']} session gagal, peak RSS per worker: "
+        + ", ".join(f"{mb:.0f} MB" for mb in summary['peak_rss_mb'])
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test dashboard app.py dengan session AppTest paralel")
+    parser.add_argument("--workers", type=int, default=1, help="jumlah proses (server Streamlit)")
+    parser.add_argument("--sessions", type=int, default=4, help="session paralel per worker")
+    parser.add_argument("--duration", type=float, default=30, help="lama navigasi per session (detik)")
+    parser.add_argument("--think", type=float, default=0.0, help="rata-rata jeda antar page view (detik)")
+    parser.add_argument("--seed", type=int, metavar="SCALE", help="seed database bench scale ini dulu (bench_queries.py)")
+    parser.add_argument("--keep-db", action="store_true", help="jangan drop database hasil --seed")
+    parser.add_argument("--output", default=RESULTS_FILE)
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        import psycopg2
+        from bench_queries import bench_dsn, recreate_database, seed_database, drop_database
+        print(f"Seeding scale {args.seed} ...")
+        recreate_database(args.seed)
+        conn = psycopg2.connect(bench_dsn(args.seed))
+        print(f"  {seed_database(conn, args.seed):,} order lines")
+        conn.close()
+        # worker mewarisi env ini, jadi config.py di worker membaca database bench
+        os.environ["SUPERSTORE_DSN"] = bench_dsn(args.seed)
+    os.environ.setdefault("SUPERSTORE_SLOW_QUERY_MS", "600000")
+
+    print(f"{args.workers} worker x {args.sessions} session, {args.duration:.0f}s ...")
+    tasks = [(i, args.sessions, args.duration, args.think) for i in range(args.workers)]
+    with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+        results = pool.map(worker, tasks)
+    summary = summarize(results)
+    summary['config'] = vars(args)
+    print_summary(summary)
+    with open(args.output, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Hasil disimpan di {args.output}")
+
+    if args.seed is not None and not args.keep_db:
+        drop_database(args.seed)
+    return 1 if summary['errors'] or summary['harness_errors'] or summary['sessions_failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# partitions.py
+# Manajemen partisi RANGE (per bulan, berdasarkan order_date) untuk tabel
+# orders, order_details & fact_order_line. Dipanggil otomatis oleh convert.py,
+# dan bisa dijalankan manual untuk detach / archive partisi lama:
+#
+#   python partitions.py create 2014-01-01 2017-12-31
+#   python partitions.py list
+#   python partitions.py detach 2015-01-01 --archive
+#   python partitions.py detach 2015-01-01 --drop
+import sys
+import datetime
+
+from db import connect_writer
+from data_version import bump_data_version
+from leaderboards import remove_leaderboard_months
+from sketches import remove_kpi_sketch_months
+
+# Urutan penting: orders (parent FK) dulu saat create, dibalik saat detach
+PARTITIONED_TABLES = ['orders', 'order_details', 'fact_order_line']
+# Rollup dari fact_order_line yang ikut dikurangi saat partisi fact di-detach
+FACT_ROLLUPS = ['kpi_sketches', 'leaderboard_totals', 'leaderboards']
+ARCHIVE_SCHEMA = 'archive'
+# Suffix nama tabel hasil detach biasa (tanpa --archive/--drop)
+DETACHED_SUFFIX = '_detached'
+
+def connect():
+    """Koneksi ke writer (lihat db.py)"""
+    return connect_writer()
+
+def month_start(d):
+    return datetime.date(d.year, d.month, 1)
+
+def next_month(d):
+    if d.month == 12:
+        return datetime.date(d.year + 1, 1, 1)
+    return datetime.date(d.year, d.month + 1, 1)
+
+def partition_name(table, start):
+    return f"{table}_{start.year}_{start.month:02d}"
+
+def iter_months(start_date, end_date):
+    """Generate awal bulan dari start_date sampai end_date (inklusif)"""
+    current = month_start(start_date)
+    while current <= end_date:
+        yield current
+        current = next_month(current)
+
+def ensure_partitions(conn, start_date, end_date, tables=PARTITIONED_TABLES):
+    """Buat partisi bulanan yang belum ada untuk rentang tanggal ini.
+
+    Yang dicek benar-benar partisi (relispartition), bukan sekadar nama:
+    tabel biasa dengan nama partisi membuat data bulan itu diam-diam masuk
+    partisi default, jadi ditolak dengan error.
+    """
+    cur = conn.cursor()
+    created = []
+    for start in iter_months(start_date, end_date):
+        end = next_month(start)
+        for table in tables:
+            name = partition_name(table, start)
+            cur.execute("SELECT relispartition FROM pg_class WHERE oid = to_regclass(%s);", (name,))
+            row = cur.fetchone()
+            if row is not None:
+                if row[0]:
+                    continue
+                raise RuntimeError(
+                    f"{name} ada tapi bukan partisi {table}; rename atau drop dulu sebelum partisi dibuat ulang")
+            cur.execute(
+                f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s);",
+                (start, end)
+            )
+            created.append(name)
+    conn.commit()
+    cur.close()
+    return created
+
+def list_partitions(conn, table):
+    """List partisi bulanan sebuah tabel: [(nama, batas_bawah, batas_atas)]"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT
+            child.relname,
+            pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits i
+        INNER JOIN pg_class parent ON i.inhparent = parent.oid
+        INNER JOIN pg_class child ON i.inhrelid = child.oid
+        WHERE parent.relname = %s
+        ORDER BY child.relname;
+    """, (table,))
+    partitions = []
+    for name, bound in cur.fetchall():
+        # format bound: FOR VALUES FROM ('2014-01-01') TO ('2014-02-01')
+        if 'FROM' not in bound:
+            continue
+        lower = bound.split("FROM ('")[1].split("')")[0]
+        upper = bound.split("TO ('")[1].split("')")[0]
+        partitions.append((
+            name,
+            datetime.date.fromisoformat(lower),
+            datetime.date.fromisoformat(upper)
+        ))
+    cur.close()
+    return partitions
+
+def detach_partitions_before(conn, cutoff_date, archive=False, drop=False):
+    """Detach semua partisi yang seluruh datanya sebelum cutoff_date.
+
+    archive=True memindahkan partisi ke schema archive (data tetap bisa
+    di-query), drop=True menghapusnya. Tanpa keduanya partisi hanya di-detach
+    dan menjadi tabel biasa {nama}_detached, supaya ensure_partitions bisa
+    membuat ulang partisi bulan itu.
+
+    Bulan fact_order_line yang di-detach dikurangkan dulu dari kpi_sketches
+    & leaderboard (di transaksi yang sama), supaya sidebar dan top-K tidak
+    lagi menghitung data yang sudah tidak ada di fact.
+    """
+    cur = conn.cursor()
+    if archive:
+        cur.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA};")
+
+    fact_months = [lower for _, lower, upper in list_partitions(conn, 'fact_order_line') if upper <= cutoff_date]
+    if fact_months:
+        remove_kpi_sketch_months(conn, fact_months)
+        remove_leaderboard_months(conn, fact_months)
+
+    detached = []
+    # urutan terbalik: order_details harus lepas dulu sebelum partisi orders
+    for table in reversed(PARTITIONED_TABLES):
+        for name, lower, upper in list_partitions(conn, table):
+            if upper > cutoff_date:
+                continue
+            cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name};")
+            if table == 'order_details':
+                # FK hasil clone ikut terbawa setelah detach, lepas supaya
+                # partisi orders pasangannya juga bisa di-detach
+                cur.execute("""
+                    SELECT conname FROM pg_constraint
+                    WHERE conrelid = %s::regclass AND contype = 'f'
+                      AND confrelid = 'orders'::regclass;
+                """, (name,))
+                for (conname,) in cur.fetchall():
+                    cur.execute(f'ALTER TABLE {name} DROP CONSTRAINT "{conname}";')
+            if drop:
+                cur.execute(f"DROP TABLE {name};")
+            elif archive:
+                cur.execute(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA};")
+            else:
+                cur.execute(f"ALTER TABLE {name} RENAME TO {name}{DETACHED_SUFFIX};")
+            detached.append(name)
+    if detached:
+        bump_data_version(conn, PARTITIONED_TABLES + (FACT_ROLLUPS if fact_months else []))
+    conn.commit()
+    cur.close()
+    return detached
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ('create', 'list', 'detach'):
+        print("Usage: python partitions.py create START END | list | detach CUTOFF [--archive|--drop]")
+        sys.exit(1)
+
+    conn = connect()
+    command = sys.argv[1]
+    if command == 'create':
+        start = datetime.date.fromisoformat(sys.argv[2])
+        end = datetime.date.fromisoformat(sys.argv[3])
+        created = ensure_partitions(conn, start, end)
+        print("Partisi dibuat:", len(created))
+    elif command == 'list':
+        for table in PARTITIONED_TABLES:
+            for name, lower, upper in list_partitions(conn, table):
+                print(f"{name:30s} {lower} - {upper}")
+    elif command == 'detach':
+        cutoff = datetime.date.fromisoformat(sys.argv[2])
+        detached = detach_partitions_before(
+            conn, cutoff,
+            archive='--archive' in sys.argv,
+            drop='--drop' in sys.argv
+        )
+        print("Partisi di-detach:", ", ".join(detached) or "-")
+    conn.close()
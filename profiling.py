@@ -0,0 +1,149 @@
+# profiling.py
+# Timing per rerun dashboard untuk mode debug app.py.
+#
+# Trace mencatat span (query SQL, transform data, build figure, render
+# halaman) selama satu rerun script. Trace aktif per thread: thread worker
+# yang memuat dataset halaman ikut dicatat lewat set_trace(). Tanpa trace
+# aktif, span() dan record_span() tidak melakukan apa-apa.
+#
+# SamplingProfiler mengambil stack thread-thread trace tiap beberapa
+# milidetik (sys._current_frames, tanpa dependency tambahan) dan menulisnya
+# dalam format "folded stacks" (frame;frame;frame jumlah) yang bisa dibuka
+# di speedscope.app atau diubah jadi SVG dengan flamegraph.pl / inferno.
+import os
+import sys
+import time
+import threading
+import functools
+from collections import Counter
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Interval sampling profiler (detik)
+SAMPLE_INTERVAL = 0.005
+
+_local = threading.local()
+
+class Trace:
+    """Span-span satu rerun script: kind, name, start/durasi (ms), rows, thread"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self.threads = {threading.get_ident()}
+        self._lock = threading.Lock()
+
+    def add(self, kind, name, seconds, rows=None):
+        end = time.perf_counter()
+        with self._lock:
+            self.spans.append({
+                'kind': kind,
+                'name': name,
+                'start_ms': round((end - seconds - self.started) * 1000, 1),
+                'ms': round(seconds * 1000, 2),
+                'rows': rows,
+                'thread': threading.current_thread().name,
+            })
+
+    def frame(self):
+        """DataFrame span, urut waktu mulai"""
+        with self._lock:
+            spans = list(self.spans)
+        columns = ['kind', 'name', 'start_ms', 'ms', 'rows', 'thread']
+        return pd.DataFrame(spans, columns=columns).sort_values('start_ms', kind='stable')
+
+    def totals(self):
+        """Total ms & jumlah span per kind (span bisa bersarang: transform memuat query)"""
+        spans = self.frame()
+        return spans.groupby('kind', sort=False).agg(spans=('ms', 'size'), total_ms=('ms', 'sum')).reset_index()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+def start_trace():
+    """Mulai trace baru untuk thread ini (thread script)"""
+    trace = Trace()
+    _local.trace = trace
+    return trace
+
+def set_trace(trace):
+    """Ikutkan thread ini (mis. worker pemuat dataset) ke trace; None = lepas"""
+    _local.trace = trace
+    if trace is not None:
+        trace.threads.add(threading.get_ident())
+
+def get_trace():
+    return getattr(_local, 'trace', None)
+
+def record_span(kind, name, seconds, rows=None):
+    """Catat span yang durasinya sudah diukur pemanggil (mis. query_metrics)"""
+    trace = get_trace()
+    if trace is not None:
+        trace.add(kind, name, seconds, rows)
+
+@contextmanager
+def span(kind, name):
+    """with span('figure', 'yearly_sales'): ... dicatat di trace aktif"""
+    trace = get_trace()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(kind, name, time.perf_counter() - start)
+
+def traced(kind):
+    """Decorator: setiap panggilan fungsi jadi span kind bernama nama fungsi"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(kind, func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """Sampling profiler untuk thread-thread di threads (set ident, boleh bertambah)"""
+
+    def __init__(self, threads, interval=SAMPLE_INTERVAL):
+        self.threads = threads
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        """Stack dalam format folded (input flamegraph.pl / inferno / speedscope)"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
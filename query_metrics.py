@@ -0,0 +1,196 @@
+# query_metrics.py
+# Instrumentasi query config.py: latency, jumlah baris, bytes yang di-fetch
+# dan halaman dashboard yang memanggil. Query yang melewati threshold dicatat
+# di slow-query log dan (opsional) plan EXPLAIN (ANALYZE, BUFFERS)-nya disimpan.
+#
+# Registry bisa diekspor sebagai Prometheus text format atau JSON.
+import os
+import json
+import time
+import logging
+import threading
+import functools
+
+from profiling import record_span
+
+logger = logging.getLogger("superstore.slow_query")
+
+# Threshold slow query (ms) dan apakah plan EXPLAIN ikut di-capture
+SLOW_QUERY_MS = float(os.environ.get("SUPERSTORE_SLOW_QUERY_MS", "500"))
+CAPTURE_PLANS = os.environ.get("SUPERSTORE_CAPTURE_PLANS", "0") == "1"
+# Jumlah slow query terakhir yang disimpan di memori
+SLOW_LOG_SIZE = 100
+
+_local = threading.local()
+_lock = threading.Lock()
+_metrics = {}
+_slow_log = []
+
+# Bucket histogram latency (detik) untuk export Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def set_page(page):
+    """Tandai halaman dashboard yang sedang dirender (per thread/session)"""
+    _local.page = page
+
+def get_page():
+    return getattr(_local, 'page', None) or "-"
+
+def record_sql(query, params=None):
+    """Dipanggil config._read supaya instrumentasi tahu SQL terakhir"""
+    _local.last_sql = (query, params)
+
+def last_sql():
+    """(query, params) terakhir yang dijalankan config._read di thread ini"""
+    return getattr(_local, 'last_sql', None)
+
+def _frame_bytes(result):
+    try:
+        return int(result.memory_usage(deep=True).sum())
+    except AttributeError:
+        return 0
+
+def _new_metric():
+    return {
+        'calls': 0,
+        'errors': 0,
+        'rows': 0,
+        'bytes': 0,
+        'total_seconds': 0.0,
+        'max_seconds': 0.0,
+        'buckets': [0] * len(LATENCY_BUCKETS),
+    }
+
+def _observe(name, page, seconds, rows, nbytes, error=False):
+    with _lock:
+        metric = _metrics.setdefault((name, page), _new_metric())
+        metric['calls'] += 1
+        metric['errors'] += int(error)
+        metric['rows'] += rows
+        metric['bytes'] += nbytes
+        metric['total_seconds'] += seconds
+        metric['max_seconds'] = max(metric['max_seconds'], seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                metric['buckets'][i] += 1
+
+def _explain(conn, sql):
+    """Jalankan EXPLAIN (ANALYZE, BUFFERS) untuk query yang lambat"""
+    query, params = sql
+    cur = conn.cursor()
+    try:
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT) " + query.strip().rstrip(';'), params or None)
+        return "\n".join(row[0] for row in cur.fetchall())
+    except Exception as e:
+        conn.rollback()
+        return f"EXPLAIN gagal: {e}"
+    finally:
+        cur.close()
+
+def _record_slow(name, page, seconds, rows, get_conn):
+    entry = {
+        'query': name,
+        'page': page,
+        'ms': round(seconds * 1000, 2),
+        'rows': rows,
+        'at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'plan': None,
+    }
+    sql = last_sql()
+    if CAPTURE_PLANS and sql is not None and get_conn is not None:
+        entry['plan'] = _explain(get_conn(), sql)
+    logger.warning("slow query %s (%s ms, %s rows, page=%s)", name, entry['ms'], rows, page)
+    with _lock:
+        _slow_log.append(entry)
+        del _slow_log[:-SLOW_LOG_SIZE]
+
+def instrument(get_conn=None):
+    """Decorator untuk fungsi query yang mengembalikan DataFrame.
+
+    get_conn: callable yang mengembalikan koneksi untuk EXPLAIN on demand.
+    """
+    def decorator(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            page = get_page()
+            _local.last_sql = None
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                _observe(name, page, time.perf_counter() - start, 0, 0, error=True)
+                raise
+            seconds = time.perf_counter() - start
+            rows = len(result) if hasattr(result, '__len__') else 0
+            _observe(name, page, seconds, rows, _frame_bytes(result))
+            record_span('query', name, seconds, rows)
+            if seconds * 1000 >= SLOW_QUERY_MS:
+                _record_slow(name, page, seconds, rows, get_conn)
+            return result
+        return wrapper
+    return decorator
+
+def explain_last(get_conn):
+    """Capture plan EXPLAIN (ANALYZE, BUFFERS) untuk SQL terakhir di thread ini"""
+    sql = last_sql()
+    if sql is None:
+        return None
+    return _explain(get_conn(), sql)
+
+def snapshot():
+    """Copy registry: list dict per (query, page)"""
+    with _lock:
+        rows = []
+        for (name, page), m in sorted(_metrics.items()):
+            rows.append({
+                'query': name,
+                'page': page,
+                'calls': m['calls'],
+                'errors': m['errors'],
+                'rows': m['rows'],
+                'bytes': m['bytes'],
+                'total_ms': round(m['total_seconds'] * 1000, 2),
+                'avg_ms': round(m['total_seconds'] * 1000 / m['calls'], 2) if m['calls'] else 0,
+                'max_ms': round(m['max_seconds'] * 1000, 2),
+            })
+        return rows
+
+def slow_queries():
+    with _lock:
+        return list(_slow_log)
+
+def reset():
+    with _lock:
+        _metrics.clear()
+        del _slow_log[:]
+
+def to_json():
+    return json.dumps({'queries': snapshot(), 'slow_queries': slow_queries()}, indent=2, default=str)
+
+def to_prometheus():
+    """Export registry dalam Prometheus text exposition format"""
+    lines = [
+        "# HELP superstore_query_seconds Latency query config.py",
+        "# TYPE superstore_query_seconds histogram",
+    ]
+    with _lock:
+        items = sorted(_metrics.items())
+        for (name, page), m in items:
+            labels = f'query="{name}",page="{page}"'
+            for bound, count in zip(LATENCY_BUCKETS, m['buckets']):
+                lines.append(f'superstore_query_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'superstore_query_seconds_bucket{{{labels},le="+Inf"}} {m["calls"]}')
+            lines.append(f'superstore_query_seconds_sum{{{labels}}} {m["total_seconds"]:.6f}')
+            lines.append(f'superstore_query_seconds_count{{{labels}}} {m["calls"]}')
+        for metric, key, help_text in (
+            ('superstore_query_rows_total', 'rows', 'Jumlah baris yang dikembalikan'),
+            ('superstore_query_bytes_total', 'bytes', 'Bytes DataFrame hasil query'),
+            ('superstore_query_errors_total', 'errors', 'Jumlah query yang gagal'),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (name, page), m in items:
+                lines.append(f'{metric}{{query="{name}",page="{page}"}} {m[key]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,146 @@
+# rfm.py
+# Maintain tabel customer_rfm (Recency, Frequency, Monetary) secara incremental.
+# Hanya customer yang tersentuh order baru/berubah/terhapus yang dihitung
+# ulang metric-nya, lalu score & segment di-refresh dalam satu pass atas
+# tabel customer_rfm.
+#
+# ETL yang menghapus order atau memindahkannya ke customer lain harus
+# mengumpulkan customer_id terdampak SEBELUM mengubah orders
+# (get_customers_for_orders), lalu mengirimnya sebagai customer_ids:
+#
+#   touched = get_customers_for_orders(conn, order_ids)   # sebelum DELETE/UPDATE
+#   ... ubah orders / order_details ...
+#   refresh_customer_rfm(conn, order_ids=order_ids, customer_ids=touched)
+from db import connect_writer
+from data_version import bump_data_version
+
+# Aturan segmentasi RFM (sama dengan yang dulu ada di config.py)
+RFM_SEGMENT_CASE = """
+    CASE
+        WHEN s.r_score >= 4 AND s.f_score >= 4 AND s.m_score >= 4 THEN 'Champions'
+        WHEN s.r_score >= 3 AND s.f_score >= 3 AND s.m_score >= 3 THEN 'Loyal Customers'
+        WHEN s.r_score >= 4 AND s.f_score <= 2 THEN 'New Customers'
+        WHEN s.r_score <= 2 AND s.f_score >= 3 THEN 'At Risk'
+        WHEN s.r_score <= 2 AND s.f_score <= 2 THEN 'Lost Customers'
+        WHEN s.r_score >= 3 AND s.f_score <= 2 AND s.m_score >= 3 THEN 'Potential Loyalists'
+        WHEN s.m_score >= 4 THEN 'Big Spenders'
+        ELSE 'Regular Customers'
+    END
+"""
+
+def connect():
+    """Koneksi ke writer (lihat db.py)"""
+    return connect_writer()
+
+def get_customers_for_orders(conn, order_ids):
+    """Cari customer_id yang memiliki order di daftar order_ids (saat ini, di tabel orders)"""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT DISTINCT customer_id FROM orders WHERE order_id = ANY(%s);",
+        (list(order_ids),)
+    )
+    customer_ids = [r[0] for r in cur.fetchall()]
+    cur.close()
+    return customer_ids
+
+def refresh_customer_metrics(conn, customer_ids=None):
+    """Recompute last_order_date, frequency & monetary.
+
+    customer_ids=None berarti full rebuild; selain itu hanya customer
+    tersebut yang di-upsert.
+    """
+    cur = conn.cursor()
+    where = ""
+    params = ()
+    if customer_ids is None:
+        cur.execute("DELETE FROM customer_rfm;")
+    else:
+        customer_ids = list(customer_ids)
+        if not customer_ids:
+            cur.close()
+            return 0
+        where = "WHERE o.customer_id = ANY(%s)"
+        params = (customer_ids,)
+        # Customer yang order-nya sudah hilang tidak boleh tertinggal di snapshot
+        cur.execute("""
+            DELETE FROM customer_rfm r
+            WHERE r.customer_id = ANY(%s)
+              AND NOT EXISTS (SELECT 1 FROM orders o WHERE o.customer_id = r.customer_id);
+        """, params)
+
+    cur.execute(f"""
+        INSERT INTO customer_rfm (customer_id, last_order_date, frequency, monetary, updated_at)
+        SELECT
+            o.customer_id,
+            MAX(o.order_date) as last_order_date,
+            COUNT(DISTINCT o.order_id) as frequency,
+            SUM(d.sales) as monetary,
+            now()
+        FROM orders o
+        INNER JOIN order_details d ON o.order_id = d.order_id AND o.order_date = d.order_date
+        {where}
+        GROUP BY o.customer_id
+        ON CONFLICT (customer_id) DO UPDATE SET
+            last_order_date = EXCLUDED.last_order_date,
+            frequency = EXCLUDED.frequency,
+            monetary = EXCLUDED.monetary,
+            updated_at = EXCLUDED.updated_at;
+    """, params)
+    affected = cur.rowcount
+    conn.commit()
+    cur.close()
+    return affected
+
+def refresh_rfm_scores(conn):
+    """Hitung ulang NTILE score & segment untuk semua customer dalam satu pass.
+
+    Urutan recency (CURRENT_DATE - last_order_date DESC) sama dengan urutan
+    last_order_date ASC, jadi score tidak bergantung pada tanggal refresh.
+    """
+    cur = conn.cursor()
+    cur.execute(f"""
+        UPDATE customer_rfm r SET
+            r_score = s.r_score,
+            f_score = s.f_score,
+            m_score = s.m_score,
+            rfm_score = s.r_score + s.f_score + s.m_score,
+            customer_segment = {RFM_SEGMENT_CASE}
+        FROM (
+            SELECT
+                customer_id,
+                NTILE(5) OVER (ORDER BY last_order_date ASC) as r_score,
+                NTILE(5) OVER (ORDER BY frequency ASC) as f_score,
+                NTILE(5) OVER (ORDER BY monetary ASC) as m_score
+            FROM customer_rfm
+        ) s
+        WHERE r.customer_id = s.customer_id;
+    """)
+    conn.commit()
+    cur.close()
+
+def refresh_customer_rfm(conn, order_ids=None, customer_ids=None):
+    """Entry point ETL: refresh customer_rfm setelah orders berubah.
+
+    order_ids: order yang baru masuk / di-update; customer-nya dicari di
+    orders sekarang. customer_ids: customer yang dikumpulkan sebelum order
+    dihapus / dipindah (tidak bisa dicari lagi lewat order_ids). Customer
+    yang tidak punya order lagi dibuang dari snapshot. Keduanya None untuk
+    full rebuild (misalnya setelah convert.py).
+    """
+    if order_ids is not None or customer_ids is not None:
+        customer_ids = set(customer_ids or ())
+        if order_ids is not None:
+            customer_ids.update(get_customers_for_orders(conn, order_ids))
+    refresh_customer_metrics(conn, customer_ids)
+    refresh_rfm_scores(conn)
+    bump_data_version(conn, ['customer_rfm'])
+    conn.commit()
+
+if __name__ == "__main__":
+    conn = connect()
+    refresh_customer_rfm(conn)
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM customer_rfm;")
+    print("Selesai. Total customer RFM:", cur.fetchone()[0])
+    cur.close()
+    conn.close()
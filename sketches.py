@@ -0,0 +1,337 @@
+# sketches.py
+# Sketch yang bisa di-merge untuk KPI approximate + maintenance tabel kpi_sketches.
+#
+# - HyperLogLog : estimasi COUNT(DISTINCT) customer & order (error ~0.8% di p=14)
+# - DDSketch    : quantile nilai order dengan relative error terjamin (default 1%)
+#
+# Sketch disimpan per cell (bulan, segment, region). KPI untuk rentang waktu /
+# segment / region apa pun didapat dengan me-merge cell yang relevan, tanpa
+# membaca ulang fact_order_line.
+#
+#   python sketches.py            # rebuild penuh kpi_sketches
+import zlib
+import struct
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from db import connect_writer
+
+HLL_PRECISION = 14
+# format serial register HyperLogLog
+HLL_DENSE = 0
+HLL_SPARSE = 1
+DDSKETCH_ALPHA = 0.01
+
+# ==============================
+# HYPERLOGLOG
+# ==============================
+def hash_values(values):
+    """Hash 64-bit stabil (antar proses) untuk sebuah array/Series nilai"""
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy(dtype=np.uint64)
+
+def _bit_length(values):
+    """bit_length tiap elemen uint64 (0 untuk 0), exact tanpa float"""
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = values >= (np.uint64(1) << np.uint64(shift))
+        length[mask] += shift
+        values[mask] >>= np.uint64(shift)
+    length[values > 0] += 1
+    return length
+
+class HyperLogLog:
+    """HyperLogLog dengan register dense uint8 (2^p register)"""
+
+    def __init__(self, p=HLL_PRECISION, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = registers if registers is not None else np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return self
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - _bit_length(rest).astype(np.int64) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+        return self
+
+    def add(self, values):
+        return self.add_hashes(hash_values(values))
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("HyperLogLog dengan precision berbeda tidak bisa di-merge")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # linear counting untuk kardinalitas kecil
+            return m * np.log(m / zeros)
+        return float(raw)
+
+    def relative_error(self):
+        return 1.04 / np.sqrt(self.m)
+
+    def to_bytes(self):
+        """Serial: [p][format] lalu register sparse (index uint16 + nilai) atau dense zlib.
+
+        Cell kecil (sedikit customer per bulan/segment/region) hanya mengisi
+        sedikit register, jadi format sparse jauh lebih kecil & cepat di-decode.
+        """
+        nonzero = np.flatnonzero(self.registers)
+        if len(nonzero) * 3 < self.m:
+            payload = nonzero.astype('<u2').tobytes() + self.registers[nonzero].tobytes()
+            return bytes([self.p, HLL_SPARSE]) + payload
+        return bytes([self.p, HLL_DENSE]) + zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        p, fmt = data[0], data[1]
+        if fmt == HLL_SPARSE:
+            n = (len(data) - 2) // 3
+            index = np.frombuffer(data, dtype='<u2', count=n, offset=2)
+            registers = np.zeros(1 << p, dtype=np.uint8)
+            registers[index] = np.frombuffer(data, dtype=np.uint8, count=n, offset=2 + 2 * n)
+        else:
+            registers = np.frombuffer(zlib.decompress(data[2:]), dtype=np.uint8).copy()
+        return cls(p=p, registers=registers)
+
+# ==============================
+# DDSKETCH
+# ==============================
+class DDSketch:
+    """Quantile sketch dengan relative accuracy alpha (untuk nilai positif).
+
+    Nilai <= 0 dihitung di bucket nol (dilaporkan sebagai 0).
+    """
+
+    def __init__(self, alpha=DDSKETCH_ALPHA, keys=None, counts=None, zero_count=0):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = np.log(self.gamma)
+        self.keys = keys if keys is not None else np.zeros(0, dtype=np.int32)
+        self.counts = counts if counts is not None else np.zeros(0, dtype=np.int64)
+        self.zero_count = zero_count
+
+    @property
+    def count(self):
+        return int(self.counts.sum()) + self.zero_count
+
+    def _compact(self, keys, counts):
+        unique, inverse = np.unique(keys, return_inverse=True)
+        self.keys = unique.astype(np.int32)
+        self.counts = np.bincount(inverse, weights=counts, minlength=len(unique)).astype(np.int64)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        positive = values[values > 0]
+        self.zero_count += int(len(values) - len(positive))
+        keys = np.ceil(np.log(positive) / self.log_gamma).astype(np.int32)
+        self._compact(
+            np.concatenate([self.keys, keys]),
+            np.concatenate([self.counts, np.ones(len(keys), dtype=np.int64)])
+        )
+        return self
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError("DDSketch dengan alpha berbeda tidak bisa di-merge")
+        self.zero_count += other.zero_count
+        self._compact(
+            np.concatenate([self.keys, other.keys]),
+            np.concatenate([self.counts, other.counts])
+        )
+        return self
+
+    def quantile(self, q):
+        total = self.count
+        if total == 0:
+            return np.nan
+        rank = q * (total - 1)
+        if rank < self.zero_count:
+            return 0.0
+        cumulative = np.cumsum(self.counts) + self.zero_count
+        i = int(np.searchsorted(cumulative, rank, side='right'))
+        i = min(i, len(self.keys) - 1)
+        return float(2 * self.gamma ** int(self.keys[i]) / (self.gamma + 1))
+
+    def to_bytes(self):
+        header = struct.pack('<dqi', self.alpha, self.zero_count, len(self.keys))
+        return zlib.compress(header + self.keys.astype('<i4').tobytes() + self.counts.astype('<i8').tobytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = zlib.decompress(bytes(data))
+        alpha, zero_count, n = struct.unpack_from('<dqi', data)
+        offset = struct.calcsize('<dqi')
+        keys = np.frombuffer(data, dtype='<i4', count=n, offset=offset).astype(np.int32)
+        counts = np.frombuffer(data, dtype='<i8', count=n, offset=offset + 4 * n).astype(np.int64)
+        return cls(alpha=alpha, keys=keys, counts=counts, zero_count=zero_count)
+
+# ==============================
+# ROLLUP kpi_sketches
+# ==============================
+ORDER_VALUES_QUERY = """
+    SELECT
+        DATE_TRUNC('month', f.order_date)::date AS month,
+        c.segment::text AS segment,
+        c.region::text AS region,
+        c.customer_id,
+        f.order_key,
+        COUNT(*) AS line_count,
+        SUM(f.sales) AS order_value,
+        SUM(f.profit) AS profit
+    FROM fact_order_line f
+    INNER JOIN dim_customer c ON f.customer_key = c.customer_key
+    {where}
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+CELL_KEYS = ['month', 'segment', 'region']
+
+def build_cells(orders):
+    """DataFrame level-order -> list tuple baris kpi_sketches (satu per cell)"""
+    orders = orders.reset_index(drop=True)
+    customer_hashes = hash_values(orders['customer_id'])
+    order_hashes = hash_values(orders['order_key'])
+    rows = []
+    for (month, segment, region), group in orders.groupby(CELL_KEYS, sort=True):
+        idx = group.index.to_numpy()
+        customers = HyperLogLog().add_hashes(customer_hashes[idx])
+        order_ids = HyperLogLog().add_hashes(order_hashes[idx])
+        order_values = DDSketch().add(group['order_value'].to_numpy(dtype=np.float64))
+        rows.append((
+            month, segment, region,
+            int(group['line_count'].sum()),
+            round(float(group['order_value'].sum()), 2),
+            round(float(group['profit'].sum()), 2),
+            customers.to_bytes(), order_ids.to_bytes(), order_values.to_bytes(),
+        ))
+    return rows
+
+def refresh_kpi_sketches(conn, since_line_id=None):
+    """Rebuild cell kpi_sketches.
+
+    since_line_id=None membangun ulang semua cell. Kalau diisi, hanya bulan
+    yang punya fact line dengan order_line_id > since_line_id yang dihitung
+    ulang (dipanggil star_schema.py setelah append incremental).
+    Return jumlah cell yang ditulis.
+    """
+    cur = conn.cursor()
+    if since_line_id is None:
+        cur.execute("TRUNCATE kpi_sketches;")
+        where, params = "", {}
+    else:
+        cur.execute("""
+            SELECT DATE_TRUNC('month', MIN(order_date))::date,
+                   (DATE_TRUNC('month', MAX(order_date)) + INTERVAL '1 month')::date
+            FROM fact_order_line
+            WHERE order_line_id > %s;
+        """, (since_line_id,))
+        start, end = cur.fetchone()
+        if start is None:
+            conn.commit()
+            cur.close()
+            return 0
+        cur.execute("DELETE FROM kpi_sketches WHERE month >= %s AND month < %s;", (start, end))
+        where = "WHERE f.order_date >= %(start)s AND f.order_date < %(end)s"
+        params = {'start': start, 'end': end}
+
+    cur.execute(ORDER_VALUES_QUERY.format(where=where), params)
+    orders = pd.DataFrame(cur.fetchall(), columns=[col.name for col in cur.description])
+    rows = build_cells(orders) if len(orders) else []
+    execute_values(cur, """
+        INSERT INTO kpi_sketches (
+            month, segment, region, line_count, sales, profit,
+            customers_hll, orders_hll, order_value_sketch
+        ) VALUES %s
+    """, rows)
+    conn.commit()
+    cur.close()
+    return len(rows)
+
+def remove_kpi_sketch_months(conn, months):
+    """Hapus cell kpi_sketches bulan months (partisi fact-nya di-detach partitions.py).
+
+    Tidak commit: dijalankan di transaksi detach. Return jumlah cell yang dihapus.
+    """
+    cur = conn.cursor()
+    cur.execute("DELETE FROM kpi_sketches WHERE month = ANY(%s);", (list(months),))
+    deleted = cur.rowcount
+    cur.close()
+    return deleted
+
+# ==============================
+# MERGE (dipakai config.py)
+# ==============================
+QUANTILES = {'order_value_p50': 0.5, 'order_value_p90': 0.9, 'order_value_p99': 0.99}
+
+def _merge_hll(payloads):
+    """Merge banyak HyperLogLog serial langsung ke satu array register"""
+    merged = None
+    for data in payloads:
+        data = bytes(data)
+        if merged is None:
+            merged = HyperLogLog(p=data[0])
+        registers = merged.registers
+        if data[1] == HLL_SPARSE:
+            n = (len(data) - 2) // 3
+            index = np.frombuffer(data, dtype='<u2', count=n, offset=2)
+            values = np.frombuffer(data, dtype=np.uint8, count=n, offset=2 + 2 * n)
+            registers[index] = np.maximum(registers[index], values)
+        else:
+            np.maximum(registers, HyperLogLog.from_bytes(data).registers, out=registers)
+    return merged if merged is not None else HyperLogLog()
+
+def _merge_ddsketch(payloads):
+    """Merge banyak DDSketch serial sekaligus (satu kali compact)"""
+    sketches = [DDSketch.from_bytes(data) for data in payloads]
+    merged = DDSketch()
+    if sketches:
+        merged.zero_count = sum(d.zero_count for d in sketches)
+        merged._compact(
+            np.concatenate([d.keys for d in sketches]),
+            np.concatenate([d.counts for d in sketches])
+        )
+    return merged
+
+def merge_cells(cells, keys=None):
+    """Merge cell kpi_sketches per group keys (None = semua cell jadi satu baris).
+
+    Return DataFrame: keys + total_customers, total_orders (estimasi HLL),
+    line_count, total_sales, total_profit (exact) dan quantile nilai order.
+    """
+    groups = cells.groupby(keys, sort=True) if keys else [((), cells)]
+    rows = []
+    for key, group in groups:
+        order_values = _merge_ddsketch(group['order_value_sketch'])
+        row = dict(zip(keys or [], key if isinstance(key, tuple) else (key,)))
+        row.update({
+            'total_customers': int(round(_merge_hll(group['customers_hll']).estimate())),
+            'total_orders': int(round(_merge_hll(group['orders_hll']).estimate())),
+            'line_count': int(group['line_count'].sum()),
+            'total_sales': float(group['sales'].astype(float).sum()),
+            'total_profit': float(group['profit'].astype(float).sum()),
+        })
+        for name, q in QUANTILES.items():
+            row[name] = order_values.quantile(q)
+        rows.append(row)
+    columns = (keys or []) + ['total_customers', 'total_orders', 'line_count', 'total_sales', 'total_profit'] + list(QUANTILES)
+    return pd.DataFrame(rows, columns=columns)
+
+if __name__ == "__main__":
+    conn = connect_writer()
+    cells = refresh_kpi_sketches(conn)
+    print("Selesai. Total cell kpi_sketches:", cells)
+    conn.close()
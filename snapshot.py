@@ -0,0 +1,183 @@
+# snapshot.py
+# Snapshot Parquet dari tabel yang dibaca config.py + engine DuckDB in-process.
+#
+# Setelah ETL (convert.py / add_sellers.py) semua tabel di SNAPSHOT_TABLES
+# diekspor ke folder snapshot/ (satu file Parquet per tabel). Dengan
+# SUPERSTORE_BACKEND=duckdb, config.py menjawab query get_* dari DuckDB di atas
+# file-file itu: agregasi vectorized & multi-thread di proses app, tanpa
+# round trip ke Postgres (dashboard bisa jalan offline).
+#
+#   python snapshot.py            # export ulang snapshot dari writer
+import os
+import re
+import sys
+import json
+import time
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from db import connect_writer
+from data_version import bump_data_version
+from extract import (
+    copy_query, describe_query,
+    INT_OIDS, FLOAT_OIDS, BOOL_OIDS, TIMESTAMPTZ_OIDS
+)
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+SNAPSHOT_DIR = os.environ.get("SUPERSTORE_SNAPSHOT_DIR", "snapshot")
+MANIFEST_FILE = "manifest.json"
+
+# Semua tabel yang dipakai query di config.py
+SNAPSHOT_TABLES = [
+    'categories', 'subcategories', 'customers', 'products', 'sellers',
+    'orders', 'order_details', 'customer_rfm',
+    'dim_customer', 'dim_product', 'dim_seller', 'dim_order', 'fact_order_line',
+    'kpi_sketches', 'leaderboards', 'leaderboard_totals',
+]
+
+BYTEA_OID = 17
+DATE_OID = 1082
+TIMESTAMP_OID = 1114
+
+# ==============================
+# EXPORT
+# ==============================
+def _arrow_type(oid):
+    """Type OID Postgres -> tipe kolom Arrow di file Parquet"""
+    if oid in INT_OIDS:
+        return pa.int64()
+    if oid in FLOAT_OIDS:
+        return pa.float64()
+    if oid in BOOL_OIDS:
+        return pa.bool_()
+    if oid == DATE_OID:
+        return pa.date32()
+    if oid == TIMESTAMP_OID:
+        return pa.timestamp('us')
+    if oid in TIMESTAMPTZ_OIDS:
+        return pa.timestamp('us', tz='UTC')
+    return pa.string()
+
+def convert_options(columns):
+    """ConvertOptions pyarrow.csv untuk output COPY CSV dengan kolom (nama, OID)"""
+    return pacsv.ConvertOptions(
+        column_types={name: _arrow_type(oid) for name, oid in columns},
+        true_values=['t'],
+        false_values=['f'],
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False,
+    )
+
+def export_table(conn, table, path):
+    """COPY tabel ke CSV stream lalu tulis sebagai Parquet (zstd). Return jumlah baris."""
+    query = f"SELECT * FROM {table}"
+    cur = conn.cursor()
+    columns = describe_query(cur, query)
+    cur.close()
+
+    buf = copy_query(conn, query)
+    try:
+        data = pacsv.read_csv(buf, convert_options=convert_options(columns))
+    finally:
+        buf.close()
+    # bytea keluar dari COPY sebagai teks hex (\x...), simpan sebagai binary
+    for name, oid in columns:
+        if oid == BYTEA_OID:
+            i = data.schema.get_field_index(name)
+            values = [None if v is None else bytes.fromhex(v[2:]) for v in data.column(i).to_pylist()]
+            data = data.set_column(i, pa.field(name, pa.binary()), pa.array(values, type=pa.binary()))
+    pq.write_table(data, path, compression='zstd')
+    return data.num_rows
+
+def export_snapshot(conn, out_dir=SNAPSHOT_DIR):
+    """Export semua SNAPSHOT_TABLES ke out_dir.
+
+    File ditulis ke nama sementara dulu lalu di-rename, supaya dashboard
+    yang sedang membaca snapshot lama tidak melihat file setengah jadi.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'tables': {}}
+    written = []
+    for table in SNAPSHOT_TABLES:
+        tmp_path = os.path.join(out_dir, f"{table}.parquet.tmp")
+        manifest['tables'][table] = export_table(conn, table, tmp_path)
+        written.append((tmp_path, os.path.join(out_dir, f"{table}.parquet")))
+    conn.rollback()
+
+    for tmp_path, path in written:
+        os.replace(tmp_path, path)
+    with open(os.path.join(out_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    # dashboard dengan backend duckdb meng-evict cache-nya (lihat data_version.py)
+    bump_data_version(conn, ['snapshot'])
+    conn.commit()
+    return manifest
+
+# ==============================
+# DUCKDB
+# ==============================
+_PARAM = re.compile(r"%\((\w+)\)s")
+
+def open_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    """Koneksi DuckDB in-memory dengan satu view per tabel snapshot"""
+    if duckdb is None:
+        raise ImportError("Backend duckdb butuh package duckdb (pip install duckdb)")
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(
+            f"Snapshot {snapshot_dir} belum ada, jalankan python snapshot.py dulu"
+        )
+    con = duckdb.connect()
+    # samakan dengan session Postgres supaya kolom timestamptz (DATE_TRUNC) identik
+    con.execute("SET TimeZone = 'UTC'")
+    for table in SNAPSHOT_TABLES:
+        path = os.path.abspath(os.path.join(snapshot_dir, f"{table}.parquet")).replace("'", "''")
+        con.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{path}')")
+    return con
+
+def to_duckdb_sql(query, params=None):
+    """Ubah placeholder psycopg2 %(name)s jadi $name milik DuckDB"""
+    if not params:
+        return query
+    return _PARAM.sub(r"$\1", query).replace("%%", "%")
+
+def read_snapshot(con, query, params=None):
+    """Pengganti pd.read_sql untuk backend DuckDB (cursor per call, aman antar thread).
+
+    SUM(integer) di DuckDB bertipe HUGEINT (jadi float64 di pandas); dikembalikan
+    ke int64 seperti bigint dari Postgres supaya bentuk DataFrame sama.
+    """
+    cur = con.cursor()
+    try:
+        cur.execute(to_duckdb_sql(query, params), params or None)
+        hugeint = [col[0] for col in cur.description if str(col[1]) == 'HUGEINT']
+        data = cur.df()
+    finally:
+        cur.close()
+    for name in hugeint:
+        if not data[name].isna().any():
+            data[name] = data[name].astype('int64')
+    return data
+
+def snapshot_info(snapshot_dir=SNAPSHOT_DIR):
+    """Isi manifest.json (waktu export & jumlah baris per tabel), None kalau belum ada"""
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+if __name__ == "__main__":
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_DIR
+    conn = connect_writer()
+    manifest = export_snapshot(conn, out_dir)
+    conn.close()
+    print(f"Snapshot {out_dir} selesai ({manifest['exported_at']})")
+    for table, rows in manifest['tables'].items():
+        print(f"  {table:20s} {rows:,}")
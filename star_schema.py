@@ -0,0 +1,146 @@
+# star_schema.py
+# Populate analytics star schema (dim_* + fact_order_line) dari tabel OLTP.
+# Dimensi di-upsert berdasarkan natural key sehingga surrogate key stabil
+# antar refresh; fact bisa di-rebuild penuh atau di-append incremental.
+from db import connect_writer
+from sketches import refresh_kpi_sketches
+from leaderboards import refresh_leaderboards
+from data_version import bump_data_version
+
+# Tabel yang diisi refresh_star_schema (untuk invalidasi cache dashboard)
+STAR_TABLES = [
+    'dim_customer', 'dim_product', 'dim_seller', 'dim_order',
+    'fact_order_line', 'kpi_sketches', 'leaderboards', 'leaderboard_totals',
+]
+
+def connect():
+    """Koneksi ke writer (lihat db.py)"""
+    return connect_writer()
+
+def refresh_dimensions(conn):
+    """Upsert semua tabel dimensi dari tabel OLTP"""
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO dim_customer (customer_id, customer_name, segment, country, city, state, postal_code, region)
+        SELECT customer_id, customer_name, segment, country, city, state, postal_code, region
+        FROM customers
+        ON CONFLICT (customer_id) DO UPDATE SET
+            customer_name = EXCLUDED.customer_name,
+            segment = EXCLUDED.segment,
+            country = EXCLUDED.country,
+            city = EXCLUDED.city,
+            state = EXCLUDED.state,
+            postal_code = EXCLUDED.postal_code,
+            region = EXCLUDED.region;
+    """)
+    cur.execute("""
+        INSERT INTO dim_product (product_id, product_name, category_name, subcategory_name)
+        SELECT p.product_id, p.product_name, cat.category_name, sub.subcategory_name
+        FROM products p
+        INNER JOIN categories cat ON p.category_id = cat.category_id
+        INNER JOIN subcategories sub ON p.subcategory_id = sub.subcategory_id
+        ON CONFLICT (product_id) DO UPDATE SET
+            product_name = EXCLUDED.product_name,
+            category_name = EXCLUDED.category_name,
+            subcategory_name = EXCLUDED.subcategory_name;
+    """)
+    cur.execute("""
+        INSERT INTO dim_seller (seller_id, seller_name, seller_region, seller_rating)
+        SELECT seller_id, seller_name, seller_region, seller_rating
+        FROM sellers
+        ON CONFLICT (seller_id) DO UPDATE SET
+            seller_name = EXCLUDED.seller_name,
+            seller_region = EXCLUDED.seller_region,
+            seller_rating = EXCLUDED.seller_rating;
+    """)
+    cur.execute("""
+        INSERT INTO dim_order (order_id, order_date, ship_date, ship_mode)
+        SELECT order_id, order_date, ship_date, ship_mode
+        FROM orders
+        ON CONFLICT (order_id, order_date) DO UPDATE SET
+            ship_date = EXCLUDED.ship_date,
+            ship_mode = EXCLUDED.ship_mode;
+    """)
+    conn.commit()
+    cur.close()
+
+def fact_watermark(conn):
+    """order_line_id terbesar yang sudah ada di fact_order_line"""
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(order_line_id), 0) FROM fact_order_line;")
+    watermark = cur.fetchone()[0]
+    cur.close()
+    return watermark
+
+def refresh_fact(conn, full=False):
+    """Isi fact_order_line dari order_details.
+
+    full=True mengosongkan fact lalu load ulang semua baris (dipakai setelah
+    convert.py / add_sellers.py yang mengubah baris lama). Selain itu hanya
+    baris order_details dengan id di atas watermark yang di-append.
+    Return jumlah baris yang dimasukkan.
+    """
+    cur = conn.cursor()
+    if full:
+        cur.execute("TRUNCATE fact_order_line;")
+        watermark = 0
+    else:
+        watermark = fact_watermark(conn)
+
+    cur.execute("""
+        INSERT INTO fact_order_line (
+            order_line_id, order_date, order_key, customer_key, product_key, seller_key,
+            quantity, sales, discount, profit
+        )
+        SELECT
+            d.id,
+            d.order_date,
+            dord.order_key,
+            dc.customer_key,
+            dp.product_key,
+            ds.seller_key,
+            d.quantity,
+            d.sales,
+            d.discount,
+            d.profit
+        FROM order_details d
+        INNER JOIN orders o ON d.order_id = o.order_id AND d.order_date = o.order_date
+        INNER JOIN dim_order dord ON dord.order_id = d.order_id AND dord.order_date = d.order_date
+        INNER JOIN dim_customer dc ON dc.customer_id = o.customer_id
+        INNER JOIN dim_product dp ON dp.product_id = d.product_id
+        LEFT JOIN dim_seller ds ON ds.seller_id = d.seller_id
+        WHERE d.id > %s;
+    """, (watermark,))
+    inserted = cur.rowcount
+    conn.commit()
+    cur.close()
+    vacuum_analyze(conn, "fact_order_line")
+    return inserted
+
+def vacuum_analyze(conn, table):
+    """VACUUM ANALYZE supaya statistik & visibility map (index-only scan) up to date"""
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"VACUUM ANALYZE {table};")
+    cur.close()
+    conn.autocommit = autocommit
+
+def refresh_star_schema(conn, full=False):
+    """Entry point ETL: refresh dimensi, fact, lalu rollup kpi_sketches & leaderboard"""
+    refresh_dimensions(conn)
+    watermark = None if full else fact_watermark(conn)
+    inserted = refresh_fact(conn, full=full)
+    # hanya bulan yang kedatangan fact line baru yang sketch-nya dihitung ulang
+    refresh_kpi_sketches(conn, since_line_id=watermark)
+    # leaderboard cukup ditambah delta fact line baru
+    refresh_leaderboards(conn, since_line_id=watermark)
+    bump_data_version(conn, STAR_TABLES)
+    conn.commit()
+    return inserted
+
+if __name__ == "__main__":
+    conn = connect()
+    inserted = refresh_star_schema(conn, full=True)
+    print("Selesai. Total fact_order_line:", inserted)
+    conn.close()